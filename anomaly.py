@@ -0,0 +1,208 @@
+"""
+Streaming Anomaly Detection for Sensor Readings
+
+Every temperature sample goes through AnomalyDetector.observe(), which
+updates fixed-size rolling windows (running sum / sum of squares, so mean,
+variance and rate of change are O(1)) and raises or clears flags:
+
+- stuck:       the value hasn't changed for ANOMALY_STUCK_MINUTES
+- jump:        rate of change between two samples above ANOMALY_MAX_RATE °C/min
+- gap:         no sample for ANOMALY_GAP_SECONDS
+- not_heating: heater ON for ANOMALY_HEATING_GRACE_MINUTES but the temperature
+               isn't rising (below TELEGRAM_READY_TEMP)
+
+Active flags are shown in /health; with ANOMALY_TELEGRAM = True a message is
+sent when a flag is raised.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+import clock
+import config
+
+try:
+    from telegram_bot import notifier
+    TELEGRAM_IMPORTED = True
+except ImportError:
+    TELEGRAM_IMPORTED = False
+    notifier = None
+
+logger = logging.getLogger(__name__)
+
+
+class RollingStats:
+    """Mean, variance and rate of change over the last `size` samples in O(1)."""
+
+    def __init__(self, size: int):
+        self.samples = deque(maxlen=size)  # (epoch, value)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, epoch: float, value: float):
+        if len(self.samples) == self.samples.maxlen:
+            _, old = self.samples[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.samples.append((epoch, value))
+        self.total += value
+        self.total_sq += value * value
+
+    def clear(self):
+        self.samples.clear()
+        self.total = self.total_sq = 0.0
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / len(self.samples) if self.samples else None
+
+    @property
+    def variance(self) -> Optional[float]:
+        n = len(self.samples)
+        if n < 2:
+            return None
+        return max(0.0, (self.total_sq - self.total * self.total / n) / (n - 1))
+
+    def rate(self) -> Optional[float]:
+        """Average change per minute across the window."""
+        if len(self.samples) < 2:
+            return None
+        (t0, v0), (t1, v1) = self.samples[0], self.samples[-1]
+        return (v1 - v0) / (t1 - t0) * 60 if t1 > t0 else None
+
+    def span(self) -> float:
+        """Seconds covered by the window."""
+        return self.samples[-1][0] - self.samples[0][0] if len(self.samples) > 1 else 0.0
+
+
+class AnomalyDetector:
+    """Raises and clears anomaly flags from the sample stream."""
+
+    def __init__(self):
+        self.stuck_seconds = getattr(config, "ANOMALY_STUCK_MINUTES", 240) * 60
+        self.max_rate = getattr(config, "ANOMALY_MAX_RATE", 5.0)
+        self.gap_seconds = getattr(config, "ANOMALY_GAP_SECONDS", max(600, config.REFRESH_INTERVAL * 5))
+        self.heating_grace = getattr(config, "ANOMALY_HEATING_GRACE_MINUTES", 20) * 60
+        self.min_heat_rate = getattr(config, "ANOMALY_MIN_HEAT_RATE", 0.05)
+        self.telegram = getattr(config, "ANOMALY_TELEGRAM", False)
+
+        # ~20 minutes of samples at the poll interval
+        window = max(5, int(1200 // config.REFRESH_INTERVAL))
+        self.stats = RollingStats(window)
+        self.flags = {}  # name -> {"since": ISO8601, "detail": str}
+        self.last_epoch: Optional[float] = None
+        self.last_value: Optional[float] = None
+        self.value_since: Optional[float] = None  # When the value last changed
+        self.lock = threading.Lock()
+
+    def _raise(self, name: str, detail: str):
+        if name in self.flags:
+            self.flags[name]["detail"] = detail
+            return None
+        self.flags[name] = {"since": clock.now().isoformat(), "detail": detail}
+        return detail
+
+    def _clear(self, name: str):
+        if self.flags.pop(name, None) is not None:
+            logger.info("✓ Sensor anomaly cleared: %s", name)
+
+    def observe(self, epoch: float, temperature: float, heater_on: bool,
+                heater_seconds: Optional[float] = None):
+        """Update the windows with one sample and re-evaluate every flag."""
+        raised = []
+        with self.lock:
+            # Gap / jump look at the step from the previous sample
+            if self.last_epoch is not None:
+                dt = epoch - self.last_epoch
+                if dt > self.gap_seconds:
+                    self.stats.clear()  # Rates across the hole are meaningless
+                    if "gap" in self.flags:
+                        self._clear("gap")  # Already reported while it lasted
+                    else:
+                        # Nobody checked during the outage: report the hole now;
+                        # the flag clears with the next regular sample
+                        detail = f"no reading for {dt / 60:.0f}m"
+                        raised.append(("gap", self._raise("gap", detail)))
+                else:
+                    self._clear("gap")  # Data is flowing (again)
+                    if dt > 0:
+                        step_rate = abs(temperature - self.last_value) / dt * 60
+                        if step_rate > self.max_rate:
+                            detail = f"{self.last_value} → {temperature} in {dt:.0f}s"
+                            raised.append(("jump", self._raise("jump", detail)))
+                        else:
+                            self._clear("jump")
+
+            # Stuck: identical value for too long
+            if temperature != self.last_value or self.value_since is None:
+                self.value_since = epoch
+                self._clear("stuck")
+            elif epoch - self.value_since >= self.stuck_seconds:
+                minutes = (epoch - self.value_since) / 60
+                raised.append(("stuck", self._raise("stuck", f"{temperature} for {minutes:.0f}m")))
+
+            self.last_epoch, self.last_value = epoch, temperature
+            self.stats.add(epoch, temperature)
+
+            # Heater ON but not warming up
+            ready_temp = getattr(config, "TELEGRAM_READY_TEMP", 90)
+            rate = self.stats.rate()
+            if (heater_on and heater_seconds is not None and heater_seconds >= self.heating_grace
+                    and temperature < ready_temp and rate is not None
+                    and self.stats.span() >= self.heating_grace / 2 and rate < self.min_heat_rate):
+                detail = f"{rate:+.2f}°C/min after {heater_seconds / 60:.0f}m ON"
+                raised.append(("not_heating", self._raise("not_heating", detail)))
+            elif not heater_on or (rate is not None and rate >= self.min_heat_rate) \
+                    or temperature >= ready_temp:
+                self._clear("not_heating")
+
+        for name, detail in raised:
+            if detail is not None:
+                self._alert(name, detail)
+
+    def check_gap(self, now: Optional[float] = None):
+        """Raise the gap flag if samples stopped arriving (supervisor watchdog and /health)."""
+        now = now or clock.time()
+        with self.lock:
+            if self.last_epoch is None or now - self.last_epoch <= self.gap_seconds:
+                return
+            detail = self._raise("gap", f"no reading for {(now - self.last_epoch) / 60:.0f}m")
+        if detail is not None:
+            self._alert("gap", detail)
+
+    def _alert(self, name: str, detail: str):
+        logger.warning("⚠️ Sensor anomaly: %s (%s)", name, detail)
+        if self.telegram and TELEGRAM_IMPORTED and notifier:
+            notifier.send_message_sync(f"⚠️ <b>Sensor anomaly: {name}</b>\n\n{detail}")
+
+    def on_reading(self, reading):
+        """Supervisor sink."""
+        from data_logger import breaker_tracker
+
+        temperature = reading.values.get("temperature")
+        if temperature is None:
+            return
+        self.observe(
+            reading.timestamp.timestamp(),
+            temperature,
+            bool(breaker_tracker.current_state),
+            breaker_tracker.get_current_seconds() if breaker_tracker.current_state else None,
+        )
+
+    def snapshot(self) -> dict:
+        """Active flags and rolling stats for /health."""
+        self.check_gap()
+        with self.lock:
+            mean, variance, rate = self.stats.mean, self.stats.variance, self.stats.rate()
+            return {
+                "flags": {name: dict(flag) for name, flag in self.flags.items()},
+                "mean": round(mean, 2) if mean is not None else None,
+                "stddev": round(variance ** 0.5, 3) if variance is not None else None,
+                "rate_per_min": round(rate, 3) if rate is not None else None,
+            }
+
+
+# Global detector instance
+detector = AnomalyDetector()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Storage / Query / API Benchmarks
+
+Generates synthetic 30-day, 1-year and 5-year histories (compressed idle
+readings, 1-minute heating sessions, matching breaker transitions) and times
+the hot paths against each:
+
+    load_from_disk           TemperatureLogger.load_from_disk (incl. retention cleanup)
+    add_reading              one stored reading (includes the save_to_disk it triggers)
+    get_recent_data_24h      last 24 hours
+    get_recent_data_all      full history
+    cleanup_old_data         retention pass over the full history
+    update_state             one breaker transition (includes its save)
+    api_history_all          GET /api/temperature/history (Flask test client)
+    api_history_1h_cold      GET ...?bucket=1h&agg=avg,min,max, cache cleared
+    api_history_1h_warm      same query, served from the cache
+
+Usage:
+    python benchmark.py                    # run and compare with the baseline
+    python benchmark.py --save-baseline    # run and record the baseline
+    python benchmark.py --sizes 30d,1y --threshold 0.5
+
+Exits with status 1 when a median latency (or payload size) is more than
+--threshold above the baseline. Baselines are machine-specific: record one
+on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(REPO_DIR, "benchmark_baseline.json")
+SIZES = {"30d": 30, "1y": 365, "5y": 1826}
+
+# Differences below this are timer noise, never regressions
+NOISE_FLOOR_MS = 0.05
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def generate_history(days: int, seed: int = 42, end: datetime = None):
+    """Temperature records and breaker history shaped like real storage.
+
+    Idle: one compressed record per ~30 min around a daily ambient cycle.
+    Sessions (every 2-3 days): 1-minute records while heating toward ~90°C,
+    then a cool-down at the compressed rate.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now(timezone.utc)
+    t = end - timedelta(days=days)
+    records, breaker = [], []
+    next_session = t + timedelta(hours=rng.uniform(12, 60))
+    off_since = t
+
+    def add(ts, temperature):
+        records.append({
+            "timestamp": ts.replace(microsecond=rng.randrange(1_000_000)).isoformat(),
+            "temperature": round(temperature, 1),
+            "humidity": round(rng.uniform(20, 60), 1),
+        })
+
+    while t < end:
+        ambient = 18 + 4 * ((t.hour - 4) % 24 < 12) + rng.uniform(-1, 1)
+        if t < next_session:
+            add(t, ambient)
+            t += timedelta(minutes=rng.uniform(20, 30))
+            continue
+
+        # Heating session at full 1-minute resolution
+        on_minutes = rng.randint(90, 200)
+        breaker.append({"state": False, "timestamp": off_since.isoformat(),
+                        "duration_seconds": int((t - off_since).total_seconds())})
+        breaker.append({"state": True, "timestamp": t.isoformat(), "duration_seconds": on_minutes * 60})
+        temperature = ambient
+        for _ in range(on_minutes):
+            temperature += (92 - temperature) / 25
+            add(t, temperature)
+            t += timedelta(minutes=1)
+        off_since = t
+        # Cool-down: fewer records as the slope flattens
+        for step in range(12):
+            temperature = ambient + (temperature - ambient) * 0.7
+            add(t, temperature)
+            t += timedelta(minutes=5 + step * 2)
+        next_session = t + timedelta(hours=rng.uniform(36, 72))
+
+    records = [r for r in records if r["timestamp"] <= end.isoformat()]
+    return records, breaker, off_since
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def measure(fn, setup=None, repeat: int = 30, budget: float = 3.0) -> dict:
+    """Time fn() up to `repeat` times (or until `budget` seconds); setup() runs untimed."""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() < deadline):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "min_ms": round(samples[0], 4),
+        "runs": len(samples),
+    }
+
+
+def run_size(label: str, days: int, workdir: str, repeat: int) -> dict:
+    import data_logger
+    from data_logger import TemperatureLogger, BreakerStateTracker
+    import web_server
+    from history_query import history_cache
+
+    records, breaker_history, off_since = generate_history(days)
+    results = {"records": len(records), "breaker_entries": len(breaker_history)}
+
+    # load_from_disk: the file as save_to_disk writes it
+    path = os.path.join(workdir, f"temperature_{label}.json")
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+    results["file_bytes"] = os.path.getsize(path)
+    loader = TemperatureLogger(path)
+    results["load_from_disk"] = measure(loader.load_from_disk, repeat=repeat)
+
+    logger = TemperatureLogger(os.path.join(workdir, f"scratch_{label}.json"))
+
+    def reset_logger():
+        logger.data = list(records)
+        logger.last_save_time = None
+
+    results["add_reading"] = measure(
+        lambda: logger.add_reading(80.0, 30.0, full_fidelity=True), setup=reset_logger, repeat=repeat)
+    logger.data = records
+    results["get_recent_data_24h"] = measure(lambda: logger.get_recent_data(24), repeat=repeat)
+    results["get_recent_data_all"] = measure(logger.get_recent_data, repeat=repeat)
+    results["cleanup_old_data"] = measure(logger.cleanup_old_data, setup=reset_logger, repeat=repeat)
+
+    tracker = BreakerStateTracker(os.path.join(workdir, f"breaker_{label}.json"))
+
+    def reset_tracker():
+        tracker.history = list(breaker_history)
+        tracker.current_state = False
+        tracker.state_since = off_since.isoformat()
+
+    results["update_state"] = measure(lambda: tracker.update_state(True), setup=reset_tracker, repeat=repeat)
+
+    # API through the Flask test client, against the global logger
+    data_logger.temp_logger.data = records
+    client = web_server.app.test_client()
+
+    def timed_get(url, setup=None):
+        sizes = []
+
+        def call():
+            response = client.get(url)
+            assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+            sizes.append(len(response.data))
+        stats = measure(call, setup=setup, repeat=repeat)
+        stats["payload_bytes"] = sizes[-1]
+        return stats
+
+    bucket_url = "/api/temperature/history?bucket=1h&agg=avg,min,max"
+    results["api_history_all"] = timed_get("/api/temperature/history")
+    results["api_history_1h_cold"] = timed_get(bucket_url, setup=history_cache.entries.clear)
+    results["api_history_1h_warm"] = timed_get(bucket_url)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Regressions as (size, benchmark, metric, baseline, current)."""
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            old = baseline.get(size, {}).get(name)
+            if not isinstance(stats, dict) or not isinstance(old, dict):
+                continue
+            for metric in ("median_ms", "payload_bytes"):
+                if metric not in stats or metric not in old:
+                    continue
+                current, before = stats[metric], old[metric]
+                if metric == "median_ms" and current - before < NOISE_FLOOR_MS:
+                    continue
+                if current > before * (1 + threshold):
+                    regressions.append((size, name, metric, before, current))
+    return regressions
+
+
+def print_table(results: dict, baseline: dict):
+    for size, benchmarks in results.items():
+        print(f"\n{size}: {benchmarks['records']} records, {benchmarks['breaker_entries']} breaker "
+              f"entries, {benchmarks['file_bytes'] / 1e6:.1f} MB on disk")
+        print(f"  {'benchmark':<22}{'median ms':>12}{'p95 ms':>12}{'baseline':>12}{'change':>9}{'payload':>12}")
+        for name, stats in benchmarks.items():
+            if not isinstance(stats, dict):
+                continue
+            old = baseline.get(size, {}).get(name, {}).get("median_ms")
+            change = f"{(stats['median_ms'] / old - 1) * 100:+.0f}%" if old else ""
+            payload = f"{stats['payload_bytes']:,}" if "payload_bytes" in stats else ""
+            print(f"  {name:<22}{stats['median_ms']:>12.3f}{stats['p95_ms']:>12.3f}"
+                  f"{old if old is not None else '':>12}{change:>9}{payload:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma-separated: " + ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=30, help="max runs per benchmark")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--output", help="also write results JSON here")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    # Run in a scratch directory so the module-level loggers neither read
+    # nor overwrite real history files
+    sys.path.insert(0, REPO_DIR)
+    workdir = tempfile.mkdtemp(prefix="sauna-bench-")
+    os.chdir(workdir)
+    import config
+    config.LOG_LEVEL = "WARNING"
+    config.TELEGRAM_ENABLED = False
+
+    results = {}
+    for size in sizes:
+        print(f"Running {size}...", flush=True)
+        results[size] = run_size(size, SIZES[size], workdir, args.repeat)
+
+    print_table(results, baseline)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline} (run with --save-baseline)")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for size, name, metric, before, current in regressions:
+            print(f"  {size} {name} {metric}: {before} -> {current}")
+        return 1
+    print(f"\n✓ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
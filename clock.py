@@ -0,0 +1,79 @@
+"""
+Clock
+
+Single source of "now" for the monitoring pipeline (history, breaker
+tracking, notification rules and scheduler, usage stats, drivers). In
+production it is the system clock. The replay harness (simulator.py) swaps
+in a VirtualClock, so a month of sessions runs through the real code in
+seconds.
+
+Pipeline modules call clock.now() / clock.time() / clock.monotonic()
+instead of datetime.now(timezone.utc) / time.time() / time.monotonic().
+I/O timeouts, retry backoff and metrics keep using real time.
+"""
+
+import time as _time
+from datetime import datetime, timezone
+
+
+class SystemClock:
+    def time(self) -> float:
+        return _time.time()
+
+    def monotonic(self) -> float:
+        return _time.monotonic()
+
+
+class VirtualClock:
+    """Clock that only moves when advanced."""
+
+    def __init__(self, start: float):
+        self._now = float(start)
+        self._elapsed = 0.0
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def advance(self, seconds: float):
+        self._now += seconds
+        self._elapsed += seconds
+
+    def advance_to(self, epoch: float):
+        if epoch > self._now:
+            self.advance(epoch - self._now)
+
+
+_clock = SystemClock()
+
+
+def use(clock):
+    """Install a clock (VirtualClock for replay); returns the previous one."""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def current():
+    return _clock
+
+
+def time() -> float:
+    """Epoch seconds."""
+    return _clock.time()
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def now() -> datetime:
+    """Aware UTC datetime."""
+    return datetime.fromtimestamp(_clock.time(), timezone.utc)
+
+
+def local_now() -> datetime:
+    """Naive local datetime (calendar rules)."""
+    return datetime.fromtimestamp(_clock.time())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Collector for Split Deployments
+
+Owns everything stateful: YoLink/Tuya polling, the history files, the
+notification scheduler and Telegram. It serves no HTTP; instead it
+publishes the latest readings and history to the shared store
+(shared_store.py), and any number of web workers serve them (wsgi.py):
+
+    python collector.py
+    gunicorn -w 4 -b 0.0.0.0:5002 wsgi:app
+
+Run exactly one collector per state directory. The single-process
+`python web_server.py` needs neither of these.
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+
+import config
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+async def heartbeat(publisher, interval: float):
+    """Republish regularly, so workers can tell an idle collector from a dead one."""
+    while True:
+        await asyncio.sleep(interval)
+        publisher.publish_latest()
+        publisher.publish_documents("health")
+
+
+async def run(supervisor, publisher):
+    loop = asyncio.get_running_loop()
+    task = asyncio.gather(supervisor.run(), heartbeat(publisher, config.REFRESH_INTERVAL))
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await supervisor.close()
+
+
+def main():
+    setup_logging()
+    from data_logger import temp_logger, breaker_tracker
+    from notification_scheduler import scheduler
+    from sensor_drivers import build_supervisor
+    from shared_store import LatestBlock, StateStore, StorePublisher
+    from static_site import static_site
+    from telegram_bot import notifier, start_command_polling
+    from usage_stats import usage_stats
+
+    store = StateStore()
+    block = LatestBlock.create()
+    supervisor = build_supervisor()
+    publisher = StorePublisher(store, block, supervisor)
+    publisher.attach()
+    if static_site.enabled:
+        from web_server import render_dashboard
+        static_site.attach(supervisor, render_dashboard)
+
+    scheduler.start()
+    if notifier.enabled:
+        notifier.outbox.start()
+    start_command_polling()
+
+    logger.info("Collector running (%s); start web workers with: gunicorn wsgi:app",
+                ", ".join(driver.name for driver in supervisor.drivers))
+    try:
+        asyncio.run(run(supervisor, publisher))
+    finally:
+        notifier.outbox.stop()
+        logger.info("Saving history...")
+        temp_logger.flush()
+        temp_logger.save_to_disk()
+        breaker_tracker.save_to_disk()
+        usage_stats.save_to_disk()
+        block.close()
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Sample Compression for Sensor History
+
+Decides which samples are worth storing. Both filters work on a tuple of
+channels (e.g. temperature, humidity), each with its own tolerance:
+
+- DeadbandFilter: store a sample when any channel leaves +/- tolerance of
+  the last stored value. Step (hold-last-value) reconstruction is within
+  tolerance of every dropped sample.
+- SwingingDoorFilter: store the turning points of the series. Linear
+  interpolation between stored points is within tolerance of every
+  dropped sample.
+
+Both also store a heartbeat point when max_gap seconds pass without one,
+so flat periods still show up in the history.
+"""
+
+import math
+from typing import Any, List, Optional, Sequence, Tuple
+
+# (epoch seconds, channel values, caller payload stored as-is)
+Sample = Tuple[float, Tuple[Optional[float], ...], Any]
+
+
+def _comparable(a: Sequence, b: Sequence) -> bool:
+    """Channels must be None/not-None in the same places to be compressed together."""
+    return all((x is None) == (y is None) for x, y in zip(a, b))
+
+
+class PassthroughFilter:
+    """Stores every sample (compression disabled)."""
+
+    def __init__(self, tolerances: Sequence[float] = (), max_gap: float = 0):
+        self.pending: Optional[Sample] = None
+
+    def offer(self, sample: Sample) -> List[Sample]:
+        return [sample]
+
+    def reset(self, sample: Optional[Sample] = None):
+        pass
+
+    def flush(self) -> List[Sample]:
+        return []
+
+
+class DeadbandFilter:
+    """Store-on-change filter with per-channel tolerance and max-gap heartbeat."""
+
+    def __init__(self, tolerances: Sequence[float], max_gap: float):
+        self.tolerances = tuple(tolerances)
+        self.max_gap = max_gap
+        self.archived: Optional[Sample] = None
+        self.pending: Optional[Sample] = None  # latest sample not (yet) stored
+
+    def offer(self, sample: Sample) -> List[Sample]:
+        """Return the samples to store after seeing this one."""
+        if self.archived is None:
+            self.reset(sample)
+            return [sample]
+
+        t, values, _ = sample
+        t0, values0, _ = self.archived
+        left_band = not _comparable(values, values0) or any(
+            v is not None and abs(v - v0) > tol
+            for v, v0, tol in zip(values, values0, self.tolerances)
+        )
+        if left_band or t - t0 >= self.max_gap:
+            self.reset(sample)
+            return [sample]
+
+        self.pending = sample
+        return []
+
+    def reset(self, sample: Optional[Sample] = None):
+        """Restart compression from an already stored sample."""
+        self.archived = sample
+        self.pending = None
+
+    def flush(self) -> List[Sample]:
+        """Store the pending tail (e.g. at shutdown)."""
+        if self.pending is None:
+            return []
+        sample = self.pending
+        self.reset(sample)
+        return [sample]
+
+
+class SwingingDoorFilter:
+    """Swinging-door trending (SDT) compression with max-gap heartbeat."""
+
+    def __init__(self, tolerances: Sequence[float], max_gap: float):
+        self.tolerances = tuple(tolerances)
+        self.max_gap = max_gap
+        self.archived: Optional[Sample] = None
+        self.pending: Optional[Sample] = None
+        self._upper: List[float] = []  # min slope of the upper door per channel
+        self._lower: List[float] = []  # max slope of the lower door per channel
+
+    def _open_doors(self):
+        self._upper = [math.inf] * len(self.tolerances)
+        self._lower = [-math.inf] * len(self.tolerances)
+
+    def _door_open_with(self, sample: Sample) -> bool:
+        """Check the line archive->sample passes every earlier door, then narrow them.
+
+        Requiring the slope itself (not just the door intersection) to fit
+        makes the tolerance an exact bound for linear interpolation.
+        """
+        t, values, _ = sample
+        t0, values0, _ = self.archived
+        dt = t - t0
+        if dt <= 0 or not _comparable(values, values0):
+            return False
+        for i, (v, v0) in enumerate(zip(values, values0)):
+            if v is not None and not self._lower[i] <= (v - v0) / dt <= self._upper[i]:
+                return False
+        for i, (v, v0, tol) in enumerate(zip(values, values0, self.tolerances)):
+            if v is not None:
+                self._upper[i] = min(self._upper[i], (v + tol - v0) / dt)
+                self._lower[i] = max(self._lower[i], (v - tol - v0) / dt)
+        return True
+
+    def offer(self, sample: Sample) -> List[Sample]:
+        """Return the samples to store after seeing this one."""
+        if self.archived is None:
+            self.reset(sample)
+            return [sample]
+
+        stored = []
+        if not self._door_open_with(sample):
+            if self.pending is None:
+                # Nothing between archive and this sample - store it directly
+                self.reset(sample)
+                return [sample]
+            # The previous sample is the last turning point
+            stored.append(self.pending)
+            self.reset(self.pending)
+            if not self._door_open_with(sample):
+                stored.append(sample)
+                self.reset(sample)
+                return stored
+
+        if sample[0] - self.archived[0] >= self.max_gap:
+            stored.append(sample)
+            self.reset(sample)
+            return stored
+
+        self.pending = sample
+        return stored
+
+    def reset(self, sample: Optional[Sample] = None):
+        """Restart compression from an already stored sample."""
+        self.archived = sample
+        self.pending = None
+        self._open_doors()
+
+    def flush(self) -> List[Sample]:
+        """Store the pending tail (e.g. at shutdown)."""
+        if self.pending is None:
+            return []
+        sample = self.pending
+        self.reset(sample)
+        return [sample]
+
+
+FILTERS = {
+    "none": PassthroughFilter,
+    "deadband": DeadbandFilter,
+    "swinging_door": SwingingDoorFilter,
+}
+
+
+def make_filter(mode: str, tolerances: Sequence[float], max_gap: float):
+    """Build a filter by config name ("none", "deadband" or "swinging_door")."""
+    try:
+        return FILTERS[mode](tolerances, max_gap)
+    except KeyError:
+        raise ValueError(f"Unknown compression mode: {mode!r} (expected one of {', '.join(FILTERS)})")
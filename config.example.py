@@ -19,6 +19,11 @@ REFRESH_INTERVAL = 30  # Poll temperature every 30 seconds
 # Temperature Display
 DISPLAY_FAHRENHEIT = False  # Set to False to display Celsius
 
+# Sensor drivers polled by the service. Leave unset for YoLink (+ Tuya if enabled);
+# ["simulated"] runs an in-process sauna model instead of real hardware.
+# SENSOR_DRIVERS = ["yolink", "tuya"]
+SIMULATION_SPEED = 1.0  # Time acceleration for the simulated driver
+
 # Tuya WiFi Breaker (Sauna Control)
 # Set TUYA_ENABLED = False to disable Tuya integration
 TUYA_ENABLED = False
@@ -38,3 +43,84 @@ TELEGRAM_CHAT_ID = ""  # Get chat ID from your group (e.g., "-1001234567890")
 # Telegram Notification Settings
 TELEGRAM_READY_TEMP = 90  # Temperature in °C to trigger "sauna ready" notification
 TELEGRAM_LONG_OFF_HOURS = 12  # Hours to wait before sending "long off" reminder
+
+# Event-driven notification rules (see notification_rules.py for all fields).
+# Leave unset to use the defaults: heater on, heater off (sessions >= 2h),
+# sauna ready (TELEGRAM_READY_TEMP while heating, once per session).
+# NOTIFICATION_RULES = [
+#     {"name": "heater_on", "on": "transition", "to": True, "action": "notify_heater_on"},
+#     {"name": "heater_off", "on": "transition", "to": False, "min_duration": 7200,
+#      "action": "notify_heater_off"},
+#     {"name": "sauna_ready", "on": "reading", "heater": True, "metric": "temperature",
+#      "op": ">=", "value": 90, "once_per_session": True, "action": "notify_sauna_ready"},
+#     {"name": "still_on", "on": "reading", "heater": True, "metric": "state_seconds",
+#      "op": ">=", "value": 5 * 3600, "once_per_session": True, "quiet_hours": [23, 7],
+#      "message": "⏰ Heater has been on for 5 hours ({temperature}°C)"},
+# ]
+
+# Device I/O resilience (YoLink cloud + Tuya LAN calls)
+YOLINK_TIMEOUT = 15  # Seconds per YoLink API call
+TUYA_TIMEOUT = 5  # Seconds per Tuya socket call
+IO_RETRY_ATTEMPTS = 3  # Attempts per call (exponential backoff with jitter between)
+IO_CIRCUIT_FAILURES = 5  # Consecutive failures before the circuit opens
+IO_CIRCUIT_RESET = 30  # Seconds before a half-open probe (doubles while probes fail)
+IO_CIRCUIT_RESET_MAX = 600  # Upper bound for the probe interval
+
+# History compression (applies while the heater is OFF; sessions are stored at full resolution)
+TEMP_COMPRESSION = "swinging_door"  # "swinging_door", "deadband" or "none"
+TEMP_COMPRESSION_TOLERANCE = 0.3  # Max reconstruction error in temperature units
+HUMIDITY_COMPRESSION_TOLERANCE = 2.0  # Max reconstruction error in % humidity
+TEMP_MAX_GAP_SECONDS = 1800  # Store at least one point this often even if nothing changes
+TEMP_RETENTION_DAYS = 30  # Temperature history kept on disk and in memory
+TUYA_LOG_HEARTBEAT = 1800  # Seconds between breaker log lines when the state doesn't change
+
+# YoLink HTTP client pool
+HTTP_TOTAL_TIMEOUT = 20  # Seconds for a whole request
+HTTP_CONNECT_TIMEOUT = 5  # Seconds to establish a connection
+HTTP_KEEPALIVE = 60  # Keep idle connections open across polls (> REFRESH_INTERVAL)
+HTTP_DNS_CACHE_TTL = 300  # Seconds to cache DNS lookups
+HTTP_POOL_LIMIT = 10  # Max open connections
+
+# Sensor anomaly detection (flags shown in /health)
+# ANOMALY_STUCK_MINUTES = 240  # Same value this long = stuck sensor
+# ANOMALY_MAX_RATE = 5.0  # °C/min between two samples = impossible jump
+# ANOMALY_GAP_SECONDS = 600  # No sample this long = dropout
+# ANOMALY_HEATING_GRACE_MINUTES = 20  # Heater ON this long without warming up...
+# ANOMALY_MIN_HEAT_RATE = 0.05  # ...at less than this °C/min = not heating
+# ANOMALY_TELEGRAM = False  # Also send a Telegram message when a flag is raised
+
+# Usage statistics (/api/stats): heater power for the energy estimate
+# HEATER_WATTS = 6000
+
+# Aggregated history queries (/api/temperature/history?bucket=...): cached results
+# HISTORY_CACHE_SIZE = 64
+
+# Profiling endpoints (/admin/profile/*), off by default. Requests must send
+# the token as an X-Admin-Token header or ?token=
+# PROFILING_ENABLED = False
+# PROFILING_TOKEN = "change-me"
+
+# Logging: records go through a background queue, so polls never wait on
+# console/file I/O. Per-poll readings are logged at DEBUG.
+# LOG_LEVEL = "INFO"
+# LOG_FORMAT = "text"  # or "json" (one object per line)
+# LOG_FILE = "sauna_monitor.log"  # Rotated by size; unset = console only
+# LOG_MAX_BYTES = 5 * 1024 * 1024
+# LOG_BACKUP_COUNT = 3
+# LOG_RATE_LIMIT = 5  # Max repeats of the same message per LOG_RATE_WINDOW seconds
+# LOG_RATE_WINDOW = 300
+
+# Startup: the port is bound first and the monitors load in the background;
+# requests arriving meanwhile wait this long before getting a 503
+# STARTUP_WAIT_SECONDS = 10
+
+# Split deployment (collector.py + wsgi.py workers): shared state
+# STATE_DB = "sauna_state.db"  # SQLite (WAL) mirror of history and derived state
+# SHARED_MEMORY_NAME = "sauna_latest"  # Latest readings block
+# SHARED_MEMORY_SIZE = 64 * 1024
+# COLLECTOR_STALE_SECONDS = 180  # Workers report the collector down after this
+
+# Static publish mode: write the share page, latest.json, the chart timeline
+# and downsampled history (each with a .gz twin) here for nginx / any static host
+# STATIC_PUBLISH_DIR = "/var/www/sauna"
+# STATIC_PUBLISH_INTERVAL = 10  # Min seconds between publishes for readings
@@ -3,20 +3,27 @@ Data Logger for Temperature and Breaker State History
 
 Stores temperature readings and breaker state changes with timestamps.
 Persists to JSON files and keeps 1 month of history.
+
+Temperature samples are compressed (see compression.py) while the heater is
+off, so flat idle periods cost a handful of points per hour instead of one
+per minute. Heating sessions are stored at full 1-minute resolution.
 """
 
+import bisect
 import json
+import logging
 import os
 import threading
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-try:
-    from telegram_bot import notifier
-    TELEGRAM_IMPORTED = True
-except ImportError:
-    TELEGRAM_IMPORTED = False
-    notifier = None
+import clock
+import config
+from compression import make_filter
+from metrics import TimedLock, lock_wait, save_bytes, save_duration
+from profiling import timed
+
+logger = logging.getLogger(__name__)
 
 
 class TemperatureLogger:
@@ -26,7 +33,15 @@ class TemperatureLogger:
         self.filename = filename
         self.data = []  # List of {"timestamp": "ISO8601", "temperature": float, "humidity": float}
         self.last_save_time = None
-        self.lock = threading.RLock()  # Use RLock for consistency
+        # RLock for consistency; acquire wait time is exported in /metrics
+        self.lock = TimedLock(threading.RLock(), lock_wait.labels("temp_logger"))
+        self.listeners = []  # Callables notified with (first_epoch, last_epoch) of changed data
+        self.filter = make_filter(
+            getattr(config, "TEMP_COMPRESSION", "swinging_door"),
+            (getattr(config, "TEMP_COMPRESSION_TOLERANCE", 0.3),
+             getattr(config, "HUMIDITY_COMPRESSION_TOLERANCE", 2.0)),
+            getattr(config, "TEMP_MAX_GAP_SECONDS", 1800),
+        )
         self.load_from_disk()
 
     def load_from_disk(self):
@@ -35,23 +50,40 @@ class TemperatureLogger:
             try:
                 with open(self.filename, 'r') as f:
                     self.data = json.load(f)
-                print(f"Loaded {len(self.data)} temperature records from {self.filename}")
+                logger.info("Loaded %s temperature records from %s", len(self.data), self.filename)
                 self.cleanup_old_data()
             except Exception as e:
-                print(f"Error loading temperature history: {e}")
+                logger.error("Error loading temperature history: %s", e)
                 self.data = []
 
+    @timed("temp_logger.save_to_disk")
     def save_to_disk(self):
         """Persist data to disk."""
         try:
-            with open(self.filename, 'w') as f:
+            with save_duration.labels(self.filename).time(), open(self.filename, 'w') as f:
                 json.dump(self.data, f, indent=2)
+                save_bytes.labels(self.filename).observe(f.tell())
         except Exception as e:
-            print(f"Error saving temperature history: {e}")
+            logger.error("Error saving temperature history: %s", e)
 
-    def cleanup_old_data(self):
-        """Remove data older than 1 month."""
-        cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+    def add_listener(self, callback):
+        """Call callback(first_epoch, last_epoch) when stored data in that span changes.
+
+        Called outside the lock, after records are appended or expired.
+        """
+        self.listeners.append(callback)
+
+    def _notify(self, first_epoch: float, last_epoch: float):
+        for callback in self.listeners:
+            try:
+                callback(first_epoch, last_epoch)
+            except Exception as e:
+                logger.error("Error in temperature history listener: %s", e)
+
+    def cleanup_old_data(self) -> Optional[float]:
+        """Remove data older than TEMP_RETENTION_DAYS (1 month). Returns the cutoff epoch if anything was removed."""
+        retention_days = getattr(config, "TEMP_RETENTION_DAYS", 30)
+        cutoff = clock.now() - timedelta(days=retention_days)
         cutoff_str = cutoff.isoformat()
 
         with self.lock:
@@ -59,61 +91,123 @@ class TemperatureLogger:
             self.data = [d for d in self.data if d.get("timestamp", "") >= cutoff_str]
             removed = original_len - len(self.data)
             if removed > 0:
-                print(f"Cleaned up {removed} old temperature records (older than 30 days)")
-
-    def add_reading(self, temperature: float, humidity: Optional[float] = None):
-        """Add a temperature reading (with 1-minute granularity)."""
-        now = datetime.now(timezone.utc)
-
-        # Only save if at least 1 minute has passed since last save
+                logger.info("Cleaned up %s old temperature records (older than %s days)", removed, retention_days)
+                return cutoff.timestamp()
+        return None
+
+    @timed("temp_logger.add_reading")
+    def add_reading(self, temperature: float, humidity: Optional[float] = None,
+                    full_fidelity: bool = False) -> int:
+        """Add a temperature reading (with 1-minute granularity).
+
+        Readings go through the compression filter unless full_fidelity is
+        set (heater ON), in which case every 1-minute sample is stored.
+        Returns the number of records written.
+        """
+        now = clock.now()
+
+        # Only sample if at least 1 minute has passed since last sample
         if self.last_save_time:
             time_since_last = (now - self.last_save_time).total_seconds()
             if time_since_last < 60:  # Less than 1 minute
-                return
+                return 0
+
+        record = {
+            "timestamp": now.isoformat(),
+            "temperature": temperature,
+        }
+        if humidity is not None:
+            record["humidity"] = humidity
+        sample = (now.timestamp(), (temperature, humidity), record)
 
+        expired_before = None
         with self.lock:
-            record = {
-                "timestamp": now.isoformat(),
-                "temperature": temperature,
-            }
-            if humidity is not None:
-                record["humidity"] = humidity
-
-            self.data.append(record)
             self.last_save_time = now
-
-            # Save to disk after every reading (to prevent data loss on restart)
+            if full_fidelity:
+                stored = self.filter.flush() + [sample]
+                self.filter.reset(sample)
+            else:
+                stored = self.filter.offer(sample)
+            if not stored:
+                return 0
+
+            for _, _, stored_record in stored:
+                self.data.append(stored_record)
+
+            # Save to disk after every stored record (to prevent data loss on restart)
             self.save_to_disk()
 
             # Cleanup old data every 100 records
-            if len(self.data) % 100 == 0:
-                self.cleanup_old_data()
+            if len(self.data) % 100 < len(stored):
+                expired_before = self.cleanup_old_data()
 
+        if expired_before is not None:
+            self._notify(0, expired_before)
+        self._notify(stored[0][0], stored[-1][0])
+        return len(stored)
+
+    def flush(self):
+        """Store the sample held back by compression (call before shutdown)."""
+        with self.lock:
+            stored = self.filter.flush()
+            for _, _, record in stored:
+                self.data.append(record)
+        if stored:
+            self._notify(stored[0][0], stored[-1][0])
+
+    def _pending_tail(self) -> list:
+        """Latest sample held back by compression, so charts reach 'now'."""
+        pending = self.filter.pending
+        return [pending[2]] if pending else []
+
+    @timed("temp_logger.get_recent_data")
     def get_recent_data(self, hours: Optional[int] = None):
         """Get temperature data for the last N hours (or all data if hours=None)."""
         if hours is None:
             # Return all data
             with self.lock:
-                return self.data.copy()
+                return self.data + self._pending_tail()
 
-        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+        cutoff = clock.now() - timedelta(hours=hours)
         cutoff_str = cutoff.isoformat()
 
         with self.lock:
-            return [d for d in self.data if d.get("timestamp", "") >= cutoff_str]
+            return [d for d in self.data if d.get("timestamp", "") >= cutoff_str] + self._pending_tail()
+
+    @timed("temp_logger.get_range")
+    def get_range(self, start: datetime, end: datetime, include_pending: bool = True):
+        """Records with start <= timestamp <= end (binary search; data is time-ordered)."""
+        start_str = start.astimezone(timezone.utc).isoformat()
+        end_str = end.astimezone(timezone.utc).isoformat()
+        with self.lock:
+            lo = bisect.bisect_left(self.data, start_str, key=lambda d: d.get("timestamp", ""))
+            hi = bisect.bisect_right(self.data, end_str, key=lambda d: d.get("timestamp", ""))
+            records = self.data[lo:hi]
+            if include_pending:
+                records += [r for r in self._pending_tail() if start_str <= r.get("timestamp", "") <= end_str]
+            return records
 
     def get_all_data(self):
         """Get all temperature data."""
         with self.lock:
-            return self.data.copy()
+            return self.data + self._pending_tail()
 
     def get_history(self, hours: Optional[int] = None):
         """Alias for get_recent_data for API consistency. Returns all data by default."""
         return self.get_recent_data(hours)
 
 
+# ON periods shorter than this are blips, not sauna sessions
+MIN_SESSION_SECONDS = 120
+
+
 class BreakerStateTracker:
-    """Tracks breaker ON/OFF state changes and durations."""
+    """Tracks breaker ON/OFF state changes and durations.
+
+    Alongside the full transition log it keeps an index of ON sessions
+    (blips filtered out, display line pre-formatted), appended as sessions
+    end, so /history never rescans the log.
+    """
 
     def __init__(self, filename="breaker_history.json"):
         self.filename = filename
@@ -121,7 +215,9 @@ class BreakerStateTracker:
         self.state_since = None  # When did current state start
         self.history = []  # List of {"state": bool, "timestamp": "ISO8601", "duration_seconds": int}
         self.lock = threading.RLock()  # Use RLock to allow reentrant locking
-        self.startup_time = datetime.now(timezone.utc)  # Track service start time
+        self.startup_time = clock.now()  # Track service start time
+        self.listeners = []  # Callables notified with each state transition
+        self.sessions = []  # Index of ON sessions: {"timestamp", "duration_seconds", "line"}
         self.load_from_disk()
 
     def load_from_disk(self):
@@ -133,12 +229,40 @@ class BreakerStateTracker:
                     self.current_state = data.get("current_state")
                     self.state_since = data.get("state_since")
                     self.history = data.get("history", [])
-                print(f"Loaded breaker state history: {len(self.history)} state changes")
+                logger.info("Loaded breaker state history: %s state changes", len(self.history))
+                self._rebuild_sessions()
                 # No cleanup - keep all history
             except Exception as e:
-                print(f"Error loading breaker history: {e}")
+                logger.error("Error loading breaker history: %s", e)
                 self.history = []
-
+                self.sessions = []
+
+    def _rebuild_sessions(self):
+        """Build the session index from the full history (once, at load)."""
+        self.sessions = []
+        for entry in self.history:
+            self._index_entry(entry)
+
+    def _index_entry(self, entry: dict):
+        """Add a finished history entry to the session index if it is a real ON session."""
+        if entry.get("state") is not True:
+            return
+        duration_s = entry.get("duration_seconds", 0)
+        if duration_s < MIN_SESSION_SECONDS:
+            return
+        ts_local = datetime.fromisoformat(entry["timestamp"]).astimezone()
+        date_str = ts_local.strftime('%b %d')
+        time_str = ts_local.strftime('%I:%M %p').lstrip('0')
+        h = int(duration_s // 3600)
+        m = int((duration_s % 3600) // 60)
+        dur_str = f'{h}h {m}m' if h > 0 else f'{m}m'
+        self.sessions.append({
+            "timestamp": entry["timestamp"],
+            "duration_seconds": duration_s,
+            "line": f'🔥 {date_str} {time_str} — {dur_str}',
+        })
+
+    @timed("breaker_tracker.save_to_disk")
     def save_to_disk(self):
         """Persist state data to disk."""
         try:
@@ -148,19 +272,34 @@ class BreakerStateTracker:
                     "state_since": self.state_since,
                     "history": self.history
                 }
-            with open(self.filename, 'w') as f:
+            with save_duration.labels(self.filename).time(), open(self.filename, 'w') as f:
                 json.dump(data, f, indent=2)
+                save_bytes.labels(self.filename).observe(f.tell())
         except Exception as e:
-            print(f"Error saving breaker history: {e}")
+            logger.error("Error saving breaker history: %s", e)
 
     def cleanup_old_data(self):
         """Keep all breaker history (no cleanup - user wants full log)."""
         # Breaker state changes are important events, keep all history forever
         pass
 
+    def add_listener(self, callback):
+        """Call callback(transition) after every state change (outside the lock).
+
+        transition: {"state", "previous_state", "previous_since", "previous_duration",
+        "previous_duration_str", "restarted_mid_session", "time"}
+        """
+        self.listeners.append(callback)
+
+    @timed("breaker_tracker.update_state")
     def update_state(self, new_state: bool):
-        """Update breaker state and track duration."""
-        now = datetime.now(timezone.utc)
+        """Update breaker state and track duration.
+
+        Notifications are not sent from here; listeners (the rule engine,
+        the scheduler) react to the transition.
+        """
+        now = clock.now()
+        transition = None
 
         with self.lock:
             # If state changed, record the transition
@@ -168,40 +307,29 @@ class BreakerStateTracker:
                 duration = (now - datetime.fromisoformat(self.state_since)).total_seconds()
 
                 # Add to history
-                self.history.append({
+                entry = {
                     "state": self.current_state,
                     "timestamp": self.state_since,
                     "duration_seconds": int(duration)
-                })
+                }
+                self.history.append(entry)
+                self._index_entry(entry)
 
-                print(f"Breaker state changed: {'ON' if self.current_state else 'OFF'} for {self._format_duration(duration)}")
+                logger.info("Breaker state changed: %s for %s",
+                            "ON" if self.current_state else "OFF", self._format_duration(duration))
 
                 # Guard: if state_since predates our startup, the duration is unreliable
-                # (service restarted mid-session). Treat as a fresh start — skip notification.
+                # (service restarted mid-session).
                 state_since_dt = datetime.fromisoformat(self.state_since)
-                restarted_mid_session = state_since_dt < self.startup_time
-
-                # Send Telegram notification for state change
-                # Minimum session duration before sending ON/OFF notifications.
-                # Set to 2 hours so quick test runs (playing with kid etc) stay silent.
-                MIN_NOTIFY_SECONDS = 2 * 3600  # 2 hours
-                if TELEGRAM_IMPORTED and notifier:
-                    if restarted_mid_session:
-                        print(f"State change detected at startup (restarted mid-session) — skipping notification")
-                        notifier.reset_ready_notification()
-                    elif new_state:
-                        # Heater turned ON — always notify immediately
-                        notifier.notify_heater_on()
-                    else:
-                        # Heater turned OFF — only notify if session lasted >= 2 hours
-                        if duration >= MIN_NOTIFY_SECONDS:
-                            duration_str = self._format_duration(duration)
-                            notifier.notify_heater_off(duration_str)
-                        else:
-                            print(f'Session too short ({self._format_duration(duration)}) '
-                                  f'— skipping turned-off notification')
-                        # Always reset ready notification when heater turns off
-                        notifier.reset_ready_notification()
+                transition = {
+                    "state": new_state,
+                    "previous_state": self.current_state,
+                    "previous_since": self.state_since,
+                    "previous_duration": duration,
+                    "previous_duration_str": self._format_duration(duration),
+                    "restarted_mid_session": state_since_dt < self.startup_time,
+                    "time": now,
+                }
 
                 # Cleanup and save
                 if len(self.history) % 10 == 0:
@@ -210,16 +338,39 @@ class BreakerStateTracker:
 
             # Update current state
             if self.current_state != new_state or self.state_since is None:
+                if transition is None:
+                    transition = {
+                        "state": new_state,
+                        "previous_state": self.current_state,
+                        "previous_since": self.state_since,
+                        "previous_duration": None,
+                        "previous_duration_str": None,
+                        "restarted_mid_session": False,
+                        "time": now,
+                    }
                 self.current_state = new_state
                 self.state_since = now.isoformat()
                 self.save_to_disk()
 
+        if transition is not None:
+            for callback in self.listeners:
+                try:
+                    callback(transition)
+                except Exception as e:
+                    logger.error("Error in breaker state listener: %s", e)
+
+    def get_current_seconds(self) -> Optional[float]:
+        """Seconds the breaker has been in its current state."""
+        if self.state_since is None:
+            return None
+        return (clock.now() - datetime.fromisoformat(self.state_since)).total_seconds()
+
     def get_current_duration(self) -> Optional[str]:
         """Get how long the breaker has been in current state."""
         if self.state_since is None:
             return None
 
-        now = datetime.now(timezone.utc)
+        now = clock.now()
         since = datetime.fromisoformat(self.state_since)
         duration = (now - since).total_seconds()
 
@@ -245,12 +396,26 @@ class BreakerStateTracker:
 
     def get_history(self, hours: int = 24):
         """Get state change history for the last N hours."""
-        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
+        cutoff = clock.now() - timedelta(hours=hours)
         cutoff_str = cutoff.isoformat()
 
         with self.lock:
             return [h for h in self.history if h.get("timestamp", "") >= cutoff_str]
 
+    def get_sessions_page(self, page: int = 1, per_page: int = 15):
+        """Newest-first page of ON sessions from the index.
+
+        Returns (lines, total_sessions, total_pages); page is clamped to range.
+        """
+        with self.lock:
+            total = len(self.sessions)
+            pages = max(1, -(-total // per_page))
+            page = min(max(page, 1), pages)
+            end = total - (page - 1) * per_page
+            start = max(0, end - per_page)
+            lines = [s["line"] for s in reversed(self.sessions[start:end])]
+        return lines, total, pages
+
 
 # Global instances
 temp_logger = TemperatureLogger()
@@ -0,0 +1,263 @@
+"""
+Resilient Device I/O Policies
+
+Shared call policy for YoLink (cloud) and Tuya (LAN) requests:
+- per-call timeouts
+- exponential backoff with full jitter between retries (via tenacity)
+- a circuit breaker that opens after repeated failures and lets a single
+  half-open probe through once its reset timeout expires
+- a retry budget so retries can't multiply traffic during an outage
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    Retrying,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+import config
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the device while its circuit is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, next probe in {int(retry_in)}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe -> closed."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30,
+                 max_reset_timeout: float = 600):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self._reset_timeout = reset_timeout
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self, name: str):
+        """Raise CircuitOpenError unless a call may go through right now."""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self._open_until:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            raise CircuitOpenError(name, max(0.0, self._open_until - now))
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._reset_timeout = self.base_reset_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN:
+                # Probe failed - back off further before the next one
+                self._reset_timeout = min(self._reset_timeout * 2, self.max_reset_timeout)
+                self._trip()
+            elif self.consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    def release_probe(self):
+        """The probe ended without an outcome (cancelled): let the next call probe again."""
+        with self.lock:
+            self._probe_in_flight = False
+
+    def _trip(self):
+        # Jitter the reopen time so several breakers don't probe in lockstep
+        timeout = self._reset_timeout * random.uniform(0.8, 1.2)
+        self.state = self.OPEN
+        self.opened_count += 1
+        self._open_until = time.monotonic() + timeout
+        self._probe_in_flight = False
+
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of first attempts."""
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        """Credit the budget for a first attempt."""
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Spend one token on a retry; False if the budget is exhausted."""
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class IOPolicy:
+    """Timeout + retry + circuit breaker + retry budget for one device/API."""
+
+    def __init__(self, name: str, timeout: float = 10, attempts: int = 3,
+                 backoff_base: float = 1, backoff_max: float = 10,
+                 failure_threshold: int = 5, reset_timeout: float = 30,
+                 max_reset_timeout: float = 600, retry_ratio: float = 0.2,
+                 no_retry: tuple = ()):
+        self.name = name
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.no_retry = no_retry
+        self.circuit = CircuitBreaker(failure_threshold, reset_timeout, max_reset_timeout)
+        self.budget = RetryBudget(retry_ratio)
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.last_error: Optional[str] = None
+
+    def _should_retry(self, retry_state: RetryCallState) -> bool:
+        """tenacity retry predicate: retry failures while the budget allows."""
+        outcome = retry_state.outcome
+        if not outcome.failed:
+            return False
+        error = outcome.exception()
+        if not isinstance(error, Exception):
+            return False  # Cancellation / interrupt
+        if isinstance(error, CircuitOpenError) or isinstance(error, self.no_retry):
+            return False
+        if self.circuit.state != CircuitBreaker.CLOSED:
+            return False
+        if retry_state.attempt_number >= self.attempts:
+            return False  # Last attempt: no retry follows, so don't spend budget
+        if not self.budget.withdraw():
+            return False
+        self.retries += 1
+        return True
+
+    def _record(self, error: Optional[BaseException], on_error: Optional[Callable]):
+        if error is None:
+            self.circuit.record_success()
+            self.last_error = None
+            return
+        if isinstance(error, CircuitOpenError):
+            return
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        self.circuit.record_failure()
+        if on_error:
+            on_error(error)
+
+    def _retrying_kwargs(self) -> dict:
+        return dict(
+            stop=stop_after_attempt(self.attempts),
+            wait=wait_random_exponential(multiplier=self.backoff_base, max=self.backoff_max),
+            retry=self._should_retry,
+            reraise=True,
+        )
+
+    async def call_async(self, fn: Callable, *args, on_error: Optional[Callable] = None, **kwargs):
+        """Await fn(*args, **kwargs) under this policy.
+
+        on_error(exc) runs after every failed attempt (e.g. to drop a
+        rejected auth token before the next retry).
+        """
+        self.calls += 1
+        self.budget.deposit()
+        async for attempt in AsyncRetrying(**self._retrying_kwargs()):
+            with attempt:
+                self.circuit.before_call(self.name)
+                try:
+                    result = await asyncio.wait_for(fn(*args, **kwargs), timeout=self.timeout)
+                except Exception as e:  # Not cancellation: that's no device failure
+                    self._record(e, on_error)
+                    raise
+                except BaseException:
+                    self.circuit.release_probe()
+                    raise
+                self._record(None, on_error)
+                return result
+
+    def call_sync(self, fn: Callable, *args, on_error: Optional[Callable] = None, **kwargs):
+        """Call a blocking fn(*args, **kwargs) under this policy.
+
+        Blocking calls can't be cancelled from here, so the timeout must be
+        enforced by the callee (e.g. the device's socket timeout).
+        """
+        self.calls += 1
+        self.budget.deposit()
+        for attempt in Retrying(**self._retrying_kwargs()):
+            with attempt:
+                self.circuit.before_call(self.name)
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:  # Not cancellation: that's no device failure
+                    self._record(e, on_error)
+                    raise
+                except BaseException:
+                    self.circuit.release_probe()
+                    raise
+                self._record(None, on_error)
+                return result
+
+    def stats(self) -> dict:
+        """Summary for /health."""
+        return {
+            "circuit": self.circuit.state,
+            "consecutive_failures": self.circuit.consecutive_failures,
+            "circuit_opened": self.circuit.opened_count,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "retry_budget": round(self.budget.tokens, 2),
+            "last_error": self.last_error,
+        }
+
+
+# Global policies (one per device family)
+yolink_policy = IOPolicy(
+    "yolink",
+    timeout=getattr(config, "YOLINK_TIMEOUT", 15),
+    attempts=getattr(config, "IO_RETRY_ATTEMPTS", 3),
+    failure_threshold=getattr(config, "IO_CIRCUIT_FAILURES", 5),
+    reset_timeout=getattr(config, "IO_CIRCUIT_RESET", 30),
+    max_reset_timeout=getattr(config, "IO_CIRCUIT_RESET_MAX", 600),
+)
+tuya_policy = IOPolicy(
+    "tuya",
+    timeout=getattr(config, "TUYA_TIMEOUT", 5),
+    attempts=getattr(config, "IO_RETRY_ATTEMPTS", 3),
+    backoff_base=0.5,
+    backoff_max=5,
+    failure_threshold=getattr(config, "IO_CIRCUIT_FAILURES", 5),
+    reset_timeout=getattr(config, "IO_CIRCUIT_RESET", 30),
+    max_reset_timeout=getattr(config, "IO_CIRCUIT_RESET_MAX", 600),
+)
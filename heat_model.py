@@ -0,0 +1,267 @@
+"""
+Heat-Up Model and Time-to-Ready Prediction
+
+Fits a first-order thermal model to heating sessions:
+
+    dT/dt = (T_inf - T) / tau
+
+i.e. a straight line dT/dt = a + b*T with tau = -1/b and T_inf = -a/b.
+The least-squares fit only needs five running sums (n, ΣT, ΣT², Σy, ΣTy),
+so:
+
+- each past session is reduced to its sums once (vectorized with NumPy over
+  its temperature series) and cached in heat_model.json by session start;
+- the prior over recent sessions is the sum of their cached sums,
+  recomputed only when a session ends;
+- the current session's sums are updated in O(1) per reading.
+
+Predicting is therefore constant-time on every poll, however many sessions
+are on record. The ETA to TELEGRAM_READY_TEMP follows from the model:
+
+    t = tau * ln((T_inf - T) / (T_inf - T_ready))
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import clock
+import config
+from data_logger import temp_logger, breaker_tracker, MIN_SESSION_SECONDS
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Readings further apart than this don't give a usable slope
+MAX_STEP_SECONDS = 600
+
+# Past sessions pooled into the prior, and how many samples it counts as
+# once the current session has data of its own
+PRIOR_SESSIONS = 20
+PRIOR_WEIGHT = 30
+
+# Sums layout: [n, ΣT, ΣT², Σy, ΣTy] with T = midpoint temperature, y = °C/min
+EMPTY_SUMS = [0.0, 0.0, 0.0, 0.0, 0.0]
+
+
+def series_sums(times, temps) -> list:
+    """Regression sums for one temperature series (epoch seconds, °C), vectorized."""
+    t = np.asarray(times, dtype=float)
+    temp = np.asarray(temps, dtype=float)
+    if len(t) < 2:
+        return list(EMPTY_SUMS)
+    dt = np.diff(t)
+    ok = (dt > 0) & (dt <= MAX_STEP_SECONDS)
+    x = ((temp[1:] + temp[:-1]) / 2)[ok]
+    y = (np.diff(temp)[ok] / dt[ok]) * 60
+    return [float(len(x)), float(x.sum()), float((x * x).sum()), float(y.sum()), float((x * y).sum())]
+
+
+def fit(sums) -> Optional[tuple]:
+    """(tau_seconds, t_inf) from regression sums, or None if not a heating curve."""
+    n, sx, sxx, sy, sxy = sums
+    if n < 3:
+        return None
+    denom = n * sxx - sx * sx
+    if denom <= 0:
+        return None
+    b = (n * sxy - sx * sy) / denom
+    a = (sy - b * sx) / n
+    if b >= 0:
+        return None  # Not relaxing towards an equilibrium
+    return -60 / b, -a / b
+
+
+class HeatModel:
+    """Per-session cached fits plus an incrementally updated current session."""
+
+    def __init__(self, filename="heat_model.json"):
+        self.filename = filename
+        self.sessions = {}  # session start (ISO8601) -> sums
+        self.prior = list(EMPTY_SUMS)
+        self.current = list(EMPTY_SUMS)
+        self._last_point = None  # (epoch, temp) of the previous reading this session
+        self.lock = threading.Lock()
+        if NUMPY_AVAILABLE:
+            self.load_from_disk()
+
+    def load_from_disk(self):
+        """Load cached session sums and add any sessions not fitted yet."""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    self.sessions = json.load(f)
+            except Exception as e:
+                logger.error("Error loading heat model: %s", e)
+                self.sessions = {}
+
+        added = 0
+        for session in list(breaker_tracker.sessions):
+            if session["timestamp"] in self.sessions:
+                continue
+            start = datetime.fromisoformat(session["timestamp"])
+            end = start + timedelta(seconds=session["duration_seconds"])
+            records = temp_logger.get_range(start, end)
+            if len(records) < 2:
+                continue  # Temperature history already expired
+            self.sessions[session["timestamp"]] = self._records_sums(records)
+            added += 1
+        if added:
+            self.save_to_disk()
+        self._update_prior()
+
+        # Restarted mid-session: replay the session so far
+        if breaker_tracker.current_state and breaker_tracker.state_since:
+            since = datetime.fromisoformat(breaker_tracker.state_since)
+            for r in temp_logger.get_range(since, clock.now()):
+                if r.get("temperature") is not None:
+                    self._add_point(datetime.fromisoformat(r["timestamp"]).timestamp(), r["temperature"])
+        logger.info("✓ Heat-up model ready (%s sessions)", len(self.sessions))
+
+    def save_to_disk(self):
+        try:
+            tmp = self.filename + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.sessions, f)
+            os.replace(tmp, self.filename)
+        except Exception as e:
+            logger.error("Error saving heat model: %s", e)
+
+    def state(self) -> dict:
+        """Cached session sums and the current session (published to web workers)."""
+        with self.lock:
+            return {"sessions": dict(self.sessions), "current": list(self.current),
+                    "last_point": self._last_point}
+
+    def apply_state(self, data: dict):
+        """Adopt a published state; the prior is refitted only when sessions changed."""
+        with self.lock:
+            sessions_changed = data["sessions"].keys() != self.sessions.keys()
+            self.sessions = data["sessions"]
+            self.current = data["current"]
+            self._last_point = tuple(data["last_point"]) if data.get("last_point") else None
+            if sessions_changed and NUMPY_AVAILABLE:
+                self._update_prior()
+
+    @staticmethod
+    def _records_sums(records) -> list:
+        points = [
+            (datetime.fromisoformat(r["timestamp"]).timestamp(), r["temperature"])
+            for r in records if r.get("temperature") is not None
+        ]
+        if not points:
+            return list(EMPTY_SUMS)
+        times, temps = zip(*points)
+        return series_sums(times, temps)
+
+    def _update_prior(self):
+        """Pool the most recent sessions' sums (only when a session is added)."""
+        recent = sorted(self.sessions)[-PRIOR_SESSIONS:]
+        if recent:
+            self.prior = np.sum([self.sessions[start] for start in recent], axis=0).tolist()
+        else:
+            self.prior = list(EMPTY_SUMS)
+
+    def _add_point(self, epoch: float, temp: float):
+        """Fold one reading into the current session's sums (O(1))."""
+        if self._last_point is not None:
+            dt = epoch - self._last_point[0]
+            if 0 < dt <= MAX_STEP_SECONDS:
+                x = (temp + self._last_point[1]) / 2
+                y = (temp - self._last_point[1]) / dt * 60
+                s = self.current
+                s[0] += 1
+                s[1] += x
+                s[2] += x * x
+                s[3] += y
+                s[4] += x * y
+        self._last_point = (epoch, temp)
+
+    def on_reading(self, reading):
+        """Supervisor sink: update the current session with a heating reading."""
+        temperature = reading.values.get("temperature")
+        if not NUMPY_AVAILABLE or temperature is None or not breaker_tracker.current_state:
+            return
+        with self.lock:
+            self._add_point(reading.timestamp.timestamp(), temperature)
+
+    def on_transition(self, transition: dict):
+        """BreakerStateTracker listener: start a session on ON, cache its fit on OFF."""
+        if not NUMPY_AVAILABLE:
+            return
+        with self.lock:
+            if transition.get("previous_state") is True and transition.get("previous_since") \
+                    and transition["previous_duration"] >= MIN_SESSION_SECONDS \
+                    and self.current[0] >= 3:
+                self.sessions[transition["previous_since"]] = list(self.current)
+                self._update_prior()
+                changed = True
+            else:
+                changed = False
+            self.current = list(EMPTY_SUMS)
+            self._last_point = None
+        if changed:
+            self.save_to_disk()
+
+    def _blended_sums(self) -> list:
+        """Current session plus the prior, scaled down once the session has its own data."""
+        prior_n = self.prior[0]
+        if prior_n <= 0:
+            return self.current
+        scale = 1.0 if self.current[0] < 3 else min(1.0, PRIOR_WEIGHT / prior_n)
+        return [c + p * scale for c, p in zip(self.current, self.prior)]
+
+    def predict(self, temperature: Optional[float] = None) -> Optional[dict]:
+        """Model parameters and ETA to the ready temperature while the heater is ON."""
+        if not NUMPY_AVAILABLE or not breaker_tracker.current_state:
+            return None
+        if temperature is None:
+            with self.lock:
+                temperature = self._last_point[1] if self._last_point else None
+        if temperature is None:
+            return None
+
+        with self.lock:
+            params = fit(self._blended_sums())
+        if params is None:
+            return None
+        tau, t_inf = params
+        ready_temp = getattr(config, "TELEGRAM_READY_TEMP", 90)
+
+        if temperature >= ready_temp:
+            eta = 0
+        elif t_inf <= ready_temp:
+            eta = None  # Model says it won't get there
+        else:
+            eta = int(tau * math.log((t_inf - temperature) / (t_inf - ready_temp)))
+        return {
+            "ready_temp": ready_temp,
+            "eta_seconds": eta,
+            "ready_at": (clock.now() + timedelta(seconds=eta)).isoformat()
+            if eta is not None else None,
+            "tau_minutes": round(tau / 60, 1),
+            "equilibrium_temp": round(t_inf, 1),
+        }
+
+
+def format_eta(prediction: Optional[dict]) -> Optional[str]:
+    """Short human-readable ETA ("~25m", "ready"), or None."""
+    if not prediction or prediction["eta_seconds"] is None:
+        return None
+    eta = prediction["eta_seconds"]
+    if eta <= 0:
+        return "ready"
+    return f"~{breaker_tracker._format_duration(max(eta, 60))}"
+
+
+# Global model instance
+heat_model = HeatModel()
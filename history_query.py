@@ -0,0 +1,243 @@
+"""
+Temperature History Range / Aggregation Queries
+
+Backs /api/temperature/history?start=&end=&bucket=5m&agg=avg,min,max.
+
+- The range is located by binary search (TemperatureLogger.get_range) and
+  bucketed in one vectorized NumPy pass (reduceat over bucket boundaries).
+- Results go into a bounded LRU cache keyed by the normalized query
+  (start/end aligned to the bucket, sorted aggregations).
+- New readings only mark the buckets they fall in as dirty; a cache hit
+  recomputes just those buckets. Larger changes (retention cleanup) drop
+  the affected entries.
+"""
+
+import bisect
+import math
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+import clock
+import config
+from data_logger import temp_logger
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+AGGREGATIONS = ("avg", "min", "max", "count")
+FIELDS = ("temperature", "humidity")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Changes spanning more buckets than this drop the cache entry instead
+MAX_DIRTY_BUCKETS = 8
+
+# Epoch range that datetime.fromtimestamp() handles in any local timezone
+MAX_EPOCH = datetime(9999, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+class QueryError(ValueError):
+    """Invalid query parameters (reported as HTTP 400)."""
+
+
+def parse_bucket(value: str) -> int:
+    """'5m' / '1h' / '300' -> seconds."""
+    match = re.fullmatch(r"(\d+)([smhd]?)", value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise QueryError(f"invalid bucket: {value!r}")
+    return int(match.group(1)) * UNITS[match.group(2) or "s"]
+
+
+def parse_time(value: str) -> float:
+    """ISO8601 or epoch seconds -> epoch seconds (naive ISO is UTC)."""
+    try:
+        epoch = float(value)
+    except ValueError:
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise QueryError(f"invalid time: {value!r}")
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        epoch = dt.timestamp()
+    if not (math.isfinite(epoch) and 0 <= epoch < MAX_EPOCH):  # inf, nan, year 10000+
+        raise QueryError(f"time out of range: {value!r}")
+    return epoch
+
+
+def parse_aggs(value: Optional[str]) -> Tuple[str, ...]:
+    aggs = tuple(sorted({a.strip() for a in (value or "avg").split(",") if a.strip()}))
+    unknown = [a for a in aggs if a not in AGGREGATIONS]
+    if unknown or not aggs:
+        raise QueryError(f"invalid agg: {value!r} (use {', '.join(AGGREGATIONS)})")
+    return aggs
+
+
+def aggregate(records: list, bucket: int, aggs: Tuple[str, ...]) -> list:
+    """Bucket time-ordered records in one vectorized pass; one row per non-empty bucket."""
+    if not records:
+        return []
+    if not NUMPY_AVAILABLE:
+        return _aggregate_python(records, bucket, aggs)
+    epochs = np.fromiter(
+        (datetime.fromisoformat(r["timestamp"]).timestamp() for r in records),
+        dtype=float, count=len(records),
+    )
+    keys = np.floor(epochs / bucket).astype(np.int64) * bucket
+    # Records are time-ordered, so each bucket is a contiguous run
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    bucket_keys = keys[starts]
+    columns = {"count": np.diff(np.r_[starts, len(keys)])}
+
+    for field in FIELDS:
+        values = np.array([r.get(field, np.nan) for r in records], dtype=float)
+        present = ~np.isnan(values)
+        if not present.any():
+            continue
+        counts = np.add.reduceat(present.astype(int), starts)
+        if "avg" in aggs:
+            sums = np.add.reduceat(np.where(present, values, 0.0), starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                columns[field] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        if "min" in aggs:
+            columns[f"{field}_min"] = np.fmin.reduceat(values, starts)
+        if "max" in aggs:
+            columns[f"{field}_max"] = np.fmax.reduceat(values, starts)
+
+    rows = []
+    for i, key in enumerate(bucket_keys.tolist()):
+        row = {"timestamp": datetime.fromtimestamp(key, timezone.utc).isoformat()}
+        for name, column in columns.items():
+            if name == "count":
+                if "count" in aggs:
+                    row["count"] = int(column[i])
+                continue
+            value = float(column[i])
+            row[name] = None if value != value else round(value, 2)
+        rows.append((key, row))
+    return rows
+
+
+def _number(value) -> Optional[float]:
+    return None if value is None or value != value else float(value)
+
+
+def _aggregate_python(records: list, bucket: int, aggs: Tuple[str, ...]) -> list:
+    """aggregate() without numpy: same rows, one record at a time."""
+    groups = []  # [(bucket epoch, records)], time-ordered
+    for r in records:
+        key = int(datetime.fromisoformat(r["timestamp"]).timestamp() // bucket) * bucket
+        if groups and groups[-1][0] == key:
+            groups[-1][1].append(r)
+        else:
+            groups.append((key, [r]))
+    fields = [f for f in FIELDS if any(_number(r.get(f)) is not None for r in records)]
+
+    rows = []
+    for key, group in groups:
+        row = {"timestamp": datetime.fromtimestamp(key, timezone.utc).isoformat()}
+        if "count" in aggs:
+            row["count"] = len(group)
+        for field in fields:
+            values = [v for v in (_number(r.get(field)) for r in group) if v is not None]
+            if "avg" in aggs:
+                row[field] = round(sum(values) / len(values), 2) if values else None
+            if "min" in aggs:
+                row[f"{field}_min"] = round(min(values), 2) if values else None
+            if "max" in aggs:
+                row[f"{field}_max"] = round(max(values), 2) if values else None
+        rows.append((key, row))
+    return rows
+
+
+class HistoryQueryCache:
+    """Bounded LRU of aggregated results with per-bucket invalidation."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> {"keys": [bucket epochs], "rows": [rows], "dirty": set()}
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.partial = 0
+
+    def query(self, start: Optional[float], end: Optional[float], bucket: int,
+              aggs: Tuple[str, ...]) -> list:
+        """Aggregated rows for [start, end); None bounds mean oldest / open-ended."""
+        start = None if start is None else start // bucket * bucket
+        end = None if end is None else -(-end // bucket) * bucket
+        key = (start, end, bucket, aggs)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                pairs = aggregate(self._records(start, end), bucket, aggs)
+                entry = {"keys": [k for k, _ in pairs], "rows": [r for _, r in pairs], "dirty": set()}
+                self.entries[key] = entry
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+            else:
+                self.entries.move_to_end(key)
+                if entry["dirty"]:
+                    self.partial += 1
+                    for bucket_start in sorted(entry["dirty"]):
+                        self._refresh_bucket(entry, bucket_start, bucket, aggs)
+                    entry["dirty"].clear()
+                else:
+                    self.hits += 1
+            return list(entry["rows"])
+
+    @staticmethod
+    def _records(start: Optional[float], end: Optional[float]) -> list:
+        lo = datetime.fromtimestamp(start if start is not None else 0, timezone.utc)
+        hi = datetime.fromtimestamp(end, timezone.utc) if end is not None else clock.now()
+        records = temp_logger.get_range(lo, hi, include_pending=False)
+        if end is not None and records and records[-1]["timestamp"] >= hi.isoformat():
+            records = records[:-1]  # Half-open range
+        return records
+
+    def _refresh_bucket(self, entry: dict, bucket_start: int, bucket: int, aggs: Tuple[str, ...]):
+        """Recompute one bucket and splice it into the cached rows."""
+        pairs = aggregate(self._records(bucket_start, bucket_start + bucket), bucket, aggs)
+        i = bisect.bisect_left(entry["keys"], bucket_start)
+        exists = i < len(entry["keys"]) and entry["keys"][i] == bucket_start
+        if pairs:
+            if exists:
+                entry["rows"][i] = pairs[0][1]
+            else:
+                entry["keys"].insert(i, bucket_start)
+                entry["rows"].insert(i, pairs[0][1])
+        elif exists:
+            del entry["keys"][i]
+            del entry["rows"][i]
+
+    def invalidate(self, first_epoch: float, last_epoch: float):
+        """TemperatureLogger listener: data in [first_epoch, last_epoch] changed."""
+        with self.lock:
+            for key in list(self.entries):
+                start, end, bucket, _ = key
+                lo = max(first_epoch, start if start is not None else first_epoch)
+                hi = min(last_epoch, end - 1e-6 if end is not None else last_epoch)
+                if lo > hi:
+                    continue  # Change is outside this query's range
+                first_bucket, last_bucket = int(lo // bucket), int(hi // bucket)
+                if last_bucket - first_bucket >= MAX_DIRTY_BUCKETS:
+                    del self.entries[key]
+                else:
+                    self.entries[key]["dirty"].update(
+                        b * bucket for b in range(first_bucket, last_bucket + 1)
+                    )
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits,
+                    "partial": self.partial, "misses": self.misses}
+
+
+# Global cache, kept current by the temperature logger
+history_cache = HistoryQueryCache(getattr(config, "HISTORY_CACHE_SIZE", 64))
+temp_logger.add_listener(history_cache.invalidate)
@@ -0,0 +1,142 @@
+"""
+Managed HTTP Client for YoLink API Calls
+
+Builds the aiohttp session used for token refresh and device calls with a
+tuned connection pool (keep-alive across polls, DNS cache, limits), explicit
+total/connect timeouts, and request tracing that records latency and error
+counts per logical endpoint (e.g. "THSensor.getState").
+"""
+
+import contextlib
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import aiohttp
+
+import config
+
+# Logical endpoint name for requests made in the current task. All YoLink
+# device calls POST to the same URL, so the URL path alone isn't useful.
+current_endpoint: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_endpoint", default=None
+)
+
+
+@contextlib.contextmanager
+def endpoint(name: str):
+    """Attribute HTTP requests made inside this block to `name`."""
+    token = current_endpoint.set(name)
+    try:
+        yield
+    finally:
+        current_endpoint.reset(token)
+
+
+class EndpointStats:
+    """Per-endpoint request counters and recent latencies."""
+
+    RECENT_SAMPLES = 100
+
+    def __init__(self):
+        self.endpoints = {}  # name -> {"requests", "errors", "total_ms", "max_ms", "last_ms", "recent"}
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.lock = threading.Lock()
+
+    def record(self, name: str, latency_ms: float, error: Optional[str] = None):
+        with self.lock:
+            entry = self.endpoints.get(name)
+            if entry is None:
+                entry = self.endpoints[name] = {
+                    "requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "last_ms": None, "last_error": None,
+                    "recent": deque(maxlen=self.RECENT_SAMPLES),
+                }
+            entry["requests"] += 1
+            entry["total_ms"] += latency_ms
+            entry["max_ms"] = max(entry["max_ms"], latency_ms)
+            entry["last_ms"] = latency_ms
+            entry["recent"].append(latency_ms)
+            if error:
+                entry["errors"] += 1
+                entry["last_error"] = error
+
+    def snapshot(self) -> dict:
+        """JSON-friendly summary (avg/p95 over recent requests)."""
+        with self.lock:
+            result = {}
+            for name, entry in self.endpoints.items():
+                recent = sorted(entry["recent"])
+                result[name] = {
+                    "requests": entry["requests"],
+                    "errors": entry["errors"],
+                    "avg_ms": round(entry["total_ms"] / entry["requests"], 1),
+                    "p95_ms": round(recent[int(0.95 * (len(recent) - 1))], 1) if recent else None,
+                    "max_ms": round(entry["max_ms"], 1),
+                    "last_ms": round(entry["last_ms"], 1),
+                    "last_error": entry["last_error"],
+                }
+            return {
+                "endpoints": result,
+                "connections_created": self.connections_created,
+                "connections_reused": self.connections_reused,
+            }
+
+
+def _trace_config(stats: EndpointStats) -> aiohttp.TraceConfig:
+    """aiohttp hooks feeding EndpointStats."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+        ctx.endpoint = current_endpoint.get() or f"{params.method} {params.url.path}"
+
+    async def on_request_end(session, ctx, params):
+        latency_ms = (time.perf_counter() - ctx.start) * 1000
+        status = params.response.status
+        stats.record(ctx.endpoint, latency_ms, f"HTTP {status}" if status >= 400 else None)
+
+    async def on_request_exception(session, ctx, params):
+        latency_ms = (time.perf_counter() - ctx.start) * 1000
+        stats.record(ctx.endpoint, latency_ms, type(params.exception).__name__)
+
+    async def on_connection_create_end(session, ctx, params):
+        stats.connections_created += 1
+
+    async def on_connection_reuseconn(session, ctx, params):
+        stats.connections_reused += 1
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    trace.on_connection_create_end.append(on_connection_create_end)
+    trace.on_connection_reuseconn.append(on_connection_reuseconn)
+    return trace
+
+
+def create_session(stats: Optional[EndpointStats] = None) -> aiohttp.ClientSession:
+    """Create the pooled, instrumented session (must run inside the event loop)."""
+    connector = aiohttp.TCPConnector(
+        limit=getattr(config, "HTTP_POOL_LIMIT", 10),
+        limit_per_host=getattr(config, "HTTP_POOL_LIMIT_PER_HOST", 4),
+        ttl_dns_cache=getattr(config, "HTTP_DNS_CACHE_TTL", 300),
+        # Keep idle connections alive across poll intervals so polls reuse them
+        keepalive_timeout=getattr(config, "HTTP_KEEPALIVE", config.REFRESH_INTERVAL + 30),
+        enable_cleanup_closed=True,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=getattr(config, "HTTP_TOTAL_TIMEOUT", 20),
+        connect=getattr(config, "HTTP_CONNECT_TIMEOUT", 5),
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        trace_configs=[_trace_config(stats or http_stats)],
+    )
+
+
+# Global stats shared by all sessions
+http_stats = EndpointStats()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+HTTP Load Test for the Share Page
+
+Starts the web server with the simulated sauna driver and a synthetic
+history of each requested retention size. It then drives concurrent
+viewers that behave like the dashboard: each opens /, loads /api/timeline,
+then polls /api/temperature + /api/timeline every --poll seconds. Every
+--history-every polls a viewer also fetches /api/temperature/history.
+Viewers arrive over --ramp seconds, like a link dropped into a group chat.
+
+For each concurrency level it reports p50/p95/p99 latency per endpoint,
+throughput, error rate and server CPU / peak RSS. The concurrency ceiling is
+the highest level that kept p95 under --slo-ms and errors under 1%.
+
+Usage:
+    python loadtest.py                                # 30d and 1y, 10..200 viewers
+    python loadtest.py --sizes 30d --concurrency 25,50,100,400 --duration 30
+    python loadtest.py --url http://127.0.0.1:8000 --pid 1234   # an already running server
+
+Server CPU/RSS uses psutil when installed, else /proc (Linux).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import aiohttp
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SIZES = {"30d": 30, "1y": 365, "5y": 1826}
+ERROR_RATE_LIMIT = 0.01
+
+
+# ---------------------------------------------------------------------------
+# Server under test
+# ---------------------------------------------------------------------------
+
+def serve(days: int, port: int):
+    """Child process: seed a synthetic history in the cwd and run web_server.main()."""
+    sys.path.insert(0, REPO_DIR)
+    from benchmark import generate_history
+
+    records, breaker_history, off_since = generate_history(days)
+    with open("temperature_history.json", "w") as f:
+        json.dump(records, f)
+    with open("breaker_history.json", "w") as f:
+        json.dump({"current_state": False, "state_since": off_since.isoformat(),
+                   "history": breaker_history}, f)
+
+    import config
+    config.HOST = "127.0.0.1"
+    config.PORT = port
+    config.SENSOR_DRIVERS = ["simulated"]
+    config.TEMP_RETENTION_DAYS = days + 1
+    config.TELEGRAM_ENABLED = False
+    config.TUYA_ENABLED = False
+    config.LOG_LEVEL = "WARNING"
+    import web_server
+    web_server.main()
+
+
+def start_server(days: int, port: int, workdir: str) -> subprocess.Popen:
+    log = open(os.path.join(workdir, "server.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(days), "--port", str(port)],
+        cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")]))},
+    )
+
+
+async def wait_until_up(url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url + "/health") as response:
+                    await response.read()
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up within {timeout:.0f}s")
+
+
+class ProcessSampler:
+    """Samples a process's CPU time and RSS in the background."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.rss_peak = 0
+        self._cpu_start = None
+        self._task = None
+
+    def _read(self):
+        """(cpu seconds, rss bytes) or None if unavailable."""
+        if PSUTIL_AVAILABLE:
+            proc = psutil.Process(self.pid)
+            times = proc.cpu_times()
+            return times.user + times.system, proc.memory_info().rss
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            cpu = (int(fields[11]) + int(fields[12])) / ticks
+            rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+            return cpu, rss
+        except (OSError, IndexError, ValueError):
+            return None
+
+    async def _loop(self):
+        while True:
+            sample = self._read()
+            if sample:
+                self.rss_peak = max(self.rss_peak, sample[1])
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        sample = self._read()
+        self._cpu_start = (sample[0], time.monotonic()) if sample else None
+        self.rss_peak = sample[1] if sample else 0
+        self._task = asyncio.ensure_future(self._loop())
+
+    def stop(self) -> dict:
+        self._task.cancel()
+        sample = self._read()
+        if not sample or not self._cpu_start:
+            return {"cpu_percent": None, "rss_peak_mb": None}
+        cpu_start, wall_start = self._cpu_start
+        wall = time.monotonic() - wall_start
+        return {
+            "cpu_percent": round((sample[0] - cpu_start) / wall * 100, 1),
+            "rss_peak_mb": round(max(self.rss_peak, sample[1]) / 1e6, 1),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Viewers
+# ---------------------------------------------------------------------------
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # endpoint -> [seconds]
+        self.errors = defaultdict(int)
+        self.bytes = 0
+
+    def summary(self, wall: float) -> dict:
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 1) if values else None
+
+        endpoints = {}
+        everything = []
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            everything.extend(values)
+            endpoints[name] = {"requests": len(values), "errors": self.errors[name],
+                               "p50_ms": pct(values, 0.50), "p95_ms": pct(values, 0.95),
+                               "p99_ms": pct(values, 0.99)}
+        everything.sort()
+        requests = len(everything)
+        errors = sum(self.errors.values())
+        return {
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / wall, 1),
+            "mb_sent": round(self.bytes / 1e6, 1),
+            "p50_ms": pct(everything, 0.50),
+            "p95_ms": pct(everything, 0.95),
+            "p99_ms": pct(everything, 0.99),
+            "endpoints": endpoints,
+        }
+
+
+async def fetch(session: aiohttp.ClientSession, url: str, name: str, results: Results):
+    start = time.perf_counter()
+    try:
+        async with session.get(url) as response:
+            body = await response.read()
+            if response.status >= 500:
+                results.errors[name] += 1
+            results.bytes += len(body)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        results.errors[name] += 1
+    results.latencies[name].append(time.perf_counter() - start)
+
+
+async def viewer(session, base: str, results: Results, deadline: float, delay: float,
+                 poll: float, history_every: int):
+    """One dashboard tab: page load, then periodic refreshes until the deadline."""
+    await asyncio.sleep(delay)
+    await fetch(session, base + "/", "/", results)
+    await fetch(session, base + "/api/timeline", "/api/timeline", results)
+    polls = 0
+    # Tabs aren't synchronized: first refresh lands anywhere in the interval
+    await asyncio.sleep(random.uniform(0, poll))
+    while time.monotonic() < deadline:
+        await fetch(session, base + "/api/temperature", "/api/temperature", results)
+        await fetch(session, base + "/api/timeline", "/api/timeline", results)
+        polls += 1
+        if history_every and polls % history_every == 0:
+            await fetch(session, base + "/api/temperature/history", "/api/temperature/history", results)
+        await asyncio.sleep(poll)
+
+
+async def run_level(base: str, concurrency: int, args, pid) -> dict:
+    results = Results()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+    sampler = ProcessSampler(pid) if pid else None
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        if sampler:
+            sampler.start()
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            viewer(session, base, results, deadline, random.uniform(0, args.ramp), args.poll, args.history_every)
+            for _ in range(concurrency)
+        ))
+        wall = time.monotonic() - start
+    summary = results.summary(wall)
+    summary["concurrency"] = concurrency
+    summary.update(sampler.stop() if sampler else {"cpu_percent": None, "rss_peak_mb": None})
+    return summary
+
+
+def print_level(level: dict):
+    cpu = f"{level['cpu_percent']}%" if level["cpu_percent"] is not None else "n/a"
+    rss = f"{level['rss_peak_mb']} MB" if level["rss_peak_mb"] is not None else "n/a"
+    print(f"  {level['concurrency']:>5} viewers: {level['throughput_rps']:>7} req/s  "
+          f"p50 {level['p50_ms']} / p95 {level['p95_ms']} / p99 {level['p99_ms']} ms  "
+          f"errors {level['error_rate']:.1%}  cpu {cpu}  rss {rss}")
+    for name, stats in level["endpoints"].items():
+        print(f"        {name:<28}{stats['requests']:>7} req  p50 {stats['p50_ms']:>7}  "
+              f"p95 {stats['p95_ms']:>7}  p99 {stats['p99_ms']:>7} ms  errors {stats['errors']}")
+
+
+def ceiling(levels: list, slo_ms: float):
+    """Highest concurrency that met the latency SLO and error limit (None if none did)."""
+    best = None
+    for level in levels:
+        if level["error_rate"] > ERROR_RATE_LIMIT or (level["p95_ms"] or 0) > slo_ms:
+            break
+        best = level["concurrency"]
+    return best
+
+
+async def run(args) -> dict:
+    levels = [int(c) for c in args.concurrency.split(",")]
+    report = {}
+    targets = [("external", None)] if args.url else [(s, SIZES[s]) for s in args.sizes.split(",")]
+    for label, days in targets:
+        process = None
+        if args.url:
+            base, pid = args.url.rstrip("/"), args.pid
+        else:
+            workdir = tempfile.mkdtemp(prefix=f"sauna-load-{label}-")
+            print(f"\nStarting server with {label} of history ({workdir})...", flush=True)
+            process = start_server(days, args.port, workdir)
+            base, pid = f"http://127.0.0.1:{args.port}", process.pid
+        try:
+            await wait_until_up(base)
+            print(f"{label}:")
+            results = []
+            for concurrency in levels:
+                level = await run_level(base, concurrency, args, pid)
+                print_level(level)
+                results.append(level)
+            best = ceiling(results, args.slo_ms)
+            print(f"  Concurrency ceiling (p95 < {args.slo_ms:g} ms, errors < {ERROR_RATE_LIMIT:.0%}): "
+                  f"{best if best is not None else f'below {levels[0]}'}"
+                  f"{'+' if best == levels[-1] else ''}")
+            report[label] = {"levels": results, "ceiling": best}
+        finally:
+            if process:
+                process.send_signal(signal.SIGTERM)
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="30d,1y", help="retention sizes: " + ", ".join(SIZES))
+    parser.add_argument("--concurrency", default="10,25,50,100,200", help="viewer counts, ascending")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--ramp", type=float, default=5, help="viewers arrive over this many seconds")
+    parser.add_argument("--poll", type=float, default=5,
+                        help="seconds between dashboard refreshes (the page uses 30; lower = more load)")
+    parser.add_argument("--history-every", type=int, default=10,
+                        help="fetch /api/temperature/history every N refreshes (0 = never)")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout")
+    parser.add_argument("--slo-ms", type=float, default=1000, help="p95 latency target for the ceiling")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--url", help="load-test a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="with --url: server pid for CPU/RSS")
+    parser.add_argument("--output", help="write the report JSON here")
+    parser.add_argument("--serve", type=int, metavar="DAYS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve, args.port)
+        return 0
+
+    unknown = [s for s in args.sizes.split(",") if s not in SIZES]
+    if unknown and not args.url:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
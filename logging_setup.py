@@ -0,0 +1,150 @@
+"""
+Non-blocking Structured Logging
+
+All modules log through the standard `logging` module
+(logger = logging.getLogger(__name__)). setup_logging() routes every record
+through a QueueHandler, so the calling thread (a poll loop, a request) only
+does an enqueue; formatting and file/console I/O happen on a QueueListener
+thread.
+
+- Levels: LOG_LEVEL (default INFO)
+- Rate limiting: at most LOG_RATE_LIMIT messages per LOG_RATE_WINDOW seconds
+  for each distinct message template (e.g. "poll failed: %s" during an
+  outage); the next message after a quiet period reports how many were
+  suppressed
+- Output: LOG_FORMAT "text" (default) or "json" (one object per line)
+- Files: LOG_FILE with size-based rotation (LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop repeats of the same message template beyond `limit` per `window` seconds."""
+
+    def __init__(self, limit: int = 5, window: float = 300):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.lock = threading.Lock()
+        self.buckets = {}  # (logger, template) -> [window_start, count, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else repr(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self.buckets[key] = [now, 1, 0]
+                if len(self.buckets) > 1000:
+                    self._expire(now)
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if bucket[1] < self.limit:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            return False
+
+    def _expire(self, now: float):
+        for key in [k for k, b in self.buckets.items() if now - b[0] >= self.window and not b[2]]:
+            del self.buckets[key]
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks must be rendered while the frames still exist
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (suppressed {suppressed} similar)" if suppressed else text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging():
+    """Install the queue handler on the root logger and start the listener (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if getattr(config, "LOG_FORMAT", "text") == "json" \
+        else TextFormatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    log_file = getattr(config, "LOG_FILE", None)
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=getattr(config, "LOG_MAX_BYTES", 5 * 1024 * 1024),
+            backupCount=getattr(config, "LOG_BACKUP_COUNT", 3),
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RateLimitFilter(
+        getattr(config, "LOG_RATE_LIMIT", 5), getattr(config, "LOG_RATE_WINDOW", 300)
+    ))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(getattr(config, "LOG_LEVEL", "INFO"))
+    # Chatty third-party loggers stay at WARNING
+    for name in ("httpx", "telegram", "werkzeug", "tinytuya"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
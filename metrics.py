@@ -0,0 +1,265 @@
+"""
+Prometheus-style Metrics
+
+Counters, gauges and histograms rendered in the Prometheus text format at
+/metrics. No client library is needed.
+
+Hot paths stay lock-free: every thread records into its own shard of a
+metric (only that thread writes it), and a scrape sums the shards. The only
+lock is taken once per thread per metric, when its shard is created.
+
+Metrics:
+    sauna_yolink_get_state_seconds       YoLink getState latency
+    sauna_tuya_status_seconds            Tuya status() latency
+    sauna_save_seconds{file}             save_to_disk duration
+    sauna_save_bytes{file}               bytes written by save_to_disk
+    sauna_http_request_seconds{route}    Flask handler latency
+    sauna_lock_wait_seconds{lock}        time spent waiting for a lock
+    sauna_telegram_send_seconds          Telegram send latency
+    sauna_poll_staleness_seconds{source} age of the latest reading
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LOCK_BUCKETS = (0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Sharded:
+    """Per-thread storage: hot-path writes never contend.
+
+    Shards of finished threads (the web server uses a thread per request)
+    are folded into a base total when new shards are created.
+    """
+
+    COMPACT_EVERY = 32
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._base = [0.0] * size
+        self._shards = []  # (thread, shard)
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> list:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._shards_lock:
+                if len(self._shards) >= self.COMPACT_EVERY:
+                    self._compact()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _compact(self):
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for i, value in enumerate(shard):
+                    self._base[i] += value
+        self._shards = live
+
+    def _totals(self) -> list:
+        with self._shards_lock:
+            totals = list(self._base)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class Counter(_Sharded):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1):
+        self._shard()[0] += amount
+
+    def samples(self, name, labels):
+        yield f"{name}_total{_format_labels(labels)} {_format_value(self._totals()[0])}"
+
+
+class Histogram(_Sharded):
+    """Cumulative-bucket histogram; shard layout is [bucket counts..., +Inf, sum]."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(len(self.buckets) + 2)
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self, name, labels):
+        totals = self._totals()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), totals[:-1]):
+            cumulative += count
+            le = 'le="%s"' % _format_value(bound)
+            yield f"{name}_bucket{_format_labels(labels, le)} {_format_value(cumulative)}"
+        yield f"{name}_sum{_format_labels(labels)} {_format_value(totals[-1])}"
+        yield f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}"
+
+
+class Gauge:
+    """Value computed at scrape time."""
+
+    def __init__(self, fn: Callable[[], Optional[float]]):
+        self.fn = fn
+
+    def samples(self, name, labels):
+        try:
+            value = self.fn()
+        except Exception:
+            value = None
+        if value is not None:
+            yield f"{name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Family:
+    """A named metric with optional labels; children are created on first use."""
+
+    def __init__(self, name: str, kind: str, help_text: str, factory: Callable, label_names=()):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.factory = factory
+        self.label_names = tuple(label_names)
+        self.children: Dict[Tuple, object] = {}
+        self.lock = threading.Lock()
+        if not self.label_names:
+            self.children[()] = factory()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.factory())
+        return child
+
+    # Unlabelled shortcuts
+    def observe(self, value: float):
+        self.children[()].observe(value)
+
+    def time(self):
+        return self.children[()].time()
+
+    def inc(self, amount: float = 1):
+        self.children[()].inc(amount)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for key, child in list(self.children.items()):
+            yield from child.samples(self.name, tuple(zip(self.label_names, key)))
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS) -> Family:
+        family = Family(name, "histogram", help_text, lambda: Histogram(buckets), labels)
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help_text, labels=()) -> Family:
+        family = Family(name, "counter", help_text, Counter, labels)
+        self.families.append(family)
+        return family
+
+    def gauge(self, name, help_text, labels=()) -> Family:
+        family = Family(name, "gauge", help_text, None, labels)
+        self.families.append(family)
+        return family
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+class TimedLock:
+    """Wraps a Lock/RLock and records how long acquiring it waited."""
+
+    def __init__(self, lock, histogram: Histogram):
+        self._lock = lock
+        self._histogram = histogram
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        self._histogram.observe(time.perf_counter() - start)
+        return acquired
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+registry = Registry()
+
+yolink_latency = registry.histogram(
+    "sauna_yolink_get_state_seconds", "YoLink getState call latency")
+tuya_latency = registry.histogram(
+    "sauna_tuya_status_seconds", "Tuya status() call latency")
+save_duration = registry.histogram(
+    "sauna_save_seconds", "save_to_disk duration", labels=("file",))
+save_bytes = registry.histogram(
+    "sauna_save_bytes", "Bytes written by save_to_disk", labels=("file",), buckets=SIZE_BUCKETS)
+http_latency = registry.histogram(
+    "sauna_http_request_seconds", "HTTP handler latency", labels=("route",))
+lock_wait = registry.histogram(
+    "sauna_lock_wait_seconds", "Time spent waiting to acquire a lock", labels=("lock",),
+    buckets=LOCK_BUCKETS)
+telegram_latency = registry.histogram(
+    "sauna_telegram_send_seconds", "Telegram send_message latency")
+poll_staleness = registry.gauge(
+    "sauna_poll_staleness_seconds", "Seconds since the latest reading", labels=("source",))
+
+
+def register_staleness(source: str, fn: Callable[[], Optional[float]]):
+    """Expose `now - fn()` (epoch seconds of the latest reading) as poll staleness."""
+    def staleness():
+        last = fn()
+        return None if last is None else round(time.time() - last, 3)
+    poll_staleness.children[(source,)] = Gauge(staleness)
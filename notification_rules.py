@@ -0,0 +1,214 @@
+"""
+Declarative Notification Rules
+
+Event-driven notifications (heater on/off, sauna ready, custom alerts) are
+described as rules in config.NOTIFICATION_RULES, compiled once at startup,
+and evaluated incrementally against each event:
+
+- "reading" events: every sensor sample, with the current heater state
+- "transition" events: breaker ON/OFF changes
+
+Each rule keeps O(1) state (condition start time, last firing, fired in
+this session), so adding a rule adds no threads or extra polling.
+
+Rule fields (all optional except name, on and an action/message):
+    name              unique name
+    on                "reading" or "transition"
+    to                transition target state (True = heater ON)
+    metric/op/value   threshold on an event field, e.g. temperature >= 90
+    heater            only while the heater is ON (True) / OFF (False)
+    min_duration      transition: previous state lasted at least N seconds
+    for_seconds       condition must hold this long before firing
+    debounce          minimum seconds between firings
+    once_per_session  fire at most once until the next breaker transition
+    quiet_hours       [start_hour, end_hour] local time to stay silent
+    action            TelegramNotifier method name, called with the event
+    message           template formatted with the event fields (instead of action)
+"""
+
+import logging
+import operator
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import clock
+import config
+
+try:
+    from telegram_bot import notifier
+    TELEGRAM_IMPORTED = True
+except ImportError:
+    TELEGRAM_IMPORTED = False
+    notifier = None
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Heater ON/OFF sessions shorter than this stay silent (quick test runs)
+MIN_SESSION_NOTIFY_SECONDS = 2 * 3600
+
+DEFAULT_RULES = [
+    {"name": "heater_on", "on": "transition", "to": True,
+     "action": "notify_heater_on"},
+    {"name": "heater_off", "on": "transition", "to": False,
+     "min_duration": MIN_SESSION_NOTIFY_SECONDS, "action": "notify_heater_off"},
+    {"name": "sauna_ready", "on": "reading", "heater": True,
+     "metric": "temperature", "op": ">=", "value": getattr(config, "TELEGRAM_READY_TEMP", 90),
+     "once_per_session": True, "action": "notify_sauna_ready"},
+]
+
+
+class Rule:
+    """A compiled rule with its incremental state."""
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.name = spec["name"]
+        self.event_type = spec["on"]
+        if self.event_type not in ("reading", "transition"):
+            raise ValueError(f"Rule {self.name}: 'on' must be 'reading' or 'transition'")
+
+        self.checks: List[Callable[[dict], bool]] = []
+        if "to" in spec:
+            target = spec["to"]
+            self.checks.append(lambda event: event["heater_on"] == target)
+        if "heater" in spec:
+            heater = spec["heater"]
+            self.checks.append(lambda event: bool(event["heater_on"]) == heater)
+        if "min_duration" in spec:
+            min_duration = spec["min_duration"]
+            self.checks.append(lambda event: (event.get("previous_duration") or 0) >= min_duration)
+        if "metric" in spec:
+            metric, value = spec["metric"], spec["value"]
+            compare = OPERATORS[spec.get("op", ">=")]
+            self.checks.append(
+                lambda event: event.get(metric) is not None and compare(event[metric], value)
+            )
+
+        self.for_seconds = spec.get("for_seconds", 0)
+        self.debounce = spec.get("debounce", 0)
+        self.once_per_session = spec.get("once_per_session", False)
+        self.quiet_hours = tuple(spec["quiet_hours"]) if spec.get("quiet_hours") else None
+        self.action = spec.get("action")
+        self.message = spec.get("message")
+        if not self.action and not self.message:
+            raise ValueError(f"Rule {self.name}: needs an 'action' or a 'message'")
+
+        # Incremental state
+        self.condition_since: Optional[datetime] = None
+        self.last_fired: Optional[datetime] = None
+        self.fired_this_session = False
+
+    def _in_quiet_hours(self, now: datetime) -> bool:
+        start, end = self.quiet_hours
+        hour = now.astimezone().hour
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def evaluate(self, event: dict) -> bool:
+        """Update state with the event; True if the rule should fire now."""
+        now = event["time"]
+        if not all(check(event) for check in self.checks):
+            self.condition_since = None
+            return False
+
+        if self.condition_since is None:
+            self.condition_since = now
+        if (now - self.condition_since).total_seconds() < self.for_seconds:
+            return False
+        if self.once_per_session and self.fired_this_session:
+            return False
+        if self.last_fired and (now - self.last_fired).total_seconds() < self.debounce:
+            return False
+        if self.quiet_hours and self._in_quiet_hours(now):
+            return False
+
+        self.last_fired = now
+        self.fired_this_session = True
+        return True
+
+    def new_session(self):
+        """Breaker transition: session-scoped state starts over."""
+        self.fired_this_session = False
+        self.condition_since = None
+
+
+class RuleEngine:
+    """Routes events to the rules subscribed to their type and runs actions."""
+
+    def __init__(self, specs: List[dict]):
+        self.rules = [Rule(spec) for spec in specs]
+        self._by_event = {"reading": [], "transition": []}
+        for rule in self.rules:
+            self._by_event[rule.event_type].append(rule)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "RuleEngine":
+        return cls(getattr(config, "NOTIFICATION_RULES", DEFAULT_RULES))
+
+    def handle(self, event: dict):
+        """Evaluate one event against the matching rules and fire their actions."""
+        event.setdefault("time", clock.now())
+        with self.lock:
+            if event["type"] == "transition":
+                for rule in self.rules:
+                    rule.new_session()
+                if event.get("restarted_mid_session"):
+                    # Duration is unreliable after a restart mid-session - stay silent
+                    logger.info("State change detected at startup (restarted mid-session) — skipping notification")
+                    return
+            fired = [rule for rule in self._by_event[event["type"]] if rule.evaluate(event)]
+        for rule in fired:
+            self._run_action(rule, event)
+
+    def _run_action(self, rule: Rule, event: dict):
+        if not TELEGRAM_IMPORTED or not notifier:
+            return
+        try:
+            if rule.message:
+                notifier.send_message_sync(rule.message.format(**event))
+            elif rule.action == "notify_heater_off":
+                notifier.notify_heater_off(event["previous_duration_str"])
+            elif rule.action == "notify_sauna_ready":
+                notifier.notify_sauna_ready(event["temperature"])
+            else:
+                getattr(notifier, rule.action)()
+            logger.info("Notification rule fired: %s", rule.name)
+        except Exception as e:
+            logger.error("Error running notification rule %s: %s", rule.name, e)
+
+    def on_reading(self, reading):
+        """Supervisor sink: evaluate reading rules against a sensor sample."""
+        from data_logger import breaker_tracker
+
+        if reading.values.get("temperature") is None:
+            return
+        event = dict(reading.values)
+        event.update(
+            type="reading",
+            time=reading.timestamp,
+            heater_on=breaker_tracker.current_state,
+            state_seconds=breaker_tracker.get_current_seconds(),
+        )
+        self.handle(event)
+
+    def on_transition(self, transition: dict):
+        """BreakerStateTracker listener: evaluate transition rules."""
+        if transition.get("previous_state") is None:
+            return  # First state seen after startup, not a real transition
+        event = dict(transition)
+        event.update(type="transition", heater_on=transition["state"])
+        self.handle(event)
+
+
+# Global engine instance
+rule_engine = RuleEngine.from_config()
@@ -1,14 +1,23 @@
 """
 Notification Scheduler for Telegram Bot
 
-Handles periodic checks for:
+Handles timed notifications:
 - Wednesday 3:33 PM reminders
 - Weekly rust warnings when sauna is off
+
+Instead of polling, each rule computes its next due time and goes into a
+heap; the scheduler thread sleeps until the earliest one. Breaker
+transitions wake it early so off-duration rules are re-armed immediately.
 """
 
+import heapq
+import itertools
+import logging
 import threading
-import time
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import clock
 
 try:
     from telegram_bot import notifier
@@ -18,75 +27,195 @@ try:
 except ImportError:
     IMPORTS_OK = False
 
+logger = logging.getLogger(__name__)
+
+# Wednesday reminder: weekday (Monday=0) and local time
+REMINDER_WEEKDAY = 2
+REMINDER_HOUR = 15
+REMINDER_MINUTE = 33
+# Fired later than this (host asleep, loop stalled, clock jump): skip that week
+REMINDER_MAX_LATE = 7 * 60
+
+WEEK_SECONDS = 7 * 86400
+
+# Upper bound for a single wait. Condition.wait() uses the monotonic clock,
+# which may not advance while the host is asleep, so re-check the wall clock
+# at least this often.
+MAX_WAIT = 3600
+
+
+def next_weekly_time(now: datetime, weekday: int, hour: int, minute: int) -> datetime:
+    """Next local datetime strictly after `now` falling on weekday at hour:minute."""
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    candidate += timedelta(days=(weekday - now.weekday()) % 7)
+    if candidate <= now:
+        candidate += timedelta(days=7)
+    return candidate
+
 
 class NotificationScheduler:
-    """Schedules periodic notification checks."""
+    """Timer-queue scheduler for calendar and off-duration notifications."""
 
     def __init__(self):
         self.running = False
         self.thread = None
         self.last_wednesday_check = None
-
-    def start(self):
-        """Start the scheduler in a background thread."""
+        self._timers = []  # heap of (due epoch seconds, seq, rule name)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._armed = False  # Calendar rules are armed on the first wakeup
+        self._rearm_off_rules = True  # Off-duration rules need recomputing
+
+    def start(self, background: bool = True):
+        """Start the scheduler in a background thread.
+
+        With background=False no thread is started; the caller drives it
+        with run_pending() (accelerated replay on a virtual clock).
+        """
         if not IMPORTS_OK or not notifier.enabled:
-            print("Notification scheduler disabled (Telegram not configured)")
+            logger.info("Notification scheduler disabled (Telegram not configured)")
             return
 
         self.running = True
-        self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
+        if self._on_breaker_change not in breaker_tracker.listeners:
+            breaker_tracker.add_listener(self._on_breaker_change)
+        if not background:
+            return
+        self.thread = threading.Thread(target=self._run_scheduler, daemon=True, name="notification-scheduler")
         self.thread.start()
-        print("✓ Notification scheduler started")
+        logger.info("✓ Notification scheduler started")
 
     def stop(self):
-        """Stop the scheduler."""
-        self.running = False
+        """Stop the scheduler (wakes the thread immediately)."""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
         if self.thread:
             self.thread.join(timeout=5)
 
+    def _on_breaker_change(self, transition: dict):
+        """Breaker transition: re-arm off-duration rules right away."""
+        with self._cond:
+            self._rearm_off_rules = True
+            self._cond.notify()
+
+    def _push(self, due: float, rule: str):
+        heapq.heappush(self._timers, (due, next(self._seq), rule))
+
+    def _arm_calendar_rules(self):
+        self._push(next_weekly_time(clock.local_now(), REMINDER_WEEKDAY, REMINDER_HOUR,
+                                    REMINDER_MINUTE).timestamp(), "wednesday_reminder")
+
+    def _rearm_off_duration_rules(self):
+        """Drop pending off-duration timers and arm them again from the current state."""
+        self._timers = [timer for timer in self._timers if timer[2] != "rust_warning"]
+        heapq.heapify(self._timers)
+        self._arm_rust_warning()
+
+    def _arm_rust_warning(self):
+        """Arm the next 'off for N weeks' threshold (only while the sauna is OFF)."""
+        off_since = self._off_since()
+        if off_since is None:
+            return
+        # state_since round-trips through isoformat and can land just after now
+        weeks_off = max(0, int((clock.time() - off_since) // WEEK_SECONDS))
+        self._push(off_since + (weeks_off + 1) * WEEK_SECONDS, "rust_warning")
+
+    def _off_since(self) -> Optional[float]:
+        """Epoch seconds since the sauna has been OFF, or None if it isn't OFF."""
+        if breaker_tracker.current_state or not breaker_tracker.state_since:
+            return None
+        state_since = datetime.fromisoformat(breaker_tracker.state_since)
+        if state_since.tzinfo is None:
+            state_since = state_since.replace(tzinfo=timezone.utc)
+        return state_since.timestamp()
+
+    def _next_due(self):
+        """(rule, None) for a due timer (popped), else (None, seconds until the next one).
+
+        Call with self._cond held.
+        """
+        if not self._armed:
+            self._armed = True
+            self._arm_calendar_rules()
+        if self._rearm_off_rules:
+            self._rearm_off_rules = False
+            self._rearm_off_duration_rules()
+        if not self._timers:
+            return None, MAX_WAIT
+        due, _, rule = self._timers[0]
+        delay = due - clock.time()
+        if delay > 0:
+            return None, min(delay, MAX_WAIT)
+        heapq.heappop(self._timers)
+        return rule, None
+
     def _run_scheduler(self):
-        """Main scheduler loop - runs every 5 minutes."""
+        """Sleep until the earliest timer (or a state change / stop), then fire it."""
+        while True:
+            with self._cond:
+                if not self.running:
+                    return
+                rule, delay = self._next_due()
+                if rule is None:
+                    self._cond.wait(delay)
+                    continue
+            self._fire_safely(rule)
+
+    def run_pending(self):
+        """Fire every rule that is due now (for driving the scheduler without its thread)."""
         while self.running:
-            try:
-                self._check_notifications()
-            except Exception as e:
-                print(f"Error in notification scheduler: {e}")
-
-            # Sleep for 5 minutes between checks
-            time.sleep(300)
-
-    def _check_notifications(self):
-        """Check if any notifications should be sent."""
-        now = datetime.now()
-
-        # Check if sauna is OFF
-        if not breaker_tracker.current_state and breaker_tracker.state_since:
-            # Calculate how long it's been off
-            state_since = datetime.fromisoformat(breaker_tracker.state_since)
-            if state_since.tzinfo is None:
-                state_since = state_since.replace(tzinfo=timezone.utc)
-
-            now_utc = datetime.now(timezone.utc)
-            off_seconds = (now_utc - state_since).total_seconds()
-            off_duration = breaker_tracker._format_duration(off_seconds)
-
-            # Check for Wednesday 3:33 PM reminder (within 10-minute window: 3:30-3:40)
-            if now.weekday() == 2 and now.hour == 15 and 30 <= now.minute <= 40:  # Wednesday = 2
-                # Only send once per Wednesday
-                if not self.last_wednesday_check or self.last_wednesday_check.date() != now.date():
-                    self.last_wednesday_check = now
-                    # Get current temperature
-                    current_temp = monitor.get_latest_data().get("temperature")
-                    print(f"Sending Wednesday 3:33 PM reminder (off for {off_duration}, temp: {current_temp}°C)")
-                    notifier.notify_wednesday_reminder(off_duration, current_temp)
-
-            # Check for weekly rust warnings (every 7 days)
-            off_days = off_seconds / 86400
-            if off_days >= 7:
-                weeks_off = int(off_days // 7)
-                print(f"Checking weekly rust warning: {weeks_off} weeks off")
+            with self._cond:
+                rule, _ = self._next_due()
+            if rule is None:
+                return
+            self._fire_safely(rule)
+
+    def _fire_safely(self, rule: str):
+        try:
+            self._fire(rule)
+        except Exception as e:
+            logger.error("Error in notification scheduler (%s): %s", rule, e)
+
+    def _fire(self, rule: str):
+        """Run a due rule and re-arm it."""
+        if rule == "wednesday_reminder":
+            with self._cond:
+                self._arm_calendar_rules()
+            self._send_wednesday_reminder()
+        elif rule == "rust_warning":
+            off_since = self._off_since()
+            with self._cond:
+                self._arm_rust_warning()
+            if off_since is not None:
+                off_seconds = clock.time() - off_since
+                weeks_off = int(off_seconds // WEEK_SECONDS)
+                if weeks_off < 1:
+                    return
+                off_duration = breaker_tracker._format_duration(off_seconds)
+                logger.info("Sending weekly rust warning: %s weeks off", weeks_off)
                 notifier.notify_weekly_rust_warning(weeks_off, off_duration)
 
+    def _send_wednesday_reminder(self):
+        """Wednesday 3:33 PM reminder (only when the sauna is OFF)."""
+        off_since = self._off_since()
+        if off_since is None:
+            return
+        now = clock.local_now()
+        slot = now.replace(hour=REMINDER_HOUR, minute=REMINDER_MINUTE, second=0, microsecond=0)
+        if now.weekday() != REMINDER_WEEKDAY or not 0 <= (now - slot).total_seconds() <= REMINDER_MAX_LATE:
+            logger.info("Skipping Wednesday reminder: fired late (%s)", now.strftime("%a %H:%M"))
+            return
+        # Only send once per Wednesday
+        if self.last_wednesday_check and self.last_wednesday_check.date() == now.date():
+            return
+        self.last_wednesday_check = now
+        off_duration = breaker_tracker._format_duration(clock.time() - off_since)
+        # Get current temperature
+        current_temp = monitor.get_latest_data().get("temperature")
+        logger.info("Sending Wednesday 3:33 PM reminder (off for %s, temp: %s°C)", off_duration, current_temp)
+        notifier.notify_wednesday_reminder(off_duration, current_temp)
+
 
 # Global scheduler instance
 scheduler = NotificationScheduler()
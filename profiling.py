@@ -0,0 +1,230 @@
+"""
+Profiling Hooks
+
+Opt-in tools for finding out where time and memory go on a running
+instance (served under /admin/profile/* when PROFILING_ENABLED is set and
+protected by PROFILING_TOKEN):
+
+- sample(): samples the stacks of every thread at a fixed interval for N
+  seconds; output is collapsed stacks ("thread;outer;inner count"), ready
+  for flamegraph.pl / speedscope
+- cprofile_session.capture(): deterministic cProfile of every web request and @timed hot
+  path that runs during the window, merged into one pstats file
+- memory_*(): tracemalloc top allocations and a diff against a baseline
+- @timed: per-function timing on hot paths, always on and cheap, exported
+  as sauna_function_seconds{function} in /metrics
+"""
+
+import asyncio
+import cProfile
+import functools
+import hmac
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+import config
+from metrics import registry
+
+function_latency = registry.histogram(
+    "sauna_function_seconds", "Hot-path function duration", labels=("function",))
+
+MAX_CAPTURE_SECONDS = 120
+MIN_SAMPLE_INTERVAL = 0.001  # Below this, sample() would just spin
+
+
+class CProfileSession:
+    """Collects one cProfile.Profile per profiled call while a capture window is open."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profiler_lock = threading.Lock()  # Python 3.12+ allows one active profiler per process
+        self.until = 0.0
+        self.profiles = []
+        self.skipped = 0
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() < self.until
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn under a fresh profiler, or unprofiled if another call holds the profiler."""
+        if not self.profiler_lock.acquire(blocking=False):
+            self.skipped += 1
+            return fn(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(fn, *args, **kwargs)
+            finally:
+                with self.lock:
+                    self.profiles.append(profile)
+        finally:
+            self.profiler_lock.release()
+
+    def capture(self, seconds: float) -> bytes:
+        """Open the window, wait, and return the merged stats as a pstats file."""
+        with self.lock:
+            self.profiles = []
+            self.skipped = 0
+            self.until = time.monotonic() + seconds
+        time.sleep(seconds)
+        with self.lock:
+            self.until = 0.0
+            profiles, self.profiles = self.profiles, []
+
+        stats = None
+        for profile in profiles:
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            return marshal.dumps({})
+        return marshal.dumps(stats.stats)
+
+
+cprofile_session = CProfileSession()
+_profiling = threading.local()  # Avoid nesting profilers within one thread
+
+
+def timed(name: str):
+    """Record the duration of every call (sync or async) and include it in cProfile captures."""
+    histogram = function_latency.labels(name)
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                if cprofile_session.active and not getattr(_profiling, "inside", False):
+                    _profiling.inside = True
+                    try:
+                        return cprofile_session.run(fn, *args, **kwargs)
+                    finally:
+                        _profiling.inside = False
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def profile_wsgi(app):
+    """WSGI middleware: profile each request handled while a cProfile window is open."""
+    def middleware(environ, start_response):
+        if cprofile_session.active and not getattr(_profiling, "inside", False):
+            _profiling.inside = True
+            try:
+                return cprofile_session.run(app, environ, start_response)
+            finally:
+                _profiling.inside = False
+        return app(environ, start_response)
+    return middleware
+
+
+def sample(seconds: float, interval: float = 0.005) -> str:
+    """Sample all threads' stacks; returns collapsed-stack text for flame graphs."""
+    interval = max(interval, MIN_SAMPLE_INTERVAL)
+    me = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            parts.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def pstats_text(data: bytes, limit: int = 40, sort: str = "cumulative") -> str:
+    """Human-readable summary of a pstats file produced by CProfileSession.capture()."""
+    stats = pstats.Stats(_MarshalledStats(data), stream=io.StringIO())
+    stats.sort_stats(sort).print_stats(limit)
+    return stats.stream.getvalue()
+
+
+class _MarshalledStats:
+    """Adapter so pstats.Stats can load raw stats without a file."""
+
+    def __init__(self, data: bytes):
+        self.stats = marshal.loads(data)
+
+    def create_stats(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Memory (tracemalloc)
+# ---------------------------------------------------------------------------
+
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def memory_start(frames: int = 10) -> str:
+    """Start tracing allocations and take the baseline snapshot."""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _baseline = tracemalloc.take_snapshot()
+    return "tracemalloc started, baseline taken\n"
+
+
+def memory_stop() -> str:
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+    return "tracemalloc stopped\n"
+
+
+def memory_top(limit: int = 25) -> str:
+    """Top allocation sites by size."""
+    if not tracemalloc.is_tracing():
+        return "tracemalloc is not running (start it first)\n"
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"traced: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)"]
+    lines += [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+    return "\n".join(lines) + "\n"
+
+
+def memory_diff(limit: int = 25) -> str:
+    """Allocation growth since the baseline snapshot."""
+    if not tracemalloc.is_tracing() or _baseline is None:
+        return "tracemalloc is not running (start it first)\n"
+    snapshot = tracemalloc.take_snapshot()
+    return "\n".join(str(stat) for stat in snapshot.compare_to(_baseline, "lineno")[:limit]) + "\n"
+
+
+def enabled() -> bool:
+    return bool(getattr(config, "PROFILING_ENABLED", False))
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Admin check: profiling must be enabled and the token must match."""
+    expected = getattr(config, "PROFILING_TOKEN", None)
+    return enabled() and bool(expected) and bool(token) and hmac.compare_digest(token, expected)
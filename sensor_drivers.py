@@ -0,0 +1,369 @@
+"""
+Async Sensor Driver Framework
+
+Every device is a driver with the same async interface
+(initialize / poll / subscribe / close). A single DriverSupervisor runs all
+drivers on one asyncio loop and publishes their readings to sinks (history
+logger, breaker tracker, Telegram notifications).
+
+Drivers:
+- YoLinkDriver: YoLink cloud temperature sensor (TemperatureMonitor)
+- TuyaDriver: Tuya LAN breaker (TuyaBreakerMonitor); blocking socket calls
+  run in the loop's default executor
+- SimulatedDriver: in-process sauna model for running without hardware
+"""
+
+import asyncio
+import logging
+import math
+import random
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import clock
+import config
+from data_logger import temp_logger, breaker_tracker
+from notification_rules import rule_engine
+from session_stats import session_table
+from heat_model import heat_model
+from anomaly import detector
+from usage_stats import usage_stats
+
+logger = logging.getLogger(__name__)
+
+
+class Reading:
+    """One sample from a driver; values may hold "temperature", "humidity", "breaker_on"."""
+
+    __slots__ = ("source", "timestamp", "values")
+
+    def __init__(self, source: str, values: dict, timestamp: Optional[datetime] = None):
+        self.source = source
+        self.values = values
+        self.timestamp = timestamp or clock.now()
+
+    def __repr__(self):
+        return f"Reading({self.source!r}, {self.values!r})"
+
+
+class SensorDriver:
+    """Base class for async sensor drivers.
+
+    Polled drivers implement poll(); push drivers (e.g. MQTT) call
+    self.emit() whenever data arrives and return None from poll().
+    """
+
+    name = "driver"
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or config.REFRESH_INTERVAL
+        self._subscribers: List[Callable[[Reading], None]] = []
+
+    async def initialize(self) -> bool:
+        """Connect to the device. Return False if the driver is disabled; raise to retry later."""
+        return True
+
+    async def poll(self) -> Optional[Reading]:
+        """Fetch one reading (None if nothing new or the poll failed)."""
+        return None
+
+    def subscribe(self, callback: Callable[[Reading], None]):
+        """Register a callback for readings pushed outside the poll schedule."""
+        self._subscribers.append(callback)
+
+    def emit(self, reading: Reading):
+        for callback in self._subscribers:
+            callback(reading)
+
+    async def close(self):
+        """Release connections."""
+
+
+class YoLinkDriver(SensorDriver):
+    """YoLink cloud temperature/humidity sensor."""
+
+    name = "yolink"
+
+    def __init__(self, monitor, interval: Optional[float] = None):
+        super().__init__(interval)
+        self.monitor = monitor
+
+    async def initialize(self) -> bool:
+        await self.monitor.initialize()
+        return True
+
+    async def poll(self) -> Optional[Reading]:
+        values = await self.monitor.update_temperature()
+        return Reading(self.name, values) if values else None
+
+    async def close(self):
+        await self.monitor.cleanup()
+
+
+class TuyaDriver(SensorDriver):
+    """Tuya WiFi breaker on the LAN."""
+
+    name = "tuya"
+
+    def __init__(self, monitor, interval: Optional[float] = None):
+        super().__init__(interval)
+        self.monitor = monitor
+
+    async def initialize(self) -> bool:
+        return await asyncio.to_thread(self.monitor.initialize)
+
+    async def poll(self) -> Optional[Reading]:
+        values = await asyncio.to_thread(self.monitor.update_status)
+        return Reading(self.name, values) if values else None
+
+
+class SaunaModel:
+    """First-order thermal model of the sauna with a repeating heater schedule.
+
+    Temperature relaxes towards heater_temp while ON and ambient_temp while
+    OFF, with separate time constants. `speed` compresses simulated time.
+    """
+
+    def __init__(self, ambient_temp: float = 15.0, heater_temp: float = 105.0,
+                 heat_tau: float = 45 * 60, cool_tau: float = 120 * 60,
+                 on_seconds: float = 3 * 3600, off_seconds: float = 21 * 3600,
+                 speed: float = 1.0, noise: float = 0.1):
+        self.ambient_temp = ambient_temp
+        self.heater_temp = heater_temp
+        self.heat_tau = heat_tau
+        self.cool_tau = cool_tau
+        self.on_seconds = on_seconds
+        self.off_seconds = off_seconds
+        self.speed = speed
+        self.noise = noise
+        self.temperature = ambient_temp
+        self.humidity = 30.0
+        self._started = clock.monotonic()
+        self._last_step = self._started
+
+    def heater_on(self, elapsed: float) -> bool:
+        return elapsed % (self.on_seconds + self.off_seconds) < self.on_seconds
+
+    def advance(self, dt: float, heater_on: bool):
+        """Step the model by dt simulated seconds."""
+        target, tau = (self.heater_temp, self.heat_tau) if heater_on else (self.ambient_temp, self.cool_tau)
+        self.temperature = target + (self.temperature - target) * math.exp(-dt / tau)
+        self.humidity = max(5.0, min(60.0, 30.0 - (self.temperature - self.ambient_temp) * 0.25))
+
+    def step(self) -> dict:
+        """Advance to 'now' (scaled by speed) and return the current values."""
+        now = clock.monotonic()
+        elapsed = (now - self._started) * self.speed
+        heater_on = self.heater_on(elapsed)
+        self.advance((now - self._last_step) * self.speed, heater_on)
+        self._last_step = now
+        return {
+            "temperature": round(self.temperature + random.gauss(0, self.noise), 1),
+            "humidity": round(self.humidity),
+            "breaker_on": heater_on,
+        }
+
+
+class SimulatedDriver(SensorDriver):
+    """In-process sauna simulator standing in for both the sensor and the breaker."""
+
+    name = "simulated"
+
+    def __init__(self, monitor, breaker_monitor, model: Optional[SaunaModel] = None,
+                 interval: Optional[float] = None):
+        super().__init__(interval)
+        self.monitor = monitor
+        self.breaker_monitor = breaker_monitor
+        self.model = model or SaunaModel(speed=getattr(config, "SIMULATION_SPEED", 1.0))
+
+    async def initialize(self) -> bool:
+        self.monitor.publish(device_name="Simulated Sauna", device_id="simulated")
+        logger.info("✓ Simulated sauna driver ready (speed x%g)", self.model.speed)
+        return True
+
+    async def poll(self) -> Optional[Reading]:
+        values = self.model.step()
+        self.monitor.apply_reading(values["temperature"], values["humidity"])
+        self.breaker_monitor.apply_status(values["breaker_on"])
+        return Reading(self.name, values)
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+def record_temperature(reading: Reading):
+    """Log temperature history."""
+    temperature = reading.values.get("temperature")
+    if temperature is None:
+        return
+    humidity = reading.values.get("humidity")
+
+    # 1-minute granularity and compression handled by logger; heating
+    # sessions are kept at full resolution
+    stored = temp_logger.add_reading(
+        temperature, humidity, full_fidelity=bool(breaker_tracker.current_state)
+    )
+
+    # Only echo readings that were actually recorded (per-poll detail: DEBUG)
+    if stored:
+        logger.debug("Temperature: %s%s, Humidity: %s%%", temperature,
+                     "°F" if config.DISPLAY_FAHRENHEIT else "°C", humidity)
+
+
+class BreakerRecorder:
+    """Feeds breaker transitions to the tracker and keeps the displayed duration fresh."""
+
+    def __init__(self, breaker_monitor):
+        self.breaker_monitor = breaker_monitor
+        self._last_logged_state = None
+        self._last_log_time = 0.0
+
+    def __call__(self, reading: Reading):
+        breaker_on = reading.values.get("breaker_on")
+        if breaker_on is None:
+            return
+
+        # The tracker only needs to hear about actual transitions
+        if breaker_on != breaker_tracker.current_state or breaker_tracker.state_since is None:
+            breaker_tracker.update_state(breaker_on)
+        duration = breaker_tracker.get_current_duration()
+        self.breaker_monitor.publish(duration=duration)
+
+        # Log changes at INFO, plus a periodic DEBUG heartbeat while nothing changes
+        now = clock.monotonic()
+        changed = breaker_on != self._last_logged_state
+        if changed or now - self._last_log_time >= getattr(config, "TUYA_LOG_HEARTBEAT", 1800):
+            self._last_logged_state = breaker_on
+            self._last_log_time = now
+            logger.log(logging.INFO if changed else logging.DEBUG, "[%s] %s: %s%s",
+                       reading.source, config.TUYA_DEVICE_NAME, "ON" if breaker_on else "OFF",
+                       f" for {duration}" if duration else "")
+
+
+# ---------------------------------------------------------------------------
+# Supervisor
+# ---------------------------------------------------------------------------
+
+class DriverSupervisor:
+    """Runs all drivers on one event loop and fans readings out to sinks."""
+
+    MAX_INIT_BACKOFF = 600
+    WATCHDOG_INTERVAL = 60
+
+    def __init__(self):
+        self.drivers: List[SensorDriver] = []
+        self.sinks: List[Callable[[Reading], None]] = []
+        self.active: List[SensorDriver] = []
+        self.states: Dict[str, str] = {}  # driver name -> initializing / running / disabled
+        self.checks: List[Callable[[], None]] = []  # Run every WATCHDOG_INTERVAL (e.g. gap detection)
+
+    def add_driver(self, driver: SensorDriver):
+        self.drivers.append(driver)
+
+    def add_sink(self, sink: Callable[[Reading], None]):
+        self.sinks.append(sink)
+
+    def add_check(self, check: Callable[[], None]):
+        self.checks.append(check)
+
+    async def _watchdog(self):
+        """Periodic checks that must run even when no readings arrive."""
+        while True:
+            await asyncio.sleep(self.WATCHDOG_INTERVAL)
+            for check in self.checks:
+                try:
+                    check()
+                except Exception as e:
+                    logger.error("Error in supervisor check %s: %s", getattr(check, "__name__", check), e)
+
+    def publish(self, reading: Reading):
+        """Deliver a reading to every sink; one failing sink doesn't block the others."""
+        for sink in self.sinks:
+            try:
+                sink(reading)
+            except Exception as e:
+                logger.error("Error in reading sink %s: %s", getattr(sink, "__name__", sink), e)
+
+    async def _initialize(self, driver: SensorDriver) -> bool:
+        """Initialize a driver, retrying with exponential backoff until it succeeds."""
+        delay = driver.interval
+        while True:
+            try:
+                return await driver.initialize()
+            except Exception as e:
+                logger.warning("[%s] initialization failed (%s), retrying in %gs", driver.name, e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.MAX_INIT_BACKOFF)
+
+    async def _run_driver(self, driver: SensorDriver):
+        self.states[driver.name] = "initializing"
+        if not await self._initialize(driver):
+            logger.info("[%s] driver disabled", driver.name)
+            self.states[driver.name] = "disabled"
+            return
+        self.states[driver.name] = "running"
+        self.active.append(driver)
+        driver.subscribe(self.publish)
+
+        # Fixed-rate schedule: poll time doesn't push later ticks back
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            try:
+                reading = await driver.poll()
+                if reading is not None:
+                    self.publish(reading)
+            except Exception as e:
+                logger.warning("[%s] poll failed: %s", driver.name, e)
+            next_tick += driver.interval
+            now = loop.time()
+            if next_tick < now:
+                next_tick = now  # Overran - skip the missed ticks
+            await asyncio.sleep(next_tick - now)
+
+    async def run(self):
+        """Run every driver until cancelled."""
+        await asyncio.gather(self._watchdog(), *(self._run_driver(driver) for driver in self.drivers))
+
+    async def close(self):
+        for driver in self.drivers:
+            try:
+                await driver.close()
+            except Exception as e:
+                logger.warning("[%s] close failed: %s", driver.name, e)
+
+
+def build_supervisor() -> DriverSupervisor:
+    """Supervisor for the configured drivers (SENSOR_DRIVERS) with the standard sinks."""
+    from temperature_service import monitor
+    from tuya_service import breaker_monitor
+
+    supervisor = DriverSupervisor()
+    names = getattr(config, "SENSOR_DRIVERS", None)
+    if names is None:
+        names = ["yolink"] + (["tuya"] if config.TUYA_ENABLED else [])
+    for name in names:
+        if name == "yolink":
+            supervisor.add_driver(YoLinkDriver(monitor))
+        elif name == "tuya":
+            supervisor.add_driver(TuyaDriver(breaker_monitor))
+        elif name == "simulated":
+            supervisor.add_driver(SimulatedDriver(monitor, breaker_monitor))
+        else:
+            raise ValueError(f"Unknown sensor driver: {name!r}")
+
+    supervisor.add_sink(BreakerRecorder(breaker_monitor))
+    supervisor.add_sink(record_temperature)
+    # Notification rules: readings via the sink, transitions via the tracker
+    supervisor.add_sink(detector.on_reading)
+    supervisor.add_sink(usage_stats.on_reading)
+    supervisor.add_sink(heat_model.on_reading)
+    supervisor.add_sink(rule_engine.on_reading)
+    # Outages are reported while they last, not only when /health is polled
+    supervisor.add_check(detector.check_gap)
+    for listener in (session_table.on_transition, heat_model.on_transition,
+                     usage_stats.on_transition, rule_engine.on_transition):
+        if listener not in breaker_tracker.listeners:
+            breaker_tracker.add_listener(listener)
+    return supervisor
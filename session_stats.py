@@ -0,0 +1,152 @@
+"""
+Heating Session Table
+
+A materialized table of heating sessions joining each breaker ON interval
+with its temperature curve. A row is computed once, when the heater turns
+OFF, from just that interval of temperature history, and persisted to
+sessions.json - so session analytics never have to re-join the full
+breaker and temperature histories.
+
+Row fields:
+    start, end              ISO8601 (UTC)
+    duration_seconds
+    start_temp, peak_temp   °C
+    time_to_ready_seconds   seconds until TELEGRAM_READY_TEMP (None if never reached)
+    heating_rate            °C/min from start to ready (or to peak if never ready)
+    avg_hold_temp           mean temperature after reaching ready (None if never reached)
+    samples                 temperature records in the session
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import config
+from data_logger import temp_logger, breaker_tracker, MIN_SESSION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def compute_session(start: datetime, end: datetime, records: list) -> dict:
+    """Build a session row from the temperature records between start and end."""
+    ready_temp = getattr(config, "TELEGRAM_READY_TEMP", 90)
+    row = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "duration_seconds": int((end - start).total_seconds()),
+        "start_temp": None,
+        "peak_temp": None,
+        "time_to_ready_seconds": None,
+        "heating_rate": None,
+        "avg_hold_temp": None,
+        "samples": 0,
+    }
+    points = [
+        (datetime.fromisoformat(r["timestamp"]), r["temperature"])
+        for r in records if r.get("temperature") is not None
+    ]
+    if not points:
+        return row
+
+    start_time, start_temp = points[0]
+    peak_time, peak_temp = max(points, key=lambda p: p[1])
+    ready = next(((t, temp) for t, temp in points if temp >= ready_temp), None)
+
+    row["start_temp"] = start_temp
+    row["peak_temp"] = peak_temp
+    row["samples"] = len(points)
+
+    # Rate to "ready", or to the peak for sessions that never got there
+    rate_end = ready or (peak_time, peak_temp)
+    minutes = (rate_end[0] - start_time).total_seconds() / 60
+    if minutes > 0:
+        row["heating_rate"] = round((rate_end[1] - start_temp) / minutes, 2)
+
+    if ready:
+        row["time_to_ready_seconds"] = int((ready[0] - start).total_seconds())
+        hold = [temp for t, temp in points if t >= ready[0]]
+        row["avg_hold_temp"] = round(sum(hold) / len(hold), 1)
+    return row
+
+
+class SessionTable:
+    """Persisted, append-only table of completed heating sessions."""
+
+    def __init__(self, filename="sessions.json"):
+        self.filename = filename
+        self.sessions: List[dict] = []
+        self.lock = threading.Lock()
+        self.load_from_disk()
+
+    def load_from_disk(self):
+        """Load the table, then add sessions still missing from it."""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    self.sessions = json.load(f)
+                logger.info("Loaded %s heating sessions from %s", len(self.sessions), self.filename)
+            except Exception as e:
+                logger.error("Error loading heating sessions: %s", e)
+                self.sessions = []
+        self.backfill()
+
+    def save_to_disk(self):
+        """Persist the table (atomic replace)."""
+        try:
+            with self.lock:
+                data = list(self.sessions)
+            tmp = self.filename + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.filename)
+        except Exception as e:
+            logger.error("Error saving heating sessions: %s", e)
+
+    def backfill(self):
+        """Materialize indexed breaker sessions that have no row yet (first run, or missed while down)."""
+        with self.lock:
+            known = {row["start"] for row in self.sessions}
+        added = 0
+        for session in list(breaker_tracker.sessions):
+            if session["timestamp"] in known:
+                continue
+            start = datetime.fromisoformat(session["timestamp"])
+            end = start + timedelta(seconds=session["duration_seconds"])
+            self._add(compute_session(start, end, temp_logger.get_range(start, end)))
+            added += 1
+        if added:
+            logger.info("Backfilled %s heating sessions", added)
+            self.save_to_disk()
+
+    def _add(self, row: dict):
+        with self.lock:
+            bisect.insort(self.sessions, row, key=lambda r: r["start"])
+
+    def on_transition(self, transition: dict):
+        """BreakerStateTracker listener: materialize the session on ON→OFF."""
+        if transition.get("previous_state") is not True:
+            return
+        duration = transition["previous_duration"]
+        if duration < MIN_SESSION_SECONDS:
+            return
+        end = transition["time"]
+        start = datetime.fromisoformat(transition["previous_since"])
+        row = compute_session(start, end, temp_logger.get_range(start, end))
+        self._add(row)
+        self.save_to_disk()
+        peak = f", peak {row['peak_temp']}°C" if row["peak_temp"] is not None else ""
+        logger.info("Heating session recorded: %s%s", breaker_tracker._format_duration(duration), peak)
+
+    def get_sessions(self, limit: Optional[int] = None) -> List[dict]:
+        """Completed sessions, newest first."""
+        with self.lock:
+            rows = self.sessions[::-1]
+        return rows[:limit] if limit else rows
+
+
+# Global session table
+session_table = SessionTable()
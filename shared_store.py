@@ -0,0 +1,485 @@
+"""
+Shared State for Split Deployments
+
+By default web_server.py is a single process that polls the devices and
+serves HTTP. Under a multi-worker WSGI server every worker would start its
+own YoLink/Tuya pollers, scheduler and Telegram bot. The split deployment
+runs those once, in collector.py, and lets any number of stateless web
+workers (wsgi.py) serve the dashboard and API from shared state:
+
+- LatestBlock: a multiprocessing.shared_memory block holding the latest
+  temperature and breaker snapshots as seqlock-protected JSON. Workers
+  check its sequence number on every request (microseconds).
+- StateStore: an SQLite database in WAL mode (STATE_DB) with the stored
+  temperature records plus versioned JSON documents for the derived state
+  (breaker history, sessions, usage counters, heat model, health). WAL lets
+  workers read while the collector writes.
+
+StorePublisher (collector) writes both after every reading and breaker
+transition. StoreReplica (web worker) pulls whatever changed into the usual
+module singletons, so web_server's routes run unchanged. The JSON history
+files stay the collector's persistence; the store only mirrors them.
+"""
+
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+
+import clock
+import config
+import snapshot
+from snapshot import Snapshot
+
+logger = logging.getLogger(__name__)
+
+STATE_DB = getattr(config, "STATE_DB", "sauna_state.db")
+SHARED_MEMORY_NAME = getattr(config, "SHARED_MEMORY_NAME", "sauna_latest")
+SHARED_MEMORY_SIZE = getattr(config, "SHARED_MEMORY_SIZE", 64 * 1024)
+# Workers report the collector as down when the block is older than this
+COLLECTOR_STALE_SECONDS = getattr(config, "COLLECTOR_STALE_SECONDS", 180)
+
+# Block header: sequence number (odd while a write is in progress), payload length
+HEADER = struct.Struct("QI")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS temperature (
+    epoch REAL PRIMARY KEY,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+"""
+
+
+class StoreUnavailable(RuntimeError):
+    """The collector's shared state is not there (collector not running yet)."""
+
+
+def _epoch(record: dict) -> float:
+    return datetime.fromisoformat(record["timestamp"]).timestamp()
+
+
+# ---------------------------------------------------------------------------
+# Shared memory
+# ---------------------------------------------------------------------------
+
+class LatestBlock:
+    """Latest readings in shared memory: one writer (collector), many readers."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool = False):
+        self.shm = shm
+        self.owner = owner
+        self._seq = None
+        self._value = None
+
+    @classmethod
+    def create(cls, name: str = SHARED_MEMORY_NAME, size: int = SHARED_MEMORY_SIZE) -> "LatestBlock":
+        """Create the block, or take over one left behind by a previous collector."""
+        try:
+            shm = shared_memory.SharedMemory(name, create=True, size=size)
+            HEADER.pack_into(shm.buf, 0, 0, 0)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name)
+            if shm.size < size:
+                shm.close()
+                shm.unlink()
+                return cls.create(name, size)
+            # Keep counting from its sequence, so workers can't mistake a new value for one they have
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = SHARED_MEMORY_NAME) -> "LatestBlock":
+        """Open the collector's block read-only; StoreUnavailable if it doesn't exist."""
+        try:
+            try:
+                shm = shared_memory.SharedMemory(name, track=False)  # Python 3.13+
+            except TypeError:
+                shm = shared_memory.SharedMemory(name)
+                # Before 3.13 attaching registers the block too, and this worker's
+                # resource tracker would unlink it when the worker exits
+                resource_tracker.unregister(shm._name, "shared_memory")
+        except FileNotFoundError:
+            raise StoreUnavailable(f"no shared memory block {name!r} (is collector.py running?)")
+        return cls(shm)
+
+    def write(self, value: dict):
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        if HEADER.size + len(payload) > self.shm.size:
+            raise ValueError(f"latest readings ({len(payload)} bytes) exceed SHARED_MEMORY_SIZE")
+        buf = self.shm.buf
+        seq = HEADER.unpack_from(buf)[0]
+        seq += 1 - seq % 2  # Odd: readers retry until the write completes
+        HEADER.pack_into(buf, 0, seq, 0)
+        buf[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(buf, 0, seq + 1, len(payload))
+
+    def read(self) -> Tuple[Optional[int], Optional[dict]]:
+        """(sequence, value); the payload is parsed again only when the sequence moved."""
+        buf = self.shm.buf
+        for _ in range(1000):
+            seq, length = HEADER.unpack_from(buf)
+            if seq == self._seq:
+                return self._seq, self._value
+            if seq % 2:
+                time.sleep(0)
+                continue
+            payload = bytes(buf[HEADER.size:HEADER.size + length])
+            if HEADER.unpack_from(buf)[0] == seq:
+                self._seq, self._value = seq, json.loads(payload) if length else None
+                return self._seq, self._value
+        return self._seq, self._value  # Writer died mid-write; keep the last good value
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# SQLite
+# ---------------------------------------------------------------------------
+
+class StateStore:
+    """SQLite (WAL) store shared by the collector and the web workers."""
+
+    def __init__(self, filename: str = STATE_DB):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(filename, timeout=10, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; the JSON files are the record
+            self.conn.executescript(SCHEMA)
+
+    def replace_records(self, records: list):
+        """Mirror the full temperature history (collector start)."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM temperature")
+            self.conn.executemany("INSERT OR REPLACE INTO temperature VALUES (?, ?)",
+                                  [(_epoch(r), json.dumps(r)) for r in records])
+
+    def sync_records(self, records: list, expired_before: Optional[float] = None):
+        """Append new records and drop those the retention pass removed."""
+        with self.lock, self.conn:
+            if expired_before is not None:
+                self.conn.execute("DELETE FROM temperature WHERE epoch < ?", (expired_before,))
+            self.conn.executemany("INSERT OR REPLACE INTO temperature VALUES (?, ?)",
+                                  [(_epoch(r), json.dumps(r)) for r in records])
+
+    def records_after(self, epoch: Optional[float] = None) -> list:
+        """(epoch, record) pairs newer than epoch, oldest first."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT epoch, record FROM temperature WHERE epoch > ? ORDER BY epoch",
+                (epoch if epoch is not None else float("-inf"),)).fetchall()
+        return [(e, json.loads(record)) for e, record in rows]
+
+    def first_epoch(self) -> Optional[float]:
+        with self.lock:
+            return self.conn.execute("SELECT MIN(epoch) FROM temperature").fetchone()[0]
+
+    def put_document(self, name: str, value):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO documents VALUES (?, 1, ?) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1, body = excluded.body",
+                (name, json.dumps(value, separators=(",", ":"))))
+
+    def document_versions(self) -> dict:
+        with self.lock:
+            return dict(self.conn.execute("SELECT name, version FROM documents").fetchall())
+
+    def get_document(self, name: str):
+        with self.lock:
+            row = self.conn.execute("SELECT body FROM documents WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def data_version(self) -> int:
+        """Changes whenever another connection commits (cheap change check)."""
+        with self.lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Collector side
+# ---------------------------------------------------------------------------
+
+class StorePublisher:
+    """Mirrors the monitors, history and derived state into the shared store."""
+
+    def __init__(self, store: StateStore, block: LatestBlock, supervisor):
+        self.store = store
+        self.block = block
+        self.supervisor = supervisor
+        self._synced_until = ""  # Timestamp of the newest mirrored record
+
+    def attach(self):
+        """Seed the store, then follow stored records, transitions and readings."""
+        from data_logger import temp_logger, breaker_tracker
+
+        with temp_logger.lock:
+            records = list(temp_logger.data)
+        self.store.replace_records(records)
+        self._synced_until = records[-1]["timestamp"] if records else ""
+        self.publish_documents()
+        self.publish_latest()
+        logger.info("Shared store seeded: %s records in %s", len(records), self.store.filename)
+
+        # Added after the standard sinks/listeners, so they see the updated state
+        temp_logger.add_listener(self.on_records)
+        breaker_tracker.add_listener(self.on_transition)
+        self.supervisor.add_sink(self.on_reading)
+
+    def on_records(self, first_epoch: float, last_epoch: float):
+        """Temperature logger listener: mirror new records and retention."""
+        from data_logger import temp_logger
+
+        with temp_logger.lock:
+            data = temp_logger.data
+            start = bisect.bisect_right(data, self._synced_until, key=lambda d: d.get("timestamp", ""))
+            new = data[start:]
+            oldest = data[0] if data else None
+        if new:
+            self._synced_until = new[-1]["timestamp"]
+        try:
+            self.store.sync_records(new, _epoch(oldest) if oldest else None)
+        except sqlite3.Error as e:
+            logger.error("Error mirroring temperature records: %s", e)
+
+    def on_transition(self, transition: dict):
+        self.publish_documents()
+
+    def on_reading(self, reading):
+        """Supervisor sink (last): publish the new snapshots and the counters they moved."""
+        self.publish_latest()
+        self.publish_documents("usage_stats", "heat_model", "health")
+
+    def publish_latest(self):
+        from data_logger import temp_logger
+        from temperature_service import monitor
+        from tuya_service import breaker_monitor
+
+        temperature, breaker = monitor.latest_data, breaker_monitor.latest_data
+        pending = temp_logger.filter.pending
+        try:
+            self.block.write({
+                "boot_id": snapshot.BOOT_ID,
+                "published": clock.time(),
+                "temperature": {"version": temperature.version, "data": temperature},
+                "breaker": {"version": breaker.version, "data": breaker},
+                "pending": pending[2] if pending else None,
+            })
+        except ValueError as e:
+            logger.error("Error publishing latest readings: %s", e)
+
+    def publish_documents(self, *names):
+        """Publish the named documents (all by default)."""
+        builders = self._builders()
+        for name in names or builders:
+            try:
+                self.store.put_document(name, builders[name]())
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.error("Error publishing %s: %s", name, e)
+
+    def _builders(self) -> dict:
+        from data_logger import breaker_tracker
+        from session_stats import session_table
+        from usage_stats import usage_stats
+        from heat_model import heat_model
+
+        def breaker():
+            with breaker_tracker.lock:
+                return {"current_state": breaker_tracker.current_state,
+                        "state_since": breaker_tracker.state_since,
+                        "history": list(breaker_tracker.history)}
+
+        def sessions():
+            with session_table.lock:
+                return list(session_table.sessions)
+
+        return {
+            "breaker": breaker,
+            "sessions": sessions,
+            "usage_stats": usage_stats.state,
+            "heat_model": heat_model.state,
+            "health": self._health,
+        }
+
+    def _health(self) -> dict:
+        """The /health sections only the collector knows."""
+        from anomaly import detector
+        from device_io import yolink_policy, tuya_policy
+        from http_client import http_stats
+        from telegram_bot import notifier
+
+        return {
+            "io": {"yolink": yolink_policy.stats(), "tuya": tuya_policy.stats()},
+            "http": http_stats.snapshot(),
+            "telegram_outbox": notifier.outbox.stats(),
+            "anomalies": detector.snapshot(),
+            "drivers": dict(self.supervisor.states),
+            "telegram": "enabled" if notifier.enabled else "disabled",
+            "pid": os.getpid(),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Web worker side
+# ---------------------------------------------------------------------------
+
+class SharedMonitor:
+    """Read-only stand-in for a monitor: latest_data is the collector's snapshot."""
+
+    def __init__(self):
+        self.latest_data = Snapshot({"status": "initializing"}, 0)
+
+    def get_latest_data(self) -> Snapshot:
+        return self.latest_data
+
+
+class StoreReplica:
+    """Keeps a web worker's singletons in step with the collector."""
+
+    def __init__(self, filename: str = STATE_DB, block_name: str = SHARED_MEMORY_NAME):
+        self.filename = filename
+        self.block_name = block_name
+        self.temperature = SharedMonitor()
+        self.breaker = SharedMonitor()
+        self.health = {}
+        self.published = None
+        self.lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self.temperature.latest_data = self.breaker.latest_data = Snapshot({"status": "initializing"}, 0)
+        self._boot_id = None
+        self._data_version = None
+        self._versions = {}
+        self._synced_until = None  # Epoch of the newest record pulled
+
+    def _open(self):
+        """Connect in this process (again after a fork: connections can't be inherited)."""
+        self.block = LatestBlock.attach(self.block_name)
+        self.store = StateStore(self.filename)
+        self._pid = os.getpid()
+        self._reset()
+
+    def refresh(self):
+        """Pull whatever changed since the last request; StoreUnavailable without a collector."""
+        with self.lock:
+            if self._pid != os.getpid():
+                self._open()
+            _, latest = self.block.read()
+            if latest is None:
+                raise StoreUnavailable("collector has not published yet")
+            if latest["boot_id"] != self._boot_id:
+                # New collector: versions and the mirrored history start over
+                self._reset()
+                self._boot_id = snapshot.BOOT_ID = latest["boot_id"]
+            self._apply_latest(latest)
+
+            data_version = self.store.data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._sync_records()
+                self._sync_documents()
+
+    def collector_age(self) -> Optional[float]:
+        """Seconds since the collector last published."""
+        return clock.time() - self.published if self.published else None
+
+    def _apply_latest(self, latest: dict):
+        from data_logger import temp_logger
+
+        self.published = latest["published"]
+        for monitor, key in ((self.temperature, "temperature"), (self.breaker, "breaker")):
+            if monitor.latest_data.version != latest[key]["version"]:
+                monitor.latest_data = Snapshot(latest[key]["data"], latest[key]["version"])
+        pending = latest.get("pending")
+        temp_logger.filter.pending = (_epoch(pending), None, pending) if pending else None
+
+    def _sync_records(self):
+        from data_logger import temp_logger
+
+        rows = self.store.records_after(self._synced_until)
+        first = self.store.first_epoch()
+        changed = []  # (first_epoch, last_epoch) spans for the logger's listeners
+        with temp_logger.lock:
+            if self._synced_until is None:
+                temp_logger.data = [record for _, record in rows]
+                changed.append((0, float("inf")))
+            else:
+                # Drop what the collector's retention pass removed, append the new records
+                data = temp_logger.data
+                expired = 0
+                while expired < len(data) and (first is None or _epoch(data[expired]) < first):
+                    expired += 1
+                if expired:
+                    del data[:expired]
+                    changed.append((0, first or float("inf")))
+                if rows:
+                    data.extend(record for _, record in rows)
+                    changed.append((rows[0][0], rows[-1][0]))
+        if rows:
+            self._synced_until = rows[-1][0]
+        elif self._synced_until is None:
+            self._synced_until = float("-inf")
+        for span in changed:
+            temp_logger._notify(*span)  # Invalidates history_cache
+
+    def _sync_documents(self):
+        appliers = self._appliers()
+        for name, version in self.store.document_versions().items():
+            if self._versions.get(name) == version or name not in appliers:
+                continue
+            value = self.store.get_document(name)
+            if value is not None:
+                appliers[name](value)
+            self._versions[name] = version
+
+    def _appliers(self) -> dict:
+        from data_logger import breaker_tracker
+        from session_stats import session_table
+        from usage_stats import usage_stats
+        from heat_model import heat_model
+
+        def breaker(value):
+            with breaker_tracker.lock:
+                breaker_tracker.current_state = value["current_state"]
+                breaker_tracker.state_since = value["state_since"]
+                breaker_tracker.history = value["history"]
+                breaker_tracker._rebuild_sessions()
+
+        def sessions(value):
+            with session_table.lock:
+                session_table.sessions = value
+
+        def health(value):
+            self.health = value
+
+        return {
+            "breaker": breaker,
+            "sessions": sessions,
+            "usage_stats": usage_stats.apply_state,
+            "heat_model": heat_model.apply_state,
+            "health": health,
+        }
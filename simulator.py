@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Device Simulator and Accelerated Replay
+
+Runs the real pipeline offline: TemperatureMonitor.update_temperature,
+TuyaBreakerMonitor.update_status, the supervisor sinks (BreakerStateTracker,
+history, sessions, heat model, usage stats, notification rules) and the
+NotificationScheduler. It needs no YoLink credentials and no breaker on
+the LAN:
+
+- FakeYoLinkDevice stands in for the YoLink sensor (getState) and
+  FakeTuyaDevice for the tinytuya breaker (status / set_status). Both are
+  backed by one SimulatedSauna, which follows a generated schedule of
+  evening sessions with realistic heat-up / cool-down curves (SaunaModel).
+- A VirtualClock (clock.py) drives everything. Each poll advances it by
+  REFRESH_INTERVAL with no waiting, so a month replays in a few minutes,
+  mostly spent in the real save_to_disk calls. Use --speed 1000 to pace it
+  at 1000x real time for soak tests.
+- Telegram messages are captured with their virtual timestamps instead of
+  being sent.
+
+All state files are written to a scratch directory (or --workdir).
+
+Usage:
+    python simulator.py --days 30
+    python simulator.py --days 30 --speed 1000
+    python simulator.py --days 90 --profile replay.pstats
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import clock
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SessionSchedule:
+    """Heater ON intervals (epoch seconds): 2-3 evening sessions a week."""
+
+    def __init__(self, sessions: list):
+        self.sessions = sessions
+        self._i = 0
+
+    @classmethod
+    def generate(cls, start: float, days: int, seed: int = 1) -> "SessionSchedule":
+        rng = random.Random(seed)
+        sessions = []
+        day = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+        for _ in range(days + 1):
+            day += timedelta(days=1)
+            if rng.random() < 0.35:
+                on = day + timedelta(hours=rng.uniform(16, 20))
+                sessions.append((on.timestamp(), on.timestamp() + rng.uniform(2, 4) * 3600))
+        return cls(sessions)
+
+    def is_on(self, epoch: float) -> bool:
+        """Scheduled state at `epoch` (queries must move forward in time)."""
+        while self._i < len(self.sessions) and self.sessions[self._i][1] <= epoch:
+            self._i += 1
+        return self._i < len(self.sessions) and self.sessions[self._i][0] <= epoch
+
+
+class SimulatedSauna:
+    """The physical sauna shared by the fake sensor and the fake breaker."""
+
+    def __init__(self, schedule: SessionSchedule, model=None, noise: float = 0.1):
+        from sensor_drivers import SaunaModel
+
+        self.schedule = schedule
+        self.model = model or SaunaModel()
+        self.noise = noise
+        self.override = None  # (state, schedule state when set) after a manual switch
+        self._last = clock.time()
+
+    @property
+    def breaker_on(self) -> bool:
+        scheduled = self.schedule.is_on(clock.time())
+        if self.override is not None:
+            if self.override[1] == scheduled:
+                return self.override[0]
+            self.override = None  # Next scheduled edge takes over again
+        return scheduled
+
+    def set_switch(self, on: bool):
+        self.override = (on, self.schedule.is_on(clock.time()))
+
+    def read(self) -> dict:
+        """Advance the thermal model to now and sample it."""
+        now = clock.time()
+        self.model.advance(now - self._last, self.breaker_on)
+        self._last = now
+        return {
+            "temperature": round(self.model.temperature + random.gauss(0, self.noise), 1),
+            "humidity": round(self.model.humidity),
+        }
+
+
+class FakeYoLinkDevice:
+    """Stands in for yolink.device.YoLinkDevice; getState reads the simulated sauna."""
+
+    device_type = "THSensor"
+    device_model_name = "YS8003-UC (simulated)"
+
+    def __init__(self, sauna: SimulatedSauna, failure_rate: float = 0.0):
+        self.sauna = sauna
+        self.failure_rate = failure_rate
+        self.device_name = "Simulated Sauna"
+        self.device_id = "simulated-yolink"
+
+    async def get_state(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("simulated YoLink timeout")
+        return SimpleNamespace(data={"online": True, "state": self.sauna.read()})
+
+
+class FakeTuyaDevice:
+    """Stands in for tinytuya.Device on the LAN."""
+
+    def __init__(self, sauna: SimulatedSauna, failure_rate: float = 0.0):
+        self.sauna = sauna
+        self.failure_rate = failure_rate
+
+    def set_socketTimeout(self, timeout: float):
+        pass
+
+    def status(self) -> dict:
+        if self.failure_rate and random.random() < self.failure_rate:
+            return {"Error": "Network Error: Device Unreachable", "Err": "905"}
+        return {"dps": {"1": self.sauna.breaker_on}}
+
+    def set_status(self, on: bool, switch: int = 1) -> dict:
+        self.sauna.set_switch(on)
+        return {"dps": {str(switch): on}}
+
+
+class RecordingOutbox:
+    """Replaces the Telegram outbox: keeps (virtual time, text) instead of sending."""
+
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, chat_id, text: str, **options):
+        self.messages.append((clock.now(), text))
+
+
+async def replay(days: int, interval: float, speed: float = 0.0, seed: int = 1,
+                 failure_rate: float = 0.0) -> dict:
+    """Replay `days` of simulated operation ending now; returns a summary."""
+    import config
+    from data_logger import temp_logger, breaker_tracker
+    from notification_scheduler import scheduler
+    from sensor_drivers import build_supervisor
+    from session_stats import session_table
+    from heat_model import heat_model
+    from anomaly import detector
+    from usage_stats import usage_stats
+    from temperature_service import monitor
+    from tuya_service import breaker_monitor
+    from telegram_bot import notifier
+
+    random.seed(seed)
+    start = clock.time()
+    schedule = SessionSchedule.generate(start, days, seed)
+    sauna = SimulatedSauna(schedule)
+
+    config.SENSOR_DRIVERS = ["yolink", "tuya"]
+    supervisor = build_supervisor()
+    # Devices are "discovered" directly instead of through driver.initialize()
+    monitor.temperature_device = FakeYoLinkDevice(sauna, failure_rate)
+    monitor.publish(device_name="Simulated Sauna", device_id="simulated-yolink")
+    breaker_monitor.device = FakeTuyaDevice(sauna, failure_rate)
+    breaker_monitor.publish(status="initializing")
+
+    outbox = RecordingOutbox()
+    notifier.enabled = True
+    notifier.chat_id = "replay"
+    notifier.outbox = outbox
+    scheduler.start(background=False)
+
+    steps = int(days * 86400 / interval)
+    polls = 0
+    wall_start = time.perf_counter()
+    for step in range(steps):
+        clock.current().advance(interval)
+        for driver in supervisor.drivers:
+            reading = await driver.poll()
+            polls += 1
+            if reading is not None:
+                supervisor.publish(reading)
+        scheduler.run_pending()
+        if speed:
+            ahead = (step + 1) * interval / speed - (time.perf_counter() - wall_start)
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+    wall = time.perf_counter() - wall_start
+
+    temp_logger.flush()
+    temp_logger.save_to_disk()
+    usage_stats.save_to_disk()
+    scheduler.running = False
+
+    return {
+        "virtual_days": days,
+        "wall_seconds": wall,
+        "speedup": days * 86400 / wall if wall else None,
+        "polls": polls,
+        "scheduled_sessions": len(schedule.sessions),
+        "stored_records": len(temp_logger.data),
+        "transitions": len(breaker_tracker.history),
+        "sessions": session_table.get_sessions(),
+        "notifications": outbox.messages,
+        "prediction": heat_model.predict(20.0),
+        "anomalies": detector.snapshot(),
+    }
+
+
+def print_summary(summary: dict, workdir: str):
+    print(f"\nReplayed {summary['virtual_days']} days in {summary['wall_seconds']:.1f}s "
+          f"(x{summary['speedup']:,.0f}), {summary['polls']:,} polls")
+    print(f"  Scheduled sessions:  {summary['scheduled_sessions']}")
+    print(f"  Recorded sessions:   {len(summary['sessions'])}")
+    print(f"  Breaker transitions: {summary['transitions']}")
+    print(f"  Stored temperature records: {summary['stored_records']:,}")
+    prediction = summary["prediction"]
+    if prediction:
+        print(f"  Heat model: tau {prediction.get('tau_minutes')} min, "
+              f"equilibrium {prediction.get('equilibrium_temp')}°C")
+    flags = summary["anomalies"].get("flags") if isinstance(summary["anomalies"], dict) else None
+    if flags:
+        print(f"  Anomaly flags: {', '.join(flags)}")
+
+    print(f"\nTelegram messages ({len(summary['notifications'])}):")
+    for when, text in summary["notifications"]:
+        first_line = re.sub(r"<[^>]+>", "", text).strip().split("\n")[0]
+        print(f"  {when.astimezone().strftime('%a %b %d %H:%M')}  {first_line}")
+    print(f"\nState files: {workdir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30, help="simulated days to replay")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="pace at N x real time (default: as fast as possible)")
+    parser.add_argument("--interval", type=float, help="seconds between polls (default REFRESH_INTERVAL)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="fraction of device calls that fail (note: retries back off in real time)")
+    parser.add_argument("--workdir", help="directory for state files (default: a scratch directory)")
+    parser.add_argument("--profile", metavar="FILE", help="cProfile the replay and write pstats to FILE")
+    parser.add_argument("--verbose", action="store_true", help="show INFO logs from the pipeline")
+    args = parser.parse_args()
+
+    # The virtual clock must be in place before the pipeline modules load
+    # their state, and they must load it from the scratch directory
+    sys.path.insert(0, REPO_DIR)
+    profile_path = os.path.abspath(args.profile) if args.profile else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="sauna-replay-"))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    clock.use(clock.VirtualClock(time.time() - args.days * 86400))
+
+    import config
+    config.TELEGRAM_ENABLED = False
+    config.TUYA_ENABLED = True
+    config.LOG_LEVEL = "INFO" if args.verbose else "WARNING"
+    from logging_setup import setup_logging
+    setup_logging()
+
+    interval = args.interval or config.REFRESH_INTERVAL
+    run = replay(args.days, interval, args.speed, args.seed, args.failure_rate)
+    if profile_path:
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        summary = profile.runcall(asyncio.run, run)
+        profile.dump_stats(profile_path)
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(25)
+    else:
+        summary = asyncio.run(run)
+    print_summary(summary, workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Copy-on-write Snapshots for Live Readings
+
+TemperatureMonitor.latest_data and TuyaBreakerMonitor.latest_data are
+immutable Snapshot dicts. A poll never edits one in place: it builds the
+next snapshot (old fields + changes, version + 1) and swaps the reference.
+Readers (Flask, Telegram, the scheduler) grab `monitor.latest_data` once and
+see one consistent reading, without locks or copies. A new temperature can
+never pair with the previous last_update.
+
+The version doubles as an HTTP ETag (see etag()).
+"""
+
+import threading
+import time
+
+# Distinguishes versions across restarts (versions start again at 1)
+BOOT_ID = format(int(time.time() * 1000), "x")
+
+
+class Snapshot(dict):
+    """Read-only dict with a version number."""
+
+    __slots__ = ("version",)
+
+    def __init__(self, data=(), version: int = 1):
+        super().__init__(data)
+        self.version = version
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Snapshot is read-only; publish a new one instead")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def copy(self) -> dict:
+        """Plain mutable copy."""
+        return dict(self)
+
+    def evolve(self, **changes) -> "Snapshot":
+        """Next version with `changes` applied."""
+        return Snapshot({**self, **changes}, self.version + 1)
+
+
+class SnapshotPublisher:
+    """Mixin for monitors: latest_data is a Snapshot replaced on every publish()."""
+
+    def _init_snapshot(self, data: dict):
+        self._publish_lock = threading.Lock()  # Serializes writers only
+        self._snapshot = Snapshot(data)
+
+    @property
+    def latest_data(self) -> Snapshot:
+        return self._snapshot
+
+    @latest_data.setter
+    def latest_data(self, data: dict):
+        """Replace the whole reading (still a new version, never an in-place edit)."""
+        with self._publish_lock:
+            self._snapshot = Snapshot(data, self._snapshot.version + 1)
+
+    def publish(self, **changes) -> Snapshot:
+        """Swap in a new snapshot with `changes` applied; no-op if nothing changed."""
+        with self._publish_lock:
+            current = self._snapshot
+            if all(key in current and current[key] == value for key, value in changes.items()):
+                return current
+            self._snapshot = current.evolve(**changes)
+            return self._snapshot
+
+    def get_latest_data(self) -> Snapshot:
+        """Current snapshot (immutable; use .copy() to get a mutable dict)."""
+        return self._snapshot
+
+
+def etag(*snapshots: Snapshot) -> str:
+    """Entity tag for a response built from these snapshots."""
+    return "-".join([BOOT_ID] + [str(s.version) for s in snapshots])
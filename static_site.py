@@ -0,0 +1,160 @@
+"""
+Static Publish Mode
+
+Optional (STATIC_PUBLISH_DIR): after each reading or breaker transition the
+share page is written out as static files, so nginx or any static host can
+serve viewers without touching Python:
+
+    index.html              pre-rendered dashboard; polls the two files below
+    latest.json             same body as /api/temperature
+    timeline.json           same body as /api/timeline (the chart)
+    history-24h.json        avg/min/max per 5 minutes (7d: 30 min, 30d: 2 h)
+    static/                 page assets
+
+Each file is written under a temporary name and renamed into place, so
+readers never see a partial file, and gets a pre-compressed .gz twin
+(nginx: gzip_static on). Unchanged files are left alone. Rendering runs on
+its own thread; readings only wake it, so polls never wait on disk I/O.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Callable, Optional
+
+import clock
+import config
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# name -> (span, bucket) in seconds
+HISTORY_FILES = {
+    "24h": (86400, 300),
+    "7d": (7 * 86400, 1800),
+    "30d": (30 * 86400, 7200),
+}
+HISTORY_AGGS = ("avg", "min", "max")
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), sort_keys=True).encode()
+
+
+class StaticSite:
+    """Writes the share page and its data files into output_dir."""
+
+    def __init__(self, output_dir: Optional[str], min_interval: float = 10):
+        self.output_dir = output_dir
+        self.enabled = bool(output_dir)
+        self.min_interval = min_interval  # Between publishes for readings; transitions go out at once
+        self.render = None
+        self.publishes = 0
+        self.last_publish = 0.0
+        self._digests = {}  # file name -> digest of what is on disk
+        self._wake = threading.Event()
+        self._urgent = threading.Event()
+        self._thread = None
+
+    def attach(self, supervisor, render: Callable):
+        """Publish on the supervisor's readings and on breaker transitions.
+
+        render(data, breaker_data, ready_eta, latest_url=, timeline_url=,
+        static_url=) returns the page HTML (web_server.render_dashboard).
+        """
+        from data_logger import breaker_tracker
+
+        if not self.enabled or self._thread is not None:
+            return
+        self.render = render
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._copy_assets()
+        supervisor.add_sink(self.on_reading)
+        breaker_tracker.add_listener(self.on_transition)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="static-site")
+        self._thread.start()
+        self._wake.set()  # First publish right away (warm-start readings)
+        logger.info("Static publish mode: writing the share page to %s", self.output_dir)
+
+    def on_reading(self, reading):
+        self._wake.set()
+
+    def on_transition(self, transition: dict):
+        self._urgent.set()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            delay = self.last_publish + self.min_interval - time.monotonic()
+            if delay > 0:
+                self._urgent.wait(delay)  # Coalesce the readings that arrive meanwhile
+            self._wake.clear()
+            self._urgent.clear()
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error("Error publishing static site: %s", e)
+            self.last_publish = time.monotonic()
+
+    def publish(self) -> int:
+        """Render and write every file; returns how many changed."""
+        from heat_model import heat_model, format_eta
+        from history_query import history_cache
+        from temperature_service import monitor
+        from timeline import build_timeline
+        from tuya_service import breaker_monitor
+
+        temperature, breaker = monitor.latest_data, breaker_monitor.latest_data
+        prediction = heat_model.predict(temperature.get("temperature"))
+        page = self.render(temperature, breaker, format_eta(prediction),
+                           latest_url="latest.json", timeline_url="timeline.json", static_url="static")
+
+        files = {
+            "latest.json": _json({"temperature": temperature, "breaker": breaker, "heating": prediction}),
+            "index.html": page.encode(),
+            "timeline.json": _json(build_timeline()),
+        }
+        now = clock.time()
+        for name, (span, bucket) in HISTORY_FILES.items():
+            rows = history_cache.query(now - span, None, bucket, HISTORY_AGGS)
+            files[f"history-{name}.json"] = _json({"bucket_seconds": bucket, "rows": rows})
+
+        changed = sum(self._write(name, data) for name, data in files.items())
+        self.publishes += 1
+        logger.debug("Static site published (%s files changed)", changed)
+        return changed
+
+    def _write(self, name: str, data: bytes) -> bool:
+        """Atomically replace name and name.gz, unless the content is unchanged."""
+        digest = hashlib.sha1(data).digest()
+        if self._digests.get(name) == digest:
+            return False
+        for filename, body in ((name, data), (name + ".gz", gzip.compress(data, mtime=0))):
+            path = os.path.join(self.output_dir, filename)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        self._digests[name] = digest
+        return True
+
+    def _copy_assets(self):
+        """Copy static/ next to the page (only files that are missing or older)."""
+        target = os.path.join(self.output_dir, "static")
+        os.makedirs(target, exist_ok=True)
+        for name in os.listdir(ASSETS_DIR):
+            src, dst = os.path.join(ASSETS_DIR, name), os.path.join(target, name)
+            if os.path.isfile(src) and (not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src)):
+                shutil.copy2(src, dst)
+
+
+# Global publisher (disabled unless STATIC_PUBLISH_DIR is set)
+static_site = StaticSite(getattr(config, "STATIC_PUBLISH_DIR", None),
+                         getattr(config, "STATIC_PUBLISH_INTERVAL", 10))
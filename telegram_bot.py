@@ -4,19 +4,20 @@ Telegram Bot Service for Sauna Monitor
 Sends event-driven notifications to a Telegram group about sauna status.
 """
 
-import asyncio
 from datetime import datetime, timedelta
 from typing import Optional
 import logging
 
 try:
     from telegram import Bot
-    from telegram.error import TelegramError
+    from telegram.error import BadRequest, Forbidden, InvalidToken, RetryAfter, TelegramError
     TELEGRAM_AVAILABLE = True
 except ImportError:
     TELEGRAM_AVAILABLE = False
 
 import config
+from metrics import telegram_latency
+from telegram_outbox import PermanentSendError, RetryLater, TelegramOutbox
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +29,8 @@ class TelegramNotifier:
         self.bot: Optional[Bot] = None
         self.chat_id: Optional[str] = None
         self.enabled = False
-        self.last_ready_notification = None  # Track when we last sent "ready" notification
         self.last_weekly_reminder = None  # Track last weekly reminder to avoid spam
+        self.outbox = TelegramOutbox(self._deliver)
 
         if not config.TELEGRAM_ENABLED:
             logger.info("Telegram notifications disabled in config")
@@ -51,45 +52,41 @@ class TelegramNotifier:
         except Exception as e:
             logger.error(f"Failed to initialize Telegram bot: {e}")
 
-    async def send_message(self, message: str, disable_web_page_preview: bool = False):
-        """Send a message to the configured Telegram chat."""
-        if not self.enabled:
-            return
-
+    async def _deliver(self, message: dict):
+        """Send one queued message (runs on the outbox worker's event loop)."""
         try:
-            await self.bot.send_message(
-                chat_id=self.chat_id,
-                text=message,
-                parse_mode='HTML',
-                disable_web_page_preview=disable_web_page_preview
-            )
-            logger.info(f"Sent Telegram message: {message}")
+            with telegram_latency.time():
+                await self.bot.send_message(
+                    chat_id=message["chat_id"],
+                    text=message["text"],
+                    parse_mode='HTML',
+                    **message["options"],
+                )
+            logger.info(f"Sent Telegram message: {message['text']}")
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            raise RetryLater(getattr(retry_after, "total_seconds", lambda: retry_after)()) from e
+        except (BadRequest, Forbidden, InvalidToken) as e:
+            raise PermanentSendError(str(e)) from e
         except TelegramError as e:
             logger.error(f"Failed to send Telegram message: {e}")
-        except Exception as e:
-            logger.error(f"Unexpected error sending Telegram message: {e}")
+            raise
+
+    async def send_message(self, message: str, disable_web_page_preview: bool = False):
+        """Queue a message for the configured Telegram chat (safe from any event loop)."""
+        self.send_message_sync(message, disable_web_page_preview)
 
     def send_message_sync(self, message: str, disable_web_page_preview: bool = False):
-        """Synchronous wrapper for sending messages."""
+        """Queue a message for the configured Telegram chat; returns immediately.
+
+        Delivery, pacing and retries happen on the outbox worker thread.
+        """
         if not self.enabled:
             return
 
-        try:
-            # Create a new event loop if we're not in an async context
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If loop is running, schedule the task
-                    asyncio.create_task(self.send_message(message, disable_web_page_preview))
-                else:
-                    loop.run_until_complete(self.send_message(message, disable_web_page_preview))
-            except RuntimeError:
-                # No event loop, create a new one
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(self.send_message(message, disable_web_page_preview))
-        except Exception as e:
-            logger.error(f"Error in send_message_sync: {e}")
+        self.outbox.enqueue(
+            self.chat_id, message, disable_web_page_preview=disable_web_page_preview
+        )
 
     def notify_heater_on(self):
         """Notify that the heater turned on."""
@@ -102,13 +99,10 @@ class TelegramNotifier:
         self.send_message_sync(message)
 
     def notify_sauna_ready(self, temperature: float):
-        """Notify that sauna reached target temperature (90°C)."""
-        # Only send once per heating session - reset when heater turns off
-        if self.last_ready_notification is not None:
-            # Already sent during this session, don't send again
-            return
+        """Notify that sauna reached target temperature (90°C).
 
-        self.last_ready_notification = datetime.now()
+        Once-per-session dedup is handled by the "sauna_ready" notification rule.
+        """
         message = (
             f"🌡️ <b>TIME TO GET BUTT NAKED!</b> 🍑\n\n"
             f"Sauna hit {temperature}°C ! 🔥\n\n"
@@ -162,10 +156,6 @@ class TelegramNotifier:
 
         self.send_message_sync(message)
 
-    def reset_ready_notification(self):
-        """Reset the ready notification tracker (call when heater turns off)."""
-        self.last_ready_notification = None
-
 
 # Global notifier instance
 notifier = TelegramNotifier()
@@ -182,6 +172,10 @@ except ImportError:
     COMMANDS_AVAILABLE = False
 
 
+HISTORY_PAGE_SIZE = 15
+SESSIONS_SHOWN = 5
+
+
 async def _status_command(update, context):
     """Reply to /status with current sauna temperature and heater state."""
     try:
@@ -201,6 +195,12 @@ async def _status_command(update, context):
 
         if breaker_on:
             state_line = f"🔥 Heater: ON (for {duration})"
+            from heat_model import heat_model, format_eta
+            eta = format_eta(heat_model.predict(temp))
+            if eta == "ready":
+                state_line += "\n✅ Ready!"
+            elif eta:
+                state_line += f"\n⏳ Ready in {eta}"
         else:
             state_line = f"❄️ Heater: OFF (for {duration})"
 
@@ -217,47 +217,70 @@ async def _status_command(update, context):
 
 
 async def _history_command(update, context):
-    """Reply to /history with all sauna ON sessions and their durations."""
+    """Reply to /history [page] with sauna ON sessions, newest first."""
     try:
-        import json
-        from datetime import datetime
-
-        with open('/Users/pavelkletskov/yolink/temp-monitor/breaker_history.json', 'r') as fh:
-            data = json.load(fh)
-
-        history = data.get('history', [])
-        sessions = []
-
-        for entry in history:
-            if entry.get('state') is not True:
-                continue
-            duration_s = entry.get('duration_seconds', 0)
-            if duration_s < 120:
-                continue  # skip blips under 2 min
-            ts = datetime.fromisoformat(entry['timestamp'])
-            ts_local = ts.astimezone()
-            date_str = ts_local.strftime('%b %d')
-            time_str = ts_local.strftime('%I:%M %p').lstrip('0')
-            h = int(duration_s // 3600)
-            m = int((duration_s % 3600) // 60)
-            dur_str = (f'{h}h {m}m' if h > 0 else f'{m}m')
-            sessions.append(f'🔥 {date_str} {time_str} — {dur_str}')
+        # Import here to avoid circular imports
+        from data_logger import breaker_tracker
+
+        try:
+            page = int(context.args[0]) if context.args else 1
+        except ValueError:
+            page = 1
 
+        sessions, total, pages = breaker_tracker.get_sessions_page(page, HISTORY_PAGE_SIZE)
         if not sessions:
             await update.message.reply_text('No sauna sessions recorded yet.')
             return
 
-        sessions = sessions[::-1][:15]
+        page = min(max(page, 1), pages)
+        if pages == 1:
+            label = f'all {total}'
+        else:
+            label = f'page {page}/{pages} of {total}'
         body = chr(10).join(sessions)
-        total = len(data['history'])
-        on_count = sum(1 for e in data['history'] if e.get('state') is True and e.get('duration_seconds',0) >= 120)
-        label = f'all {on_count}' if on_count <= 15 else f'last 15 of {on_count}'
         msg = f'<b>Sauna History</b> ({label} sessions)' + chr(10) + chr(10) + body
+        if page < pages:
+            msg += chr(10) + chr(10) + f'Older: /history {page + 1}'
         await update.message.reply_text(msg, parse_mode='HTML')
 
     except Exception as e:
         await update.message.reply_text(f'Error fetching history: {e}')
 
+
+async def _sessions_command(update, context):
+    """Reply to /sessions with stats for the most recent heating sessions."""
+    try:
+        # Import here to avoid circular imports
+        from session_stats import session_table
+
+        rows = session_table.get_sessions(SESSIONS_SHOWN)
+        if not rows:
+            await update.message.reply_text('No heating sessions recorded yet.')
+            return
+
+        blocks = []
+        for row in rows:
+            ts_local = datetime.fromisoformat(row['start']).astimezone()
+            h, m = divmod(row['duration_seconds'] // 60, 60)
+            lines = [f"🔥 <b>{ts_local.strftime('%b %d')}</b> — {h}h {m}m"]
+            if row['peak_temp'] is not None:
+                lines.append(f"Start {row['start_temp']}°C → peak {row['peak_temp']}°C")
+            if row['time_to_ready_seconds'] is not None:
+                lines.append(
+                    f"Ready in {row['time_to_ready_seconds'] // 60}m, "
+                    f"held {row['avg_hold_temp']}°C"
+                )
+            if row['heating_rate'] is not None:
+                lines.append(f"Heating {row['heating_rate']}°C/min")
+            blocks.append(chr(10).join(lines))
+
+        msg = '<b>Recent Sessions</b>' + chr(10) + chr(10) + (chr(10) + chr(10)).join(blocks)
+        await update.message.reply_text(msg, parse_mode='HTML')
+
+    except Exception as e:
+        await update.message.reply_text(f'Error fetching sessions: {e}')
+
+
 def start_command_polling():
     """Start the Telegram bot polling loop in a background thread (non-blocking)."""
     if not COMMANDS_AVAILABLE:
@@ -277,11 +300,11 @@ def start_command_polling():
             app = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
             app.add_handler(TGCommandHandler("status", _status_command))
             app.add_handler(TGCommandHandler("history", _history_command))
+            app.add_handler(TGCommandHandler("sessions", _sessions_command))
             await app.initialize()
             await app.start()
             await app.updater.start_polling(drop_pending_updates=True)
             logger.info("Telegram /status command handler started (polling)")
-            print("Telegram polling started OK", flush=True)
             # Run forever
             await asyncio.Event().wait()
 
@@ -290,4 +313,3 @@ def start_command_polling():
     t = threading.Thread(target=_run, daemon=True, name="telegram-polling")
     t.start()
     logger.info("Telegram command polling thread launched")
-    print("Telegram polling thread launched", flush=True)
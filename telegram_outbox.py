@@ -0,0 +1,244 @@
+"""
+Telegram Outbox
+
+A single worker thread (with its own event loop) delivers every outgoing
+Telegram message. Any thread can enqueue without blocking; the worker
+paces sends with token buckets that respect Telegram's per-chat limits,
+retries transient failures with exponential backoff, and keeps pending
+messages in a small JSON file so alerts survive restarts.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentSendError(Exception):
+    """The message can never be delivered (bad request, bot kicked, ...) - drop it."""
+
+
+class RetryLater(Exception):
+    """The API asked us to wait (flood control) before sending again."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"Retry in {seconds}s")
+        self.seconds = seconds
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class TelegramOutbox:
+    """Thread-safe, rate-limited, persistent queue of outgoing messages."""
+
+    # Telegram: ~1 message/second per chat, 20 messages/minute per group
+    CHAT_RATE = 1.0
+    CHAT_BURST = 1
+    GROUP_RATE = 20 / 60
+    GROUP_BURST = 5
+
+    MAX_ATTEMPTS = 8
+    MAX_BACKOFF = 300
+    MAX_PENDING = 200
+
+    def __init__(self, send: Callable[[dict], Awaitable[None]], filename="telegram_outbox.json"):
+        self.send = send  # async callable delivering one message dict
+        self.filename = filename
+        self.pending = deque()  # message dicts, oldest first
+        self.sent = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer of the file at a time, newest snapshot last
+        self._buckets = {}  # chat_id -> [TokenBucket, ...]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.load_from_disk()
+
+    def load_from_disk(self):
+        """Load messages that were still pending when the service stopped."""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    self.pending = deque(json.load(f))
+                if self.pending:
+                    logger.info("Loaded %s pending Telegram messages from %s", len(self.pending), self.filename)
+            except Exception as e:
+                logger.error("Error loading Telegram outbox: %s", e)
+                self.pending = deque()
+
+    def save_to_disk(self):
+        """Persist the pending queue atomically."""
+        try:
+            with self._save_lock:
+                with self.lock:
+                    payload = json.dumps(list(self.pending))
+                tmp_name = f"{self.filename}.tmp"
+                with open(tmp_name, 'w') as f:
+                    f.write(payload)
+                os.replace(tmp_name, self.filename)
+        except Exception as e:
+            logger.error("Error saving Telegram outbox: %s", e)
+
+    def enqueue(self, chat_id: str, text: str, **options):
+        """Queue a message from any thread; never blocks on the network."""
+        message = {
+            "id": uuid.uuid4().hex,
+            "chat_id": chat_id,
+            "text": text,
+            "options": options,
+            "attempts": 0,
+            "not_before": 0,
+            "created": time.time(),
+        }
+        with self.lock:
+            if len(self.pending) >= self.MAX_PENDING:
+                dropped = self.pending.popleft()
+                self.dropped += 1
+                logger.warning("Telegram outbox full, dropping oldest message: %r", dropped["text"][:40])
+            self.pending.append(message)
+        self.save_to_disk()
+        self.start()
+        self._wake()
+
+    def _wake(self):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Loop shutting down
+
+    def start(self):
+        """Start the worker thread (idempotent)."""
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="telegram-outbox")
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Stop the worker; anything unsent stays on disk for the next start."""
+        self._stopping = True
+        self._wake()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._wakeup = asyncio.Event()
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._worker())
+        finally:
+            self._loop = None
+            loop.close()
+
+    def _buckets_for(self, chat_id: str) -> list:
+        buckets = self._buckets.get(chat_id)
+        if buckets is None:
+            buckets = [TokenBucket(self.CHAT_RATE, self.CHAT_BURST)]
+            if str(chat_id).startswith("-"):  # Group/supergroup chat ids are negative
+                buckets.append(TokenBucket(self.GROUP_RATE, self.GROUP_BURST))
+            self._buckets[chat_id] = buckets
+        return buckets
+
+    def _next_message(self) -> tuple:
+        """Return (message, wait_seconds) for the head of the queue."""
+        with self.lock:
+            if not self.pending:
+                return None, None
+            message = self.pending[0]
+        buckets = self._buckets_for(message["chat_id"])
+        wait = max([message["not_before"] - time.time()] + [b.delay() for b in buckets])
+        return message, max(0.0, wait)
+
+    async def _sleep(self, seconds: Optional[float]):
+        """Sleep until timeout or until a new message / stop request arrives."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self):
+        while not self._stopping:
+            # Clear before looking at the queue so an enqueue in between isn't missed
+            self._wakeup.clear()
+            message, wait = self._next_message()
+            if message is None:
+                await self._sleep(None)
+                continue
+            if wait > 0:
+                await self._sleep(wait)
+                continue
+
+            for bucket in self._buckets_for(message["chat_id"]):
+                bucket.take()
+            try:
+                await self.send(message)
+            except PermanentSendError as e:
+                logger.warning("Dropping undeliverable Telegram message: %s", e)
+                self.dropped += 1
+                self._remove(message)
+            except RetryLater as e:
+                logger.warning("Telegram flood control, waiting %ss", e.seconds)
+                message["not_before"] = time.time() + e.seconds
+                self.save_to_disk()
+            except Exception as e:
+                message["attempts"] += 1
+                if message["attempts"] >= self.MAX_ATTEMPTS:
+                    logger.warning("Giving up on Telegram message after %s attempts: %s", message["attempts"], e)
+                    self.dropped += 1
+                    self._remove(message)
+                else:
+                    # Exponential backoff with full jitter
+                    backoff = random.uniform(0, min(self.MAX_BACKOFF, 2 ** message["attempts"]))
+                    logger.warning("Telegram send failed (%s), retry %s in %.0fs", e, message["attempts"], backoff)
+                    message["not_before"] = time.time() + backoff
+                    self.save_to_disk()
+            else:
+                self.sent += 1
+                self._remove(message)
+
+    def _remove(self, message: dict):
+        with self.lock:
+            try:
+                self.pending.remove(message)
+            except ValueError:
+                pass
+        self.save_to_disk()
+
+    def stats(self) -> dict:
+        with self.lock:
+            pending = len(self.pending)
+        return {"pending": pending, "sent": self.sent, "dropped": self.dropped}
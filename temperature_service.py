@@ -6,6 +6,7 @@ and keeps the latest readings in memory for the web server.
 """
 
 import asyncio
+import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -16,16 +17,18 @@ from yolink.client import YoLinkClient
 from yolink.const import OAUTH2_TOKEN
 from yolink.device import YoLinkDevice, YoLinkDeviceMode
 from yolink.endpoint import Endpoints
+from yolink.exception import YoLinkAuthFailError, YoLinkClientError
 
+import clock
 import config
-from data_logger import temp_logger, breaker_tracker
+from device_io import yolink_policy
+from http_client import create_session, endpoint
+from metrics import yolink_latency
+from profiling import timed
+from snapshot import SnapshotPublisher
+from warm_cache import warm_cache
 
-try:
-    from telegram_bot import notifier
-    TELEGRAM_IMPORTED = True
-except ImportError:
-    TELEGRAM_IMPORTED = False
-    notifier = None
+logger = logging.getLogger(__name__)
 
 
 class SimpleAuthManager(YoLinkAuthMgr):
@@ -41,6 +44,17 @@ class SimpleAuthManager(YoLinkAuthMgr):
     def access_token(self) -> str:
         return self._access_token or ""
 
+    def use_cached_token(self, access_token: str, expires_at: datetime) -> None:
+        """Seed the manager with a still-valid token from the warm-start cache."""
+        self._access_token = access_token
+        self._token_expires_at = expires_at
+
+    def invalidate_token(self) -> None:
+        """Drop the current token so the next request fetches a new one."""
+        self._access_token = None
+        self._token_expires_at = None
+        warm_cache.clear_token()
+
     async def check_and_refresh_token(self) -> str:
         if (
             self._access_token is None
@@ -51,6 +65,10 @@ class SimpleAuthManager(YoLinkAuthMgr):
         return self._access_token
 
     async def _fetch_token(self) -> None:
+        with endpoint("oauth2.token"):
+            await self._request_token()
+
+    async def _request_token(self) -> None:
         async with self._session.post(
             OAUTH2_TOKEN,
             data={
@@ -64,13 +82,14 @@ class SimpleAuthManager(YoLinkAuthMgr):
             self._access_token = data["access_token"]
             expires_in = data.get("expires_in", 7200)
             self._token_expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+            warm_cache.set_token(self._access_token, self._token_expires_at)
 
 
-class TemperatureMonitor:
+class TemperatureMonitor(SnapshotPublisher):
     """Monitors YoLink temperature sensors and stores latest readings."""
 
     def __init__(self):
-        self.latest_data = {
+        self._init_snapshot({
             "temperature": None,
             "humidity": None,
             "device_name": None,
@@ -79,76 +98,146 @@ class TemperatureMonitor:
             "status": "initializing",
             "error": None,
             "temp_unit": "°F" if config.DISPLAY_FAHRENHEIT else "°C",
-        }
+            "stale": False,
+        })
         self.session: Optional[aiohttp.ClientSession] = None
+        self.auth_mgr: Optional[SimpleAuthManager] = None
         self.client: Optional[YoLinkClient] = None
         self.temperature_device: Optional[YoLinkDevice] = None
+        self._device_from_cache = False
+        self._load_cached_reading()
 
-    async def initialize(self):
-        """Initialize connection to YoLink API and find temperature sensor."""
-        try:
-            print("Initializing YoLink Temperature Monitor...")
-            self.session = aiohttp.ClientSession()
-            auth_mgr = SimpleAuthManager(self.session, config.YOLINK_UAID, config.YOLINK_SECRET_KEY)
-            self.client = YoLinkClient(auth_mgr)
+    def _load_cached_reading(self):
+        """Seed latest_data with the last known reading so the page has something to show."""
+        cached = warm_cache.get_reading("temperature")
+        if not cached or cached.get("temperature") is None:
+            return
+        self.publish(
+            temperature=cached.get("temperature"),
+            humidity=cached.get("humidity"),
+            device_name=cached.get("device_name"),
+            device_id=cached.get("device_id"),
+            last_update=cached.get("last_update"),
+            status="stale",
+            stale=True,
+        )
 
-            # Authenticate
-            await auth_mgr.check_and_refresh_token()
-            print("✓ Successfully authenticated with YoLink API")
+    async def initialize(self):
+        """Initialize connection to YoLink API and find temperature sensor.
 
-            # Fetch device list
-            response = await self.client.execute(
-                url=Endpoints.US.value.url, bsdp={"method": "Home.getDeviceList"}
-            )
-            devices = response.data.get("devices", [])
-
-            if not devices:
-                raise Exception("No devices found in your YoLink account")
-
-            # Find temperature sensor (look for THSensor or similar)
-            temp_devices = [
-                d
-                for d in devices
-                if "temperature" in d.get("type", "").lower()
-                or "thsensor" in d.get("type", "").lower()
-            ]
-
-            if not temp_devices:
-                # If no specific temperature device, list all devices
-                print("\nAvailable devices:")
-                for dev in devices:
-                    print(f"  - {dev.get('name')} ({dev.get('type')})")
-                raise Exception(
-                    "No temperature sensor found. Please check device list above."
+        A still-valid cached token and the cached device record are reused,
+        so a warm restart makes no cloud calls until the first poll.
+        """
+        try:
+            logger.info("Initializing YoLink Temperature Monitor...")
+            if self.session is None:
+                self.session = create_session()
+            self.auth_mgr = SimpleAuthManager(self.session, config.YOLINK_UAID, config.YOLINK_SECRET_KEY)
+            self.client = YoLinkClient(self.auth_mgr)
+
+            cached_token = warm_cache.get_token()
+            if cached_token:
+                self.auth_mgr.use_cached_token(*cached_token)
+                logger.info("✓ Using cached YoLink token")
+            else:
+                # Authenticate
+                await yolink_policy.call_async(self.auth_mgr.check_and_refresh_token)
+                logger.info("✓ Successfully authenticated with YoLink API")
+
+            device_data = warm_cache.get_device()
+            if device_data:
+                self._device_from_cache = True
+                logger.info("✓ Using cached YoLink device metadata")
+            else:
+                device_data = await yolink_policy.call_async(
+                    self._discover_device, on_error=self._on_request_error
                 )
 
-            # Use the first temperature sensor found
-            device_data = temp_devices[0]
-            device_mode = YoLinkDeviceMode(**device_data)
-            self.temperature_device = YoLinkDevice(device_mode, self.client)
-
-            self.latest_data["device_name"] = self.temperature_device.device_name
-            self.latest_data["device_id"] = self.temperature_device.device_id
-            self.latest_data["status"] = "connected"
+            self._set_device(device_data)
 
-            print(f"✓ Found temperature sensor: {self.temperature_device.device_name}")
-            print(f"  Type: {self.temperature_device.device_type}")
-            print(f"  Model: {self.temperature_device.device_model_name}")
+            logger.info("✓ Found temperature sensor: %s", self.temperature_device.device_name)
+            logger.info("  Type: %s", self.temperature_device.device_type)
+            logger.info("  Model: %s", self.temperature_device.device_model_name)
 
         except Exception as e:
-            self.latest_data["status"] = "error"
-            self.latest_data["error"] = str(e)
-            print(f"Error during initialization: {e}")
+            self.publish(status="error", error=str(e))
+            logger.error("Error during initialization: %s", e)
             raise
 
-    async def update_temperature(self):
-        """Fetch latest temperature reading from the sensor."""
+    async def _discover_device(self) -> dict:
+        """Fetch the device list and return the first temperature sensor record."""
+        with endpoint("Home.getDeviceList"):
+            response = await self.client.execute(
+                url=Endpoints.US.value.url, bsdp={"method": "Home.getDeviceList"}
+            )
+        devices = response.data.get("devices", [])
+
+        if not devices:
+            raise Exception("No devices found in your YoLink account")
+
+        # Find temperature sensor (look for THSensor or similar)
+        temp_devices = [
+            d
+            for d in devices
+            if "temperature" in d.get("type", "").lower()
+            or "thsensor" in d.get("type", "").lower()
+        ]
+
+        if not temp_devices:
+            # If no specific temperature device, list all devices
+            logger.info("Available devices:")
+            for dev in devices:
+                logger.info("  - %s (%s)", dev.get("name"), dev.get("type"))
+            raise Exception(
+                "No temperature sensor found. Please check device list above."
+            )
+
+        # Use the first temperature sensor found
+        device_data = temp_devices[0]
+        warm_cache.set_device(device_data)
+        return device_data
+
+    def _on_request_error(self, error: BaseException):
+        """Force a token refresh before the next attempt if the API rejected ours."""
+        if isinstance(error, YoLinkAuthFailError) and self.auth_mgr:
+            logger.warning("YoLink rejected the access token, refreshing...")
+            self.auth_mgr.invalidate_token()
+
+    def _set_device(self, device_data: dict):
+        """Build the YoLink device from its raw record."""
+        device_mode = YoLinkDeviceMode(**device_data)
+        self.temperature_device = YoLinkDevice(device_mode, self.client)
+
+        changes = {
+            "device_name": self.temperature_device.device_name,
+            "device_id": self.temperature_device.device_id,
+        }
+        if self.latest_data["status"] != "stale":
+            changes["status"] = "connected"
+        self.publish(**changes)
+
+    async def _get_state(self):
+        """One getState round trip (timed for /metrics)."""
+        with yolink_latency.time():
+            return await self.temperature_device.get_state()
+
+    @timed("monitor.update_temperature")
+    async def update_temperature(self) -> Optional[dict]:
+        """Fetch latest temperature reading from the sensor.
+
+        Returns {"temperature": ..., "humidity": ...} on success, None
+        otherwise. Recording and notifications are handled by whoever
+        consumes the reading (see sensor_drivers.DriverSupervisor).
+        """
         if not self.temperature_device:
-            return
+            return None
 
         try:
             # Get device state
-            state_response = await self.temperature_device.get_state()
+            with endpoint(f"{self.temperature_device.device_type}.getState"):
+                state_response = await yolink_policy.call_async(
+                    self._get_state, on_error=self._on_request_error
+                )
             state_data = state_response.data
 
             # Extract temperature and humidity
@@ -162,68 +251,77 @@ class TemperatureMonitor:
             temperature = state_obj.get("temperature") or state_data.get("temperature")
             humidity = state_obj.get("humidity") or state_data.get("humidity")
 
-            self.latest_data["temperature"] = temperature
-            self.latest_data["humidity"] = humidity
-            self.latest_data["last_update"] = datetime.now(timezone.utc).isoformat()
-            self.latest_data["status"] = "ok"
-            self.latest_data["error"] = None
-
-            # Log temperature reading (1-minute granularity handled by logger)
-            if temperature is not None:
-                temp_logger.add_reading(temperature, humidity)
-
-                # Check if sauna reached ready temperature (only if heater is ON)
-                if TELEGRAM_IMPORTED and notifier and hasattr(config, 'TELEGRAM_READY_TEMP'):
-                    # Only notify if heater is ON (we're actively heating)
-                    if breaker_tracker.current_state and temperature >= config.TELEGRAM_READY_TEMP:
-                        notifier.notify_sauna_ready(temperature)
-
-            temp_unit = "°F" if config.DISPLAY_FAHRENHEIT else "°C"
-            print(
-                f"[{datetime.now().strftime('%H:%M:%S')}] Temperature: {temperature}{temp_unit}"
-                + (f", Humidity: {humidity}%" if humidity else "")
-            )
+            self._device_from_cache = False
+            self.apply_reading(temperature, humidity)
+            return {"temperature": temperature, "humidity": humidity}
+
+        except YoLinkClientError as e:
+            if self._device_from_cache and not isinstance(e, YoLinkAuthFailError):
+                # Cached device record may be outdated - rediscover it once
+                self._device_from_cache = False
+                warm_cache.clear_device()  # Don't reuse it on the next start if rediscovery fails
+                logger.warning("Cached YoLink device rejected (%s), rediscovering...", e.message)
+                try:
+                    self._set_device(await yolink_policy.call_async(
+                        self._discover_device, on_error=self._on_request_error
+                    ))
+                except Exception as discover_error:
+                    logger.warning("Device rediscovery failed: %s", discover_error)
+            self.publish(status="error", error=e.message)
+            logger.error("Error fetching temperature: %s", e.message)
 
         except Exception as e:
-            self.latest_data["status"] = "error"
-            self.latest_data["error"] = str(e)
-            print(f"Error fetching temperature: {e}")
-
-    async def run_monitor_loop(self):
-        """Continuously monitor temperature at specified interval."""
-        await self.initialize()
-
-        # Initial reading
-        await self.update_temperature()
-
-        # Continuous monitoring loop
-        while True:
-            await asyncio.sleep(config.REFRESH_INTERVAL)
-            await self.update_temperature()
+            self.publish(status="error", error=str(e))
+            logger.error("Error fetching temperature: %s", e)
+
+        return None
+
+    @timed("monitor.apply_reading")
+    def apply_reading(self, temperature: Optional[float], humidity: Optional[float]):
+        """Publish a fresh reading to latest_data and the warm-start cache."""
+        data = self.publish(
+            temperature=temperature,
+            humidity=humidity,
+            last_update=clock.now().isoformat(),
+            status="ok",
+            error=None,
+            stale=False,
+        )
+
+        warm_cache.set_reading("temperature", {
+            "temperature": temperature,
+            "humidity": humidity,
+            "device_name": data["device_name"],
+            "device_id": data["device_id"],
+            "last_update": data["last_update"],
+        })
 
     async def cleanup(self):
         """Close connections and cleanup resources."""
         if self.session:
             await self.session.close()
 
-    def get_latest_data(self) -> dict:
-        """Return the latest temperature data."""
-        return self.latest_data.copy()
-
 
 # Global monitor instance
 monitor = TemperatureMonitor()
 
 
 async def start_monitoring():
-    """Start the temperature monitoring service."""
+    """Start the temperature monitoring service (YoLink sensor only)."""
+    from sensor_drivers import DriverSupervisor, YoLinkDriver
+
+    supervisor = DriverSupervisor()
+    supervisor.add_driver(YoLinkDriver(monitor))
     try:
-        await monitor.run_monitor_loop()
+        await supervisor.run()
     except KeyboardInterrupt:
-        print("\nShutting down...")
+        logger.info("Shutting down...")
     finally:
-        await monitor.cleanup()
+        await supervisor.close()
 
 
 if __name__ == "__main__":
+    from logging_setup import setup_logging
+
+    setup_logging()
     asyncio.run(start_monitoring())
@@ -0,0 +1,77 @@
+"""
+Timeline: temperature series annotated with heater ON intervals
+
+Backs /api/timeline. Both stores are time-ordered, so the range is located
+in each by binary search and the two are merge-joined in a single linear
+pass: every temperature point gets a heater_on flag and the ON intervals
+overlapping the range are returned (clipped to it) alongside.
+"""
+
+import bisect
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import clock
+from data_logger import temp_logger, breaker_tracker
+
+
+def on_intervals(start: datetime, end: datetime) -> list:
+    """Heater ON intervals overlapping [start, end], as (start, end) datetimes."""
+    with breaker_tracker.lock:
+        history = breaker_tracker.history
+        # Last entry starting at/before `start` may still overlap it
+        i = max(0, bisect.bisect_right(history, start.isoformat(),
+                                       key=lambda h: h.get("timestamp", "")) - 1)
+        entries = history[i:]
+        current_state, state_since = breaker_tracker.current_state, breaker_tracker.state_since
+
+    intervals = []
+    for entry in entries:
+        entry_start = datetime.fromisoformat(entry["timestamp"])
+        if entry_start > end:
+            break
+        if entry.get("state") is not True:
+            continue
+        entry_end = entry_start + timedelta(seconds=entry.get("duration_seconds", 0))
+        if entry_end >= start:
+            intervals.append((max(entry_start, start), min(entry_end, end)))
+
+    # The session in progress isn't in the history yet
+    if current_state and state_since:
+        since = datetime.fromisoformat(state_since)
+        if since <= end:
+            intervals.append((max(since, start), end))
+    return intervals
+
+
+def build_timeline(start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    """Temperature points flagged with heater_on, plus the ON intervals, for [start, end]."""
+    end = (end or clock.now()).astimezone(timezone.utc)
+    start = (start or datetime.fromtimestamp(0, timezone.utc)).astimezone(timezone.utc)
+    records = temp_logger.get_range(start, end)
+    intervals = on_intervals(start, end)
+
+    # Merge-join: advance through intervals as the points move forward in time
+    points = []
+    j = 0
+    for record in records:
+        ts = datetime.fromisoformat(record["timestamp"])
+        while j < len(intervals) and intervals[j][1] < ts:
+            j += 1
+        point = dict(record)
+        point["heater_on"] = j < len(intervals) and intervals[j][0] <= ts
+        points.append(point)
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "temperature": points,
+        "heater_on": [
+            {
+                "start": s.isoformat(),
+                "end": e.isoformat(),
+                "duration_seconds": int((e - s).total_seconds()),
+            }
+            for s, e in intervals
+        ],
+    }
@@ -4,7 +4,7 @@ Tuya WiFi Breaker Monitoring Service
 Monitors the status of a Tuya smart switch/breaker (e.g., sauna circuit).
 """
 
-import threading
+import logging
 import time
 from typing import Optional
 
@@ -14,46 +14,72 @@ try:
 except ImportError:
     TUYA_AVAILABLE = False
 
+import clock
 import config
 from data_logger import breaker_tracker
+from device_io import tuya_policy
+from metrics import tuya_latency
+from profiling import timed
+from snapshot import SnapshotPublisher
+from warm_cache import warm_cache
 
+logger = logging.getLogger(__name__)
 
-class TuyaBreakerMonitor:
+
+class TuyaBreakerMonitor(SnapshotPublisher):
     """Monitors Tuya WiFi breaker status."""
 
     def __init__(self):
-        self.latest_data = {
+        self._init_snapshot({
             "breaker_on": None,
             "breaker_name": config.TUYA_DEVICE_NAME,
             "last_update": None,
             "status": "disabled",
             "error": None,
-        }
+            "stale": False,
+        })
         self.device: Optional[tinytuya.Device] = None
-        self._running = False
-        self._thread: Optional[threading.Thread] = None
+        if config.TUYA_ENABLED:
+            self._load_cached_reading()
+
+    def _load_cached_reading(self):
+        """Seed latest_data with the last known breaker state from the warm-start cache."""
+        cached = warm_cache.get_reading("breaker")
+        if not cached or cached.get("breaker_on") is None:
+            return
+        self.publish(
+            breaker_on=cached.get("breaker_on"),
+            last_update=cached.get("last_update"),
+            status="stale",
+            stale=True,
+        )
+        duration = breaker_tracker.get_current_duration()
+        if duration:
+            self.publish(duration=duration)
 
     def initialize(self):
-        """Initialize connection to Tuya device."""
+        """Initialize connection to Tuya device.
+
+        No blocking status probe here: the first poll of the monitoring loop
+        verifies the connection, so startup never waits on the LAN socket.
+        """
         if not config.TUYA_ENABLED:
-            self.latest_data["status"] = "disabled"
-            print("Tuya integration disabled in config")
+            self.publish(status="disabled")
+            logger.info("Tuya integration disabled in config")
             return False
 
         if not TUYA_AVAILABLE:
-            self.latest_data["status"] = "error"
-            self.latest_data["error"] = "tinytuya not installed"
-            print("Error: tinytuya library not installed")
+            self.publish(status="error", error="tinytuya not installed")
+            logger.error("Error: tinytuya library not installed")
             return False
 
         if not config.TUYA_DEVICE_ID or not config.TUYA_LOCAL_KEY:
-            self.latest_data["status"] = "error"
-            self.latest_data["error"] = "Missing device credentials"
-            print("Error: Tuya device credentials not configured")
+            self.publish(status="error", error="Missing device credentials")
+            logger.error("Error: Tuya device credentials not configured")
             return False
 
         try:
-            print("Initializing Tuya Breaker Monitor...")
+            logger.info("Initializing Tuya Breaker Monitor...")
             self.device = tinytuya.Device(
                 dev_id=config.TUYA_DEVICE_ID,
                 address=config.TUYA_IP_ADDRESS,
@@ -61,87 +87,67 @@ class TuyaBreakerMonitor:
                 version=config.TUYA_VERSION,
             )
 
-            # Set connection timeout
-            self.device.set_socketTimeout(5)
+            # Set connection timeout (enforces the I/O policy's per-call timeout)
+            self.device.set_socketTimeout(tuya_policy.timeout)
 
-            # Test connection
-            status = self.device.status()
-            if status and 'dps' in status:
-                self.latest_data["status"] = "ok"
-                print(f"✓ Connected to {config.TUYA_DEVICE_NAME}")
-                return True
-            else:
-                raise Exception("Unable to get device status")
+            if self.latest_data["status"] != "stale":
+                self.publish(status="initializing")
+            logger.info("✓ Tuya device configured: %s", config.TUYA_DEVICE_NAME)
+            return True
 
         except Exception as e:
-            self.latest_data["status"] = "error"
-            self.latest_data["error"] = str(e)
-            print(f"Error connecting to Tuya device: {e}")
+            self.publish(status="error", error=str(e))
+            logger.error("Error connecting to Tuya device: %s", e)
             return False
 
-    def update_status(self):
-        """Fetch latest breaker status."""
+    def _read_status(self) -> dict:
+        """Single status() round trip; raises if the device reports an error."""
+        with tuya_latency.time():
+            status = self.device.status()
+        if not status or 'dps' not in status:
+            # tinytuya returns {"Error": ..., "Err": ...} instead of raising
+            raise Exception((status or {}).get("Error") or "Invalid device response")
+        return status
+
+    @timed("breaker_monitor.update_status")
+    def update_status(self) -> Optional[dict]:
+        """Fetch latest breaker status.
+
+        Returns {"breaker_on": ...} on success, None otherwise. Tracking
+        transitions is up to whoever consumes the reading (see
+        sensor_drivers.DriverSupervisor).
+        """
         if not self.device or self.latest_data["status"] == "disabled":
-            return
+            return None
 
         try:
-            status = self.device.status()
+            status = tuya_policy.call_sync(self._read_status)
 
-            if status and 'dps' in status:
-                # DPS 1 is typically the main switch
-                breaker_on = status['dps'].get('1', None)
-                self.latest_data["breaker_on"] = breaker_on
-                self.latest_data["last_update"] = time.time()
-                self.latest_data["status"] = "ok"
-                self.latest_data["error"] = None
-
-                # Track state changes and duration
-                if breaker_on is not None:
-                    breaker_tracker.update_state(breaker_on)
-                    duration = breaker_tracker.get_current_duration()
-                    self.latest_data["duration"] = duration
-
-                state_str = "ON" if self.latest_data["breaker_on"] else "OFF"
-                duration_str = f" for {self.latest_data.get('duration', '?')}" if self.latest_data.get('duration') else ""
-                print(f"[Tuya] {config.TUYA_DEVICE_NAME}: {state_str}{duration_str}")
-            else:
-                raise Exception("Invalid device response")
+            # DPS 1 is typically the main switch
+            breaker_on = status['dps'].get('1', None)
+            self.apply_status(breaker_on)
+            return {"breaker_on": breaker_on}
 
         except Exception as e:
-            self.latest_data["status"] = "error"
-            self.latest_data["error"] = str(e)
-            print(f"Error fetching Tuya status: {e}")
-
-    def _monitor_loop(self):
-        """Background monitoring loop."""
-        # Initial update
-        self.update_status()
-
-        # Continuous monitoring
-        while self._running:
-            time.sleep(config.REFRESH_INTERVAL)  # Use same interval as temperature
-            self.update_status()
-
-    def start_monitoring(self):
-        """Start background monitoring thread."""
-        if not self.initialize():
-            return False
-
-        self._running = True
-        self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._thread.start()
-        print(f"✓ Tuya monitoring started (polling every {config.REFRESH_INTERVAL}s)")
-        return True
-
-    def stop_monitoring(self):
-        """Stop background monitoring."""
-        self._running = False
-        if self._thread:
-            self._thread.join(timeout=5)
-
-    def get_latest_data(self) -> dict:
-        """Return the latest breaker data."""
-        return self.latest_data.copy()
+            self.publish(status="error", error=str(e))
+            logger.error("Error fetching Tuya status: %s", e)
+            return None
+
+    @timed("breaker_monitor.apply_status")
+    def apply_status(self, breaker_on: Optional[bool]):
+        """Publish a fresh breaker state to latest_data and the warm-start cache."""
+        data = self.publish(
+            breaker_on=breaker_on,
+            last_update=clock.time(),
+            status="ok",
+            error=None,
+            stale=False,
+        )
+
+        warm_cache.set_reading("breaker", {
+            "breaker_on": breaker_on,
+            "last_update": data["last_update"],
+        })
 
     def turn_on(self) -> bool:
         """Turn the breaker ON."""
@@ -149,12 +155,12 @@ class TuyaBreakerMonitor:
             return False
 
         try:
-            self.device.set_status(True, 1)  # DPS 1 controls the switch
+            tuya_policy.call_sync(self.device.set_status, True, 1)  # DPS 1 controls the switch
             time.sleep(0.5)  # Brief delay for device to respond
             self.update_status()  # Update status immediately
             return True
         except Exception as e:
-            print(f"Error turning breaker on: {e}")
+            logger.error("Error turning breaker on: %s", e)
             return False
 
     def turn_off(self) -> bool:
@@ -163,12 +169,12 @@ class TuyaBreakerMonitor:
             return False
 
         try:
-            self.device.set_status(False, 1)  # DPS 1 controls the switch
+            tuya_policy.call_sync(self.device.set_status, False, 1)  # DPS 1 controls the switch
             time.sleep(0.5)  # Brief delay for device to respond
             self.update_status()  # Update status immediately
             return True
         except Exception as e:
-            print(f"Error turning breaker off: {e}")
+            logger.error("Error turning breaker off: %s", e)
             return False
 
 
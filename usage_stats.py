@@ -0,0 +1,233 @@
+"""
+Usage Statistics (pre-aggregated daily / weekly counters)
+
+Keeps one compact row per local day and per ISO week, updated as readings
+and breaker transitions arrive, so reports never scan the history files:
+
+    [on_seconds, sessions, temp_min, temp_max, temp_sum, temp_count, peak_sum, peak_count]
+
+Heater ON time is accounted up to the latest reading (split exactly across
+day boundaries), sessions are counted when they end, and the session peak
+feeds "average peak temperature". Energy is derived from on_seconds and
+HEATER_WATTS at query time. A year of data is 365 + 52 small rows.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import clock
+import config
+from data_logger import temp_logger, breaker_tracker, MIN_SESSION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ON_SECONDS, SESSIONS, TEMP_MIN, TEMP_MAX, TEMP_SUM, TEMP_COUNT, PEAK_SUM, PEAK_COUNT = range(8)
+
+# Save at most this often from readings (transitions always save)
+SAVE_INTERVAL = 300
+
+
+def day_key(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d")
+
+
+def week_key(dt: datetime) -> str:
+    year, week, _ = dt.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def empty_row() -> list:
+    return [0.0, 0, None, None, 0.0, 0, 0.0, 0]
+
+
+class UsageStats:
+    """Incrementally maintained daily and weekly usage counters."""
+
+    def __init__(self, filename="usage_stats.json"):
+        self.filename = filename
+        self.daily = {}
+        self.weekly = {}
+        self.accounted_until: Optional[float] = None  # ON time counted up to here (epoch)
+        self.session_peak: Optional[float] = None
+        self.last_save = 0.0
+        self.lock = threading.Lock()
+        self.load_from_disk()
+
+    def load_from_disk(self):
+        """Load counters, or build them once from the existing history."""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    self.apply_state(json.load(f))
+                logger.info("Loaded usage stats: %s days", len(self.daily))
+                return
+            except Exception as e:
+                logger.error("Error loading usage stats: %s", e)
+                self.daily, self.weekly = {}, {}
+        self.rebuild()
+
+    def save_to_disk(self):
+        """Persist counters (compact, atomic replace)."""
+        try:
+            data = self.state()
+            tmp = self.filename + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.filename)
+            self.last_save = clock.monotonic()
+        except Exception as e:
+            logger.error("Error saving usage stats: %s", e)
+
+    def state(self) -> dict:
+        """Counters as saved to disk (and published to web workers)."""
+        with self.lock:
+            return {
+                "accounted_until": self.accounted_until,
+                "session_peak": self.session_peak,
+                "daily": dict(self.daily),
+                "weekly": dict(self.weekly),
+            }
+
+    def apply_state(self, data: dict):
+        """Replace the counters with a saved state."""
+        with self.lock:
+            self.daily = data.get("daily", {})
+            self.weekly = data.get("weekly", {})
+            self.accounted_until = data.get("accounted_until")
+            self.session_peak = data.get("session_peak")
+
+    def rebuild(self):
+        """One-off backfill from breaker_history.json and temperature_history.json."""
+        with self.lock:
+            self.daily, self.weekly = {}, {}
+            for entry in breaker_tracker.history:
+                if entry.get("state") is not True:
+                    continue
+                start = datetime.fromisoformat(entry["timestamp"]).timestamp()
+                end = start + entry.get("duration_seconds", 0)
+                self._add_on_time(start, end)
+                if end - start >= MIN_SESSION_SECONDS:
+                    temps = [r["temperature"] for r in temp_logger.get_range(
+                        datetime.fromtimestamp(start, timezone.utc), datetime.fromtimestamp(end, timezone.utc))
+                        if r.get("temperature") is not None]
+                    self._add_session(start, max(temps) if temps else None)
+            for record in temp_logger.get_all_data():
+                if record.get("temperature") is not None:
+                    ts = datetime.fromisoformat(record["timestamp"]).timestamp()
+                    self._add_temperature(ts, record["temperature"])
+            if breaker_tracker.current_state and breaker_tracker.state_since:
+                self.accounted_until = datetime.fromisoformat(breaker_tracker.state_since).timestamp()
+        logger.info("Built usage stats from history: %s days", len(self.daily))
+        self.save_to_disk()
+
+    def _rows(self, epoch: float):
+        """Daily and weekly rows for a moment in local time (created on demand)."""
+        dt = datetime.fromtimestamp(epoch)
+        return (self.daily.setdefault(day_key(dt), empty_row()),
+                self.weekly.setdefault(week_key(dt), empty_row()))
+
+    def _add_on_time(self, start: float, end: float):
+        """Add heater ON time, split at local midnights."""
+        while start < end:
+            day_start = datetime.fromtimestamp(start).replace(hour=0, minute=0, second=0, microsecond=0)
+            next_midnight = (day_start + timedelta(days=1)).timestamp()
+            chunk_end = min(end, next_midnight)
+            for row in self._rows(start):
+                row[ON_SECONDS] += chunk_end - start
+            start = chunk_end
+
+    def _add_session(self, start: float, peak: Optional[float]):
+        for row in self._rows(start):
+            row[SESSIONS] += 1
+            if peak is not None:
+                row[PEAK_SUM] += peak
+                row[PEAK_COUNT] += 1
+
+    def _add_temperature(self, epoch: float, temperature: float):
+        for row in self._rows(epoch):
+            row[TEMP_MIN] = temperature if row[TEMP_MIN] is None else min(row[TEMP_MIN], temperature)
+            row[TEMP_MAX] = temperature if row[TEMP_MAX] is None else max(row[TEMP_MAX], temperature)
+            row[TEMP_SUM] += temperature
+            row[TEMP_COUNT] += 1
+
+    def on_reading(self, reading):
+        """Supervisor sink: temperature counters and ON time so far."""
+        temperature = reading.values.get("temperature")
+        if temperature is None:
+            return
+        now = reading.timestamp.timestamp()
+        with self.lock:
+            self._add_temperature(now, temperature)
+            if breaker_tracker.current_state:
+                if self.accounted_until is not None and now > self.accounted_until:
+                    self._add_on_time(self.accounted_until, now)
+                self.accounted_until = now
+                self.session_peak = temperature if self.session_peak is None \
+                    else max(self.session_peak, temperature)
+        if clock.monotonic() - self.last_save >= SAVE_INTERVAL:
+            self.save_to_disk()
+
+    def on_transition(self, transition: dict):
+        """BreakerStateTracker listener: close out ON time and count the session."""
+        now = transition["time"].timestamp()
+        with self.lock:
+            if transition.get("previous_state") is True:
+                start = datetime.fromisoformat(transition["previous_since"]).timestamp()
+                accounted = max(self.accounted_until or start, start)
+                if now > accounted:
+                    self._add_on_time(accounted, now)
+                if transition["previous_duration"] >= MIN_SESSION_SECONDS:
+                    self._add_session(start, self.session_peak)
+            self.accounted_until = now if transition["state"] else None
+            self.session_peak = None
+        self.save_to_disk()
+
+    def report(self, days: Optional[int] = None, group: str = "day") -> dict:
+        """Totals and per-day/week buckets over the last `days` days (all if None)."""
+        table = self.weekly if group == "week" else self.daily
+        if days is None:
+            first = None
+        else:
+            since = clock.local_now() - timedelta(days=days - 1)
+            first = day_key(since) if group == "day" else week_key(since)
+        watts = getattr(config, "HEATER_WATTS", None)
+
+        with self.lock:
+            keys = sorted(k for k in table if first is None or k >= first)
+            rows = [(k, list(table[k])) for k in keys]
+
+        total = empty_row()
+        buckets = []
+        for key, row in rows:
+            total[ON_SECONDS] += row[ON_SECONDS]
+            total[SESSIONS] += row[SESSIONS]
+            total[PEAK_SUM] += row[PEAK_SUM]
+            total[PEAK_COUNT] += row[PEAK_COUNT]
+            total[TEMP_SUM] += row[TEMP_SUM]
+            total[TEMP_COUNT] += row[TEMP_COUNT]
+            if row[TEMP_MIN] is not None:
+                total[TEMP_MIN] = row[TEMP_MIN] if total[TEMP_MIN] is None else min(total[TEMP_MIN], row[TEMP_MIN])
+                total[TEMP_MAX] = row[TEMP_MAX] if total[TEMP_MAX] is None else max(total[TEMP_MAX], row[TEMP_MAX])
+            buckets.append(dict(self._describe(row, watts), period=key))
+
+        return dict(self._describe(total, watts), group=group, buckets=buckets)
+
+    @staticmethod
+    def _describe(row: list, watts: Optional[float]) -> dict:
+        return {
+            "on_hours": round(row[ON_SECONDS] / 3600, 2),
+            "sessions": row[SESSIONS],
+            "temp_min": row[TEMP_MIN],
+            "temp_max": row[TEMP_MAX],
+            "temp_avg": round(row[TEMP_SUM] / row[TEMP_COUNT], 1) if row[TEMP_COUNT] else None,
+            "avg_peak_temp": round(row[PEAK_SUM] / row[PEAK_COUNT], 1) if row[PEAK_COUNT] else None,
+            "energy_kwh": round(row[ON_SECONDS] * watts / 3.6e6, 2) if watts else None,
+        }
+
+
+# Global stats instance
+usage_stats = UsageStats()
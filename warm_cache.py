@@ -0,0 +1,127 @@
+"""
+Warm-Start Cache for Sauna Monitor
+
+Persists the YoLink OAuth token, the resolved sensor metadata and the
+last known readings, so a restart can serve the dashboard immediately
+while cloud and LAN calls happen in the background.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Don't rewrite the cache file more often than this for reading updates
+# (token and device changes are always written immediately).
+MIN_SAVE_INTERVAL = 60
+
+
+class WarmStartCache:
+    """Small on-disk cache of token, device metadata and last readings."""
+
+    def __init__(self, filename="warm_cache.json"):
+        self.filename = filename
+        self.data = {}  # {"yolink_token": {...}, "yolink_device": {...}, "readings": {...}}
+        self.lock = threading.RLock()
+        self._save_lock = threading.Lock()  # One writer of the file at a time, newest snapshot last
+        self._last_save = 0.0
+        self.load_from_disk()
+
+    def load_from_disk(self):
+        """Load cached state from disk."""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    self.data = json.load(f)
+                logger.info("Loaded warm-start cache from %s", self.filename)
+            except Exception as e:
+                logger.error("Error loading warm-start cache: %s", e)
+                self.data = {}
+
+    def save_to_disk(self):
+        """Persist cache atomically (write temp file, then rename)."""
+        try:
+            with self._save_lock:
+                with self.lock:
+                    payload = json.dumps(self.data)
+                tmp_name = f"{self.filename}.tmp"
+                # Owner-only: the file holds the YoLink access token
+                fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(payload)
+                os.replace(tmp_name, self.filename)
+                self._last_save = time.monotonic()
+        except Exception as e:
+            logger.error("Error saving warm-start cache: %s", e)
+
+    def get_token(self) -> Optional[tuple]:
+        """Return (access_token, expires_at) if a cached token is still valid."""
+        with self.lock:
+            entry = self.data.get("yolink_token")
+        if not entry:
+            return None
+        try:
+            expires_at = datetime.fromisoformat(entry["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if datetime.now(timezone.utc) >= expires_at:
+            return None
+        return entry.get("access_token"), expires_at
+
+    def set_token(self, access_token: str, expires_at: datetime):
+        """Remember a freshly issued OAuth token."""
+        with self.lock:
+            self.data["yolink_token"] = {
+                "access_token": access_token,
+                "expires_at": expires_at.isoformat(),
+            }
+        self.save_to_disk()
+
+    def clear_token(self):
+        """Forget the cached token (e.g. after the API rejected it)."""
+        with self.lock:
+            self.data.pop("yolink_token", None)
+        self.save_to_disk()
+
+    def get_device(self) -> Optional[dict]:
+        """Return the raw YoLink device record resolved on a previous run."""
+        with self.lock:
+            return self.data.get("yolink_device")
+
+    def set_device(self, device_data: dict):
+        """Remember the raw YoLink device record (as returned by getDeviceList)."""
+        with self.lock:
+            self.data["yolink_device"] = device_data
+        self.save_to_disk()
+
+    def clear_device(self):
+        """Forget cached device metadata so the next start rediscovers it."""
+        with self.lock:
+            self.data.pop("yolink_device", None)
+        self.save_to_disk()
+
+    def get_reading(self, kind: str) -> Optional[dict]:
+        """Return the last known reading of a kind ("temperature" or "breaker")."""
+        with self.lock:
+            reading = self.data.get("readings", {}).get(kind)
+            return dict(reading) if reading else None
+
+    def set_reading(self, kind: str, values: dict):
+        """Remember the latest reading; writes are throttled to MIN_SAVE_INTERVAL."""
+        with self.lock:
+            previous = self.data.setdefault("readings", {}).get(kind)
+            self.data["readings"][kind] = dict(values)
+            changed = previous is None or any(
+                previous.get(k) != v for k, v in values.items() if k != "last_update"
+            )
+        if changed or time.monotonic() - self._last_save >= MIN_SAVE_INTERVAL:
+            self.save_to_disk()
+
+
+# Global cache instance
+warm_cache = WarmStartCache()
@@ -5,24 +5,209 @@ Provides shareable endpoints for viewing live temperature readings.
 """
 
 import asyncio
+import functools
+import logging
+import math
 import signal
 import sys
 import threading
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 
-from flask import Flask, jsonify, render_template_string
+from flask import Flask, Response, abort, g, jsonify, make_response, request
 import os
+import time
 
 import config
-from temperature_service import monitor, start_monitoring
-from tuya_service import breaker_monitor
-from data_logger import temp_logger, breaker_tracker
-from notification_scheduler import scheduler
-from telegram_bot import start_command_polling
+from logging_setup import setup_logging, shutdown_logging
+
+# Before load_services(), whose imports log while loading their state
+setup_logging()
+
+import metrics
+import profiling
+from snapshot import etag
+
+logger = logging.getLogger(__name__)
+
+# How long a request waits for load_services() before answering 503
+STARTUP_WAIT_SECONDS = getattr(config, "STARTUP_WAIT_SECONDS", 10)
+
+_services_ready = threading.Event()
+_startup_finished = threading.Event()  # Loaded or failed: nothing left to wait for
+_services_lock = threading.Lock()
+_loader_started = False
+_supervisor = None
+_replica = None  # StoreReplica in web worker mode (wsgi.py)
+startup = {"phase": "starting", "started": time.monotonic()}
 
 # Set up Flask with static folder
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 300  # Cache images for 5 minutes
+app.wsgi_app = profiling.profile_wsgi(app.wsgi_app)
+
+
+def load_services():
+    """Import the monitors, history and integrations (once).
+
+    These imports pull in yolink/aiohttp, tinytuya and python-telegram-bot
+    and load the stored history, so main() runs this in the background
+    after the port is bound. Without main() (test client, other WSGI
+    servers) the first request loads them.
+    """
+    global monitor, breaker_monitor, temp_logger, breaker_tracker, scheduler
+    global notifier, start_command_polling, yolink_policy, tuya_policy, http_stats
+    global build_supervisor, session_table, heat_model, format_eta, detector, usage_stats
+    global history_cache, parse_aggs, parse_bucket, parse_time, QueryError, build_timeline
+    global static_site
+
+    with _services_lock:
+        if _services_ready.is_set():
+            return
+        startup["phase"] = "loading"
+        started = time.perf_counter()
+        from data_logger import temp_logger, breaker_tracker
+        from temperature_service import monitor
+        from tuya_service import breaker_monitor
+        from sensor_drivers import build_supervisor
+        from device_io import yolink_policy, tuya_policy
+        from http_client import http_stats
+        from telegram_bot import notifier, start_command_polling
+        from notification_scheduler import scheduler
+        from session_stats import session_table
+        from heat_model import heat_model, format_eta
+        from anomaly import detector
+        from usage_stats import usage_stats
+        from history_query import history_cache, parse_aggs, parse_bucket, parse_time, QueryError
+        from timeline import build_timeline
+        from static_site import static_site
+
+        metrics.register_staleness("yolink", _last_temperature_epoch)
+        metrics.register_staleness("tuya", lambda: breaker_monitor.latest_data.get("last_update"))
+
+        startup["load_seconds"] = round(time.perf_counter() - started, 3)
+        startup["phase"] = "ready"
+        _services_ready.set()
+        _startup_finished.set()
+    logger.info("Services loaded in %.2fs", startup["load_seconds"])
+
+
+def load_replica():
+    """Web worker mode (wsgi.py): serve the collector's shared store, start nothing.
+
+    Monitors are read-only views of the collector's snapshots; history and
+    derived state are the usual singletons, refreshed before each request.
+    """
+    global _replica, _loader_started, monitor, breaker_monitor, temp_logger, breaker_tracker
+    global session_table, heat_model, format_eta, usage_stats
+    global history_cache, parse_aggs, parse_bucket, parse_time, QueryError, build_timeline
+
+    from shared_store import StoreReplica
+    from data_logger import temp_logger, breaker_tracker
+    from session_stats import session_table
+    from heat_model import heat_model, format_eta
+    from usage_stats import usage_stats
+    from history_query import history_cache, parse_aggs, parse_bucket, parse_time, QueryError
+    from timeline import build_timeline
+
+    _replica = StoreReplica()
+    monitor, breaker_monitor = _replica.temperature, _replica.breaker
+    metrics.register_staleness("yolink", _last_temperature_epoch)
+    metrics.register_staleness("tuya", lambda: breaker_monitor.latest_data.get("last_update"))
+    _loader_started = True
+    startup["role"] = "web"
+    startup["phase"] = "waiting_for_collector"
+    _services_ready.set()
+    _startup_finished.set()
+
+
+def _refresh_replica():
+    """Pull the collector's latest state; a 503 response if it isn't available."""
+    from shared_store import COLLECTOR_STALE_SECONDS, StoreUnavailable
+
+    try:
+        _replica.refresh()
+    except StoreUnavailable as e:
+        startup["phase"] = "waiting_for_collector"
+        startup["error"] = str(e)
+        return _starting_response()
+    startup.pop("error", None)
+    age = _replica.collector_age()
+    startup["phase"] = "ready" if age is not None and age < COLLECTOR_STALE_SECONDS else "collector_stale"
+    return None
+
+
+def startup_status() -> dict:
+    """Startup phase, load time and per-integration state for /health."""
+    status = {
+        "phase": startup["phase"],
+        "uptime_seconds": round(time.monotonic() - startup["started"], 1),
+    }
+    for key in ("load_seconds", "error"):
+        if key in startup:
+            status[key] = startup[key]
+    if _supervisor is not None:
+        status["drivers"] = dict(_supervisor.states)
+    if "telegram" in startup:
+        status["telegram"] = startup["telegram"]
+    if _replica is not None:
+        age = _replica.collector_age()
+        status["role"] = "web"
+        status["collector"] = {
+            "pid": _replica.health.get("pid"),
+            "last_publish_seconds_ago": round(age, 1) if age is not None else None,
+        }
+        status["drivers"] = _replica.health.get("drivers", {})
+        status["telegram"] = _replica.health.get("telegram")
+    return status
+
+
+def _starting_response():
+    """503 while starting up, or for good if startup failed."""
+    failed = startup["phase"] == "failed"
+    response = jsonify({"status": "failed" if failed else "starting", "startup": startup_status()})
+    response.status_code = 503
+    if not failed:
+        response.headers["Retry-After"] = "1"
+    return response
+
+
+@app.before_request
+def _wait_for_services():
+    """Hold requests (except /health and static files) until the services are loaded."""
+    if _replica is not None:
+        return None if request.endpoint == "static" else _refresh_replica()
+    if _services_ready.is_set():
+        return None
+    if not _loader_started:
+        load_services()
+        return None
+    if request.endpoint in ("health", "static"):
+        return None
+    _startup_finished.wait(STARTUP_WAIT_SECONDS)
+    if not _services_ready.is_set():
+        return _starting_response()
+    return None
+
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _record_latency(response):
+    """Per-route handler latency for /metrics."""
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.http_latency.labels(route).observe(time.perf_counter() - start)
+    return response
+
+
+def _last_temperature_epoch():
+    last_update = monitor.latest_data.get("last_update")
+    return datetime.fromisoformat(last_update).timestamp() if last_update else None
 
 
 # HTML template for shareable page
@@ -45,7 +230,7 @@ HTML_TEMPLATE = """
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif;
             height: 100vh;
             overflow: hidden;
-            background-image: url('/static/cinco_background.jpg');
+            background-image: url('{{ static_url }}/cinco_background.jpg');
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -125,6 +310,18 @@ HTML_TEMPLATE = """
             color: #94a3b8;
             border: 2px solid #64748b;
         }
+        .ready-eta {
+            font-size: 0.75em;
+            color: #fbbf24;
+        }
+        .breaker-status.stale {
+            opacity: 0.6;
+        }
+        .stale-note {
+            font-size: clamp(14px, 1.8vw, 20px);
+            margin-top: 15px;
+            opacity: 0.7;
+        }
         .chart-container {
             position: absolute;
             bottom: 40px;
@@ -227,9 +424,9 @@ HTML_TEMPLATE = """
     <div class="overlay"></div>
     <div class="heading">Cinco de baños</div>
 
-    {% if breaker_status == 'ok' %}
-    <div class="breaker-status {{ 'on' if breaker_on else 'off' }}">
-        Heater {{ 'ON' if breaker_on else 'OFF' }}{% if breaker_duration %}<br>for {{ breaker_duration }}{% endif %}
+    {% if breaker_status in ('ok', 'stale') %}
+    <div class="breaker-status {{ 'on' if breaker_on else 'off' }}{{ ' stale' if breaker_status == 'stale' }}">
+        Heater {{ 'ON' if breaker_on else 'OFF' }}{% if breaker_duration %}<br>for {{ breaker_duration }}{% endif %}{% if breaker_on and ready_eta %}<br><span class="ready-eta">{{ 'Ready!' if ready_eta == 'ready' else 'Ready in ' ~ ready_eta }}</span>{% endif %}
     </div>
     {% elif breaker_status == 'disabled' %}
     <div class="breaker-status off" style="opacity: 0.5;">
@@ -241,7 +438,7 @@ HTML_TEMPLATE = """
     </div>
     {% endif %}
 
-    {% if status == 'ok' and temperature is not none %}
+    {% if status in ('ok', 'stale') and temperature is not none %}
     <div class="content">
         <div class="temperature">
             {{ temperature }}<span class="unit">{{ temp_unit }}</span>
@@ -251,6 +448,9 @@ HTML_TEMPLATE = """
             Humidity: {{ humidity }}%
         </div>
         {% endif %}
+        <div class="stale-note" {% if status != 'stale' %}style="display: none;"{% endif %}>
+            Last known reading{% if last_update_time %} ({{ last_update_time }}){% endif %} • reconnecting...
+        </div>
     </div>
     {% elif status == 'error' %}
     <div class="content">
@@ -265,7 +465,7 @@ HTML_TEMPLATE = """
     </div>
     {% endif %}
 
-    {% if status == 'ok' %}
+    {% if status in ('ok', 'stale') %}
     <div class="chart-container">
         <div class="chart-hint">Scroll to zoom • Drag to pan</div>
         <button class="reset-zoom" id="resetZoom" onclick="resetChartZoom()">Reset Zoom</button>
@@ -284,25 +484,34 @@ HTML_TEMPLATE = """
             }
         }
 
+        // Labels, temperatures and heater-ON shading from the timeline
+        function chartSeries(timeline) {
+            const data = timeline.temperature;
+            const labels = data.map(item => {
+                const date = new Date(item.timestamp);
+                return date.toLocaleTimeString('en-US', {
+                    hour: '2-digit',
+                    minute: '2-digit',
+                    month: 'short',
+                    day: 'numeric'
+                });
+            });
+            const temperatures = data.map(item => item.temperature);
+            // Shade up to the top of the curve wherever the heater was ON
+            const top = Math.max(...temperatures.filter(t => t !== null && t !== undefined));
+            const heater = data.map(item => item.heater_on ? top : null);
+            return { labels, temperatures, heater };
+        }
+
         // Initialize chart with temperature history
         function initChart() {
-            fetch('/api/temperature/history')
+            fetch('{{ timeline_url }}', {cache: 'no-cache'})
                 .then(response => response.json())
-                .then(data => {
+                .then(timeline => {
                     const ctx = document.getElementById('tempChart');
-                    if (!ctx || data.length === 0) return;
-
-                    // Extract timestamps and temperatures
-                    const labels = data.map(item => {
-                        const date = new Date(item.timestamp);
-                        return date.toLocaleTimeString('en-US', {
-                            hour: '2-digit',
-                            minute: '2-digit',
-                            month: 'short',
-                            day: 'numeric'
-                        });
-                    });
-                    const temperatures = data.map(item => item.temperature);
+                    if (!ctx || timeline.temperature.length === 0) return;
+
+                    const { labels, temperatures, heater } = chartSeries(timeline);
 
                     // Create chart
                     tempChart = new Chart(ctx, {
@@ -317,6 +526,16 @@ HTML_TEMPLATE = """
                                 tension: 0.3,
                                 pointRadius: 2,
                                 pointHoverRadius: 5
+                            }, {
+                                label: 'Heater ON',
+                                data: heater,
+                                borderWidth: 0,
+                                backgroundColor: 'rgba(239, 68, 68, 0.18)',
+                                fill: 'start',
+                                stepped: true,
+                                pointRadius: 0,
+                                pointHoverRadius: 0,
+                                spanGaps: false
                             }]
                         },
                         options: {
@@ -383,11 +602,12 @@ HTML_TEMPLATE = """
 
         // Update temperature and breaker status dynamically
         function updateData() {
-            fetch('/api/temperature')
+            fetch('{{ latest_url }}', {cache: 'no-cache'})
                 .then(response => response.json())
                 .then(data => {
                     const tempData = data.temperature;
                     const breakerData = data.breaker;
+                    const heating = data.heating;
 
                     // Update temperature display
                     const tempElement = document.querySelector('.temperature');
@@ -401,34 +621,38 @@ HTML_TEMPLATE = """
                         humidityElement.textContent = 'Humidity: ' + tempData.humidity + '%';
                     }
 
+                    // Hide the "last known reading" note once live data arrives
+                    const staleElement = document.querySelector('.stale-note');
+                    if (staleElement) {
+                        staleElement.style.display = tempData.stale ? 'block' : 'none';
+                    }
+
                     // Update breaker status
                     const breakerElement = document.querySelector('.breaker-status');
-                    if (breakerElement && breakerData.status === 'ok') {
+                    if (breakerElement && (breakerData.status === 'ok' || breakerData.status === 'stale')) {
                         const isOn = breakerData.breaker_on;
                         const duration = breakerData.duration ? '<br>for ' + breakerData.duration : '';
-                        breakerElement.innerHTML = 'Heater ' + (isOn ? 'ON' : 'OFF') + duration;
-                        breakerElement.className = 'breaker-status ' + (isOn ? 'on' : 'off');
+                        let eta = '';
+                        if (isOn && heating && heating.eta_seconds !== null) {
+                            eta = '<br><span class="ready-eta">' + (heating.eta_seconds <= 0
+                                ? 'Ready!'
+                                : 'Ready in ~' + Math.max(1, Math.round(heating.eta_seconds / 60)) + 'm') + '</span>';
+                        }
+                        breakerElement.innerHTML = 'Heater ' + (isOn ? 'ON' : 'OFF') + duration + eta;
+                        breakerElement.className = 'breaker-status ' + (isOn ? 'on' : 'off') + (breakerData.stale ? ' stale' : '');
                     }
 
                     // Update chart with latest data
                     if (tempChart) {
-                        fetch('/api/temperature/history')
+                        fetch('{{ timeline_url }}', {cache: 'no-cache'})
                             .then(response => response.json())
-                            .then(historyData => {
-                                if (historyData.length > 0) {
-                                    const labels = historyData.map(item => {
-                                        const date = new Date(item.timestamp);
-                                        return date.toLocaleTimeString('en-US', {
-                                            hour: '2-digit',
-                                            minute: '2-digit',
-                                            month: 'short',
-                                            day: 'numeric'
-                                        });
-                                    });
-                                    const temperatures = historyData.map(item => item.temperature);
+                            .then(timeline => {
+                                if (timeline.temperature.length > 0) {
+                                    const { labels, temperatures, heater } = chartSeries(timeline);
 
                                     tempChart.data.labels = labels;
                                     tempChart.data.datasets[0].data = temperatures;
+                                    tempChart.data.datasets[1].data = heater;
                                     tempChart.update('none'); // Update without animation for smoother experience
                                 }
                             });
@@ -448,12 +672,43 @@ HTML_TEMPLATE = """
 """
 
 
+def _not_modified(tag: str):
+    """304 if the client's copy (If-None-Match) is current, else None."""
+    if request.if_none_match.contains(tag):
+        response = Response(status=304)
+        response.set_etag(tag)
+        return response
+    return None
+
+
+def _with_etag(response, tag: str):
+    """Tag a response with its snapshot version; clients revalidate every time."""
+    response.set_etag(tag)
+    response.cache_control.no_cache = True
+    return response
+
+
 @app.route("/")
 def index():
     """Main page with live temperature display."""
     data = monitor.get_latest_data()
     breaker_data = breaker_monitor.get_latest_data()
+    tag = etag(data, breaker_data)
+    cached = _not_modified(tag)
+    if cached:
+        return cached
 
+    ready_eta = format_eta(heat_model.predict(data.get("temperature")))
+    return _with_etag(make_response(render_dashboard(data, breaker_data, ready_eta)), tag)
+
+
+def render_dashboard(data: dict, breaker_data: dict, ready_eta: Optional[str] = None,
+                     latest_url: str = "/api/temperature", timeline_url: str = "/api/timeline",
+                     static_url: str = "/static") -> str:
+    """The share page for these readings; the URLs are what its script polls.
+
+    Needs no request or app context, so static_site.py renders it too.
+    """
     # Format timestamp
     last_update_time = None
     if data.get("last_update"):
@@ -463,8 +718,7 @@ def index():
         except:
             last_update_time = data["last_update"]
 
-    return render_template_string(
-        HTML_TEMPLATE,
+    return _dashboard_template().render(
         temperature=data.get("temperature"),
         humidity=data.get("humidity"),
         device_name=data.get("device_name"),
@@ -477,61 +731,222 @@ def index():
         breaker_on=breaker_data.get("breaker_on"),
         breaker_name=breaker_data.get("breaker_name"),
         breaker_duration=breaker_data.get("duration"),
+        ready_eta=ready_eta,
+        latest_url=latest_url,
+        timeline_url=timeline_url,
+        static_url=static_url,
     )
 
 
+@functools.lru_cache(maxsize=None)
+def _dashboard_template():
+    return app.jinja_env.from_string(HTML_TEMPLATE)
+
+
 @app.route("/api/temperature")
 def api_temperature():
     """JSON API endpoint for programmatic access."""
     temp_data = monitor.get_latest_data()
     breaker_data = breaker_monitor.get_latest_data()
+    tag = etag(temp_data, breaker_data)
+    cached = _not_modified(tag)
+    if cached:
+        return cached
 
     # Combine both datasets
     combined_data = {
         "temperature": temp_data,
-        "breaker": breaker_data
+        "breaker": breaker_data,
+        "heating": heat_model.predict(temp_data.get("temperature")),
     }
-    return jsonify(combined_data)
+    return _with_etag(jsonify(combined_data), tag)
 
 
 @app.route("/api/breaker/status")
 def breaker_status():
     """Get breaker status only."""
     data = breaker_monitor.get_latest_data()
-    return jsonify(data)
+    tag = etag(data)
+    cached = _not_modified(tag)
+    if cached:
+        return cached
+    return _with_etag(jsonify(data), tag)
 
 
 @app.route("/api/temperature/history")
 def temperature_history():
-    """Get temperature history for chart display."""
-    history = temp_logger.get_history()
-    return jsonify(history)
+    """Get temperature history for chart display.
+
+    Without parameters returns every stored record. With
+    ?start=&end=&bucket=5m&agg=avg,min,max returns aggregated buckets
+    (start/end as ISO8601 or epoch seconds, both optional).
+    """
+    args = request.args
+    if not any(name in args for name in ("start", "end", "bucket", "agg")):
+        history = temp_logger.get_history()
+        return jsonify(history)
+
+    try:
+        start = parse_time(args["start"]) if args.get("start") else None
+        end = parse_time(args["end"]) if args.get("end") else None
+        bucket = parse_bucket(args.get("bucket", "5m"))
+        aggs = parse_aggs(args.get("agg"))
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(history_cache.query(start, end, bucket, aggs))
+
+
+@app.route("/api/timeline")
+def timeline():
+    """Temperature series plus overlapping heater ON intervals (?start=&end=, both optional)."""
+    try:
+        start, end = (
+            datetime.fromtimestamp(parse_time(request.args[name]), timezone.utc)
+            if request.args.get(name) else None
+            for name in ("start", "end")
+        )
+    except QueryError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(build_timeline(start, end))
+
+
+@app.route("/api/sessions")
+def sessions():
+    """Completed heating sessions with their stats, newest first (?limit=N)."""
+    limit = request.args.get("limit", type=int)
+    return jsonify(session_table.get_sessions(limit))
+
+
+RANGE_UNITS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+@app.route("/api/stats")
+def stats():
+    """Usage totals and buckets: ?range=7d|4w|12m|1y|all&group=day|week."""
+    range_arg = request.args.get("range", "30d").strip().lower()
+    if range_arg == "all":
+        days = None
+    else:
+        try:
+            days = int(range_arg[:-1] or 1) * RANGE_UNITS[range_arg[-1]]
+        except (KeyError, ValueError, IndexError):
+            days = 0
+        if days <= 0:
+            return jsonify({"error": f"invalid range: {range_arg!r}"}), 400
+    group = request.args.get("group") or ("day" if days is not None and days <= 31 else "week")
+    if group not in ("day", "week"):
+        return jsonify({"error": f"invalid group: {group!r}"}), 400
+    return jsonify(dict(usage_stats.report(days, group), range=range_arg))
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    """Prometheus text-format metrics."""
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _require_admin():
+    """404 unless profiling is enabled and the admin token matches (header or ?token=)."""
+    token = request.headers.get("X-Admin-Token") or request.args.get("token")
+    if not profiling.authorized(token):
+        abort(404)
+
+
+def _capture_seconds() -> float:
+    return min(max(request.args.get("seconds", 10, type=float), 0.1), profiling.MAX_CAPTURE_SECONDS)
+
+
+@app.route("/admin/profile/sample")
+def profile_sample():
+    """Sample all threads for ?seconds=N; collapsed stacks for flame graphs."""
+    _require_admin()
+    interval = request.args.get("interval", 0.005, type=float)
+    if not 0 < interval < math.inf:
+        return jsonify({"error": f"invalid interval: {interval!r}"}), 400
+    text = profiling.sample(_capture_seconds(), interval)
+    return Response(text, mimetype="text/plain",
+                    headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
+
+
+@app.route("/admin/profile/cprofile")
+def profile_cprofile():
+    """cProfile requests and hot paths for ?seconds=N; pstats file, or ?format=text."""
+    _require_admin()
+    data = profiling.cprofile_session.capture(_capture_seconds())
+    if request.args.get("format") == "text":
+        return Response(profiling.pstats_text(data, sort=request.args.get("sort", "cumulative")),
+                        mimetype="text/plain")
+    return Response(data, mimetype="application/octet-stream",
+                    headers={"Content-Disposition": "attachment; filename=profile.pstats"})
+
+
+@app.route("/admin/profile/memory/<action>")
+def profile_memory(action):
+    """tracemalloc: start | top | diff | stop."""
+    _require_admin()
+    limit = request.args.get("limit", 25, type=int)
+    handlers = {
+        "start": profiling.memory_start,
+        "top": lambda: profiling.memory_top(limit),
+        "diff": lambda: profiling.memory_diff(limit),
+        "stop": profiling.memory_stop,
+    }
+    if action not in handlers:
+        abort(404)
+    return Response(handlers[action](), mimetype="text/plain")
 
 
 @app.route("/health")
 def health():
-    """Health check endpoint."""
+    """Health check endpoint; answers 503 "starting" until the services are loaded."""
+    if not _services_ready.is_set():
+        return _starting_response()
     temp_data = monitor.get_latest_data()
     breaker_data = breaker_monitor.get_latest_data()
 
     temp_ok = temp_data.get("status") == "ok"
     breaker_ok = breaker_data.get("status") in ["ok", "disabled"]
 
-    overall_ok = temp_ok and breaker_ok
+    overall_ok = temp_ok and breaker_ok and startup["phase"] == "ready"
     status_code = 200 if overall_ok else 503
 
+    if _replica is not None:
+        # Collector-side sections, as last published
+        collector = {key: _replica.health.get(key)
+                     for key in ("io", "http", "telegram_outbox", "anomalies")}
+    else:
+        collector = {
+            "io": {
+                "yolink": yolink_policy.stats(),
+                "tuya": tuya_policy.stats(),
+            },
+            "http": http_stats.snapshot(),
+            "telegram_outbox": notifier.outbox.stats(),
+            "anomalies": detector.snapshot(),
+        }
+
     return jsonify({
         "status": "ok" if overall_ok else "error",
         "temperature": temp_data.get("status"),
-        "breaker": breaker_data.get("status")
+        "breaker": breaker_data.get("status"),
+        "stale": bool(temp_data.get("stale") or breaker_data.get("stale")),
+        "startup": startup_status(),
+        **collector,
+        "history_cache": history_cache.stats(),
     }), status_code
 
 
 def run_async_loop():
-    """Run the async temperature monitoring loop in a separate thread."""
+    """Run all sensor drivers (YoLink, Tuya, ...) on one event loop in a separate thread."""
+    global _supervisor
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(start_monitoring())
+    supervisor = _supervisor = build_supervisor()
+    static_site.attach(supervisor, render_dashboard)
+    try:
+        loop.run_until_complete(supervisor.run())
+    finally:
+        loop.run_until_complete(supervisor.close())
 
 
 _shutting_down = False
@@ -547,19 +962,58 @@ def cleanup_and_exit(signum=None, frame=None):
     _shutting_down = True
 
     print("\n\n🛑 Shutting down gracefully...")
-    print("💾 Saving temperature history...")
-    temp_logger.save_to_disk()
-    print("💾 Saving breaker state history...")
-    breaker_tracker.save_to_disk()
-    print("✓ All data saved. Goodbye!")
+    if _services_ready.is_set():
+        notifier.outbox.stop()  # Lets an in-flight send finish; the rest stays queued on disk
+        print("💾 Saving temperature history...")
+        temp_logger.flush()
+        temp_logger.save_to_disk()
+        print("💾 Saving breaker state history...")
+        breaker_tracker.save_to_disk()
+        usage_stats.save_to_disk()
+        print("✓ All data saved. Goodbye!")
+    else:
+        # Still loading: nothing new to save, and a half-loaded history must not overwrite the files
+        print("✓ Stopped during startup. Goodbye!")
+
+    # kill -9 skips atexit: flush the queued log records first
+    shutdown_logging()
 
     # Kill the process forcefully
     import subprocess
     subprocess.run(['kill', '-9', str(os.getpid())])
 
 
+def start_services():
+    """Background startup: load the services, then start drivers, scheduler and Telegram."""
+    try:
+        load_services()
+    except Exception as e:
+        logger.exception("Service startup failed")
+        startup["phase"] = "failed"
+        startup["error"] = str(e)
+        _startup_finished.set()  # Waiting requests get the failure at once
+        return
+
+    # YoLink and Tuya initialize concurrently on the driver event loop
+    monitor_thread = threading.Thread(target=run_async_loop, daemon=True, name="sensor-drivers")
+    monitor_thread.start()
+
+    # Notification scheduler (Wednesday reminders, weekly rust warnings)
+    scheduler.start()
+
+    # Telegram outbox (delivers messages left pending by a previous run) and
+    # command handler (/status); both connect in their own threads
+    if notifier.enabled:
+        notifier.outbox.start()
+    start_command_polling()
+    startup["telegram"] = "enabled" if notifier.enabled else "disabled"
+
+
 def main():
-    """Start temperature monitor, breaker monitor, and web server."""
+    """Bind the web server first, then start monitors and integrations in the background."""
+    global _loader_started
+    from werkzeug.serving import make_server
+
     print("=" * 60)
     print("YoLink Temperature & Sauna Monitor - Web Server")
     print("=" * 60)
@@ -568,25 +1022,14 @@ def main():
     signal.signal(signal.SIGINT, cleanup_and_exit)
     signal.signal(signal.SIGTERM, cleanup_and_exit)
 
-    # Start temperature monitoring in background thread
-    monitor_thread = threading.Thread(target=run_async_loop, daemon=True)
-    monitor_thread.start()
-
-    # Start Tuya breaker monitoring if enabled
-    if config.TUYA_ENABLED:
-        breaker_monitor.start_monitoring()
-
-    # Start notification scheduler (Wednesday reminders, weekly rust warnings)
-    scheduler.start()
-
-    # Start Telegram command handler (/status)
-    start_command_polling()
-
-    # Give monitors a moment to initialize
-    import time
-    time.sleep(2)
+    # Bind the port before loading anything heavy: /health answers "starting"
+    # and other requests wait (up to STARTUP_WAIT_SECONDS) until loaded
+    server = make_server(config.HOST, config.PORT, app, threaded=True)
+    _loader_started = True
+    threading.Thread(target=start_services, daemon=True, name="startup").start()
 
-    print(f"\n🌐 Web server starting on http://{config.HOST}:{config.PORT}")
+    print(f"\n🌐 Web server listening on http://{config.HOST}:{config.PORT} "
+          f"({time.monotonic() - startup['started']:.2f}s after import)")
     print(f"\n📊 Access points:")
     print(f"   Main page:      http://localhost:{config.PORT}/")
     print(f"   JSON API:       http://localhost:{config.PORT}/api/temperature")
@@ -596,8 +1039,7 @@ def main():
     print(f"   (Replace 'localhost' with your server's public IP/domain)")
     print("\nPress Ctrl+C to stop\n")
 
-    # Start Flask server
-    app.run(host=config.HOST, port=config.PORT, debug=False, threaded=True)
+    server.serve_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,17 @@
+"""
+WSGI Entry Point for Web Workers
+
+Serves the dashboard and API from the shared store written by collector.py.
+Starts no pollers, scheduler or Telegram bot, so it is safe under any
+number of worker processes:
+
+    gunicorn -w 4 -b 0.0.0.0:5002 wsgi:app
+
+Don't use --preload: each worker must import this module itself (its
+logging thread and store connections don't survive a fork).
+"""
+
+import web_server
+
+web_server.load_replica()
+app = web_server.app